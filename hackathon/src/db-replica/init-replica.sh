@@ -0,0 +1,32 @@
+#!/bin/bash
+# 読み取りレプリカの初期化（docker compose --profile replica で起動する db-replica 用）
+# プライマリ(db)の tabebui をGTID付きでダンプして取り込み、GTIDの自動位置決めでレプリケーションを始める。
+set -euo pipefail
+
+SOURCE_HOST="${REPLICATION_SOURCE_HOST:-db}"
+SOURCE_PASSWORD="${REPLICATION_SOURCE_ROOT_PASSWORD:-root}"
+mysql_local=(mysql --protocol=socket -uroot -p"${MYSQL_ROOT_PASSWORD}")
+
+# 初期化中にレプリカ側で発生したGTIDを捨て、プライマリのGTIDだけを持つ状態にする
+"${mysql_local[@]}" -e "RESET MASTER"
+
+mysqldump -h "${SOURCE_HOST}" -uroot -p"${SOURCE_PASSWORD}" \
+    --databases tabebui --single-transaction --routines --triggers --set-gtid-purged=ON \
+    | "${mysql_local[@]}"
+
+"${mysql_local[@]}" <<SQL
+-- ユーザー作成をレプリカ独自のGTIDとして残さない
+SET SESSION sql_log_bin = 0;
+CREATE USER IF NOT EXISTS '${MYSQL_USER:-app}'@'%' IDENTIFIED BY '${MYSQL_PASSWORD:-app}';
+-- API からは読み取りと遅延の確認（SHOW REPLICA STATUS）のみ
+GRANT SELECT ON tabebui.* TO '${MYSQL_USER:-app}'@'%';
+GRANT REPLICATION CLIENT ON *.* TO '${MYSQL_USER:-app}'@'%';
+CHANGE REPLICATION SOURCE TO
+    SOURCE_HOST='${SOURCE_HOST}',
+    SOURCE_USER='root',
+    SOURCE_PASSWORD='${SOURCE_PASSWORD}',
+    SOURCE_AUTO_POSITION=1,
+    GET_SOURCE_PUBLIC_KEY=1;
+START REPLICA;
+SET PERSIST super_read_only = ON;
+SQL
@@ -54,19 +54,53 @@ CREATE TABLE eating_records (
     FOREIGN KEY (session_id) REFERENCES eating_sessions(id) ON DELETE SET NULL
 );
 
+-- 5. user_part_progress（ユーザー×部位の制覇状況サマリ、eating_records登録時に同一トランザクションで更新）
+CREATE TABLE user_part_progress (
+    user_id INT NOT NULL,
+    animal_part_id INT NOT NULL,
+    first_conquered_at TIMESTAMP NOT NULL,
+    last_eaten_at TIMESTAMP NOT NULL,
+    eat_count INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, animal_part_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (animal_part_id) REFERENCES animal_parts(id)
+);
+
 -- インデックス作成
 CREATE INDEX idx_eating_records_user_eaten_at ON eating_records(user_id, eaten_at DESC);
 CREATE INDEX idx_animal_parts_type ON animal_parts(animal_type);
+-- セッション一覧のキーセットページング用 (eaten_at, id) 順
+CREATE INDEX idx_eating_sessions_user_eaten_at ON eating_sessions(user_id, eaten_at, id);
+-- セッション単位の部位記録取得・件数集計
+CREATE INDEX idx_eating_records_session_part ON eating_records(session_id, animal_part_id);
+-- ユーザー×部位ごとの記録集計
+CREATE INDEX idx_eating_records_user_part ON eating_records(user_id, animal_part_id, eaten_at, session_id);
 
 -- Agent食べ歩きコンシェルジュ機能のためのビュー
 CREATE VIEW user_missing_parts AS
-SELECT 
+SELECT
     u.id as user_id,
     u.name,
     ap.id as animal_part_id,
     ap.animal_type,
     ap.part_name_jp
 FROM users u
-CROSS JOIN animal_parts ap
-LEFT JOIN eating_records er ON u.id = er.user_id AND ap.id = er.animal_part_id
-WHERE er.id IS NULL;
+JOIN animal_parts ap
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM user_part_progress upp
+    WHERE upp.user_id = u.id AND upp.animal_part_id = ap.id
+);
+
+-- マイグレーション管理（server/scripts/migrate.py）
+-- このファイルで作成した新規DBには server/migrations の内容が含まれているため適用済みとして記録する
+CREATE TABLE schema_migrations (
+    version VARCHAR(255) PRIMARY KEY,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO schema_migrations (version) VALUES
+('001_user_part_progress'),
+('002_eating_sessions_keyset_index'),
+('003_hot_query_indexes');
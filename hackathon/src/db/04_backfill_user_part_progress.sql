@@ -0,0 +1,15 @@
+-- tabebui データベースを使用
+USE tabebui;
+-- 文字化け対策: クライアント接続文字コードをUTF-8に固定
+SET NAMES utf8mb4;
+
+-- テストデータの eating_records から user_part_progress を作成
+-- （既存環境では server/scripts/backfill_user_part_progress.py を使用）
+INSERT INTO user_part_progress (user_id, animal_part_id, first_conquered_at, last_eaten_at, eat_count)
+SELECT user_id, animal_part_id, MIN(eaten_at), MAX(eaten_at), COUNT(*)
+FROM eating_records
+GROUP BY user_id, animal_part_id
+ON DUPLICATE KEY UPDATE
+    first_conquered_at = VALUES(first_conquered_at),
+    last_eaten_at = VALUES(last_eaten_at),
+    eat_count = VALUES(eat_count);
@@ -13,6 +13,8 @@ export default function ConciergePage() {
   const [inputMessage, setInputMessage] = useState('')
   const [isLoading, setIsLoading] = useState(false)
   const [error, setError] = useState(null)
+  // 会話履歴はサーバー側で保持し、会話IDだけを送る
+  const [conversationId, setConversationId] = useState(null)
   const { dbUser } = useAuth()
 
   const handleSendMessage = async (event) => {
@@ -26,10 +28,6 @@ export default function ConciergePage() {
     }
 
     const userMessage = { role: 'user', content: trimmed }
-    const nextHistory = [...messages, userMessage].map((msg) => ({
-      role: msg.role === 'assistant' ? 'assistant' : 'user',
-      content: msg.content
-    }))
 
     setMessages((prev) => [...prev, userMessage])
     setInputMessage('')
@@ -37,25 +35,34 @@ export default function ConciergePage() {
     setError(null)
 
     try {
-      const payload = await chatAPI.sendMessage(trimmed, dbUser.id, nextHistory)
+      // 生成途中のテキストを末尾のアシスタントメッセージとして表示
+      let streamedText = ''
+      const data = await chatAPI.streamMessage(trimmed, dbUser.id, {
+        conversationId,
+        onToken: (text) => {
+          const isFirstToken = !streamedText
+          streamedText += text
+          setIsLoading(false)
+          setMessages((prev) =>
+            isFirstToken
+              ? [...prev, { role: 'assistant', content: streamedText }]
+              : [...prev.slice(0, -1), { role: 'assistant', content: streamedText }]
+          )
+        }
+      })
 
-      const reply = payload?.data?.reply
-      const historyFromServer = Array.isArray(payload?.data?.history) ? payload.data.history : null
+      const reply = data?.reply
+      if (data?.conversation_id) setConversationId(data.conversation_id)
 
-      if (historyFromServer) {
-        setMessages(
-          historyFromServer.map((msg) => ({
-            role: msg.role === 'assistant' ? 'assistant' : 'user',
-            content: msg.content || ''
-          }))
-        )
-      } else if (reply) {
-        setMessages((prev) => [...prev, { role: 'assistant', content: reply }])
+      if (reply) {
+        setMessages((prev) => [...prev.slice(0, streamedText ? -1 : undefined), { role: 'assistant', content: reply }])
       } else {
         throw new Error('応答メッセージが空でした。')
       }
     } catch (err) {
       console.error(err)
+      // 会話が期限切れの場合は次のメッセージから新しい会話を始める
+      if (err.status === 404) setConversationId(null)
       setError(err.message)
       setMessages((prev) => [
         ...prev,
@@ -88,11 +88,36 @@ export const recordAPI = {
     return apiRequest(`/eating-sessions?user_id=${userId}&page=${page}&per_page=${perPage}`)
   },
 
+  // 複数セッションの一括記録（オフライン中に溜めた記録の同期用）
+  createRecordsBulk: async (sessions, userId) => {
+    if (!userId) throw new Error('User ID is required')
+    return apiRequest(`/eating-records/bulk?user_id=${userId}`, {
+      method: 'POST',
+      body: JSON.stringify({ sessions }),
+    })
+  },
+
+  // 食事セッション一覧取得（カーソル方式。nextCursor には前回の pagination.next_cursor を渡す）
+  getSessionsByCursor: async (userId, nextCursor = null, perPage = 20) => {
+    if (!userId) throw new Error('User ID is required')
+    const params = new URLSearchParams({ user_id: userId, per_page: perPage, pagination: 'cursor' })
+    if (nextCursor) params.append('cursor', nextCursor)
+    return apiRequest(`/eating-sessions?${params.toString()}`)
+  },
+
   // 食事セッション詳細取得
   getSessionDetail: async (sessionId, userId) => {
     if (!userId) throw new Error('User ID is required')
     return apiRequest(`/eating-sessions/${sessionId}?user_id=${userId}`)
   },
+
+  // 複数セッションの詳細を一括取得（一覧の1ページ分をまとめて展開する用、最大100件）
+  getSessionDetails: async (sessionIds, userId) => {
+    if (!userId) throw new Error('User ID is required')
+    const params = new URLSearchParams({ user_id: userId })
+    sessionIds.forEach((sessionId) => params.append('session_ids', sessionId))
+    return apiRequest(`/eating-sessions/details?${params.toString()}`)
+  },
 }
 
 // 進捗関連API
@@ -114,6 +139,12 @@ export const progressAPI = {
     if (!userId) throw new Error('User ID is required')
     return apiRequest(`/dashboard-stats?user_id=${userId}`)
   },
+
+  // 次に制覇したい部位のおすすめ取得
+  getRecommendations: async (userId, limit = 5) => {
+    if (!userId) throw new Error('User ID is required')
+    return apiRequest(`/recommendations?user_id=${userId}&limit=${limit}`)
+  },
 }
 
 // チャット関連API
@@ -130,4 +161,65 @@ export const chatAPI = {
       }),
     })
   },
+
+  // チャットメッセージ送信（ストリーミング）
+  // 履歴はサーバー側で保持するため、2回目以降は前回の data.conversation_id を渡す
+  // onToken には生成されたテキストの断片が順に渡され、完了時に /chat/message と同じ data を返す
+  streamMessage: async (message, userId, { conversationId = null, systemPrompt = null, onToken } = {}) => {
+    if (!userId) throw new Error('User ID is required')
+    const response = await fetch(`${API_BASE_URL}/chat/message/stream?user_id=${userId}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        message,
+        conversation_id: conversationId,
+        system_prompt: systemPrompt,
+      }),
+    })
+
+    if (!response.ok || !response.body) {
+      const errorData = await response.json().catch(() => ({}))
+      const error = new Error(errorData.detail || `HTTP error! status: ${response.status}`)
+      error.status = response.status
+      throw error
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    let result = null
+
+    while (true) {
+      const { value, done } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+
+      // イベントは空行区切り
+      let boundary = buffer.indexOf('\n\n')
+      while (boundary !== -1) {
+        const rawEvent = buffer.slice(0, boundary)
+        buffer = buffer.slice(boundary + 2)
+        boundary = buffer.indexOf('\n\n')
+
+        let eventName = 'message'
+        let data = ''
+        for (const line of rawEvent.split('\n')) {
+          if (line.startsWith('event:')) eventName = line.slice(6).trim()
+          else if (line.startsWith('data:')) data += line.slice(5).trim()
+        }
+        const payload = data ? JSON.parse(data) : {}
+
+        if (eventName === 'token') {
+          onToken?.(payload.text || '')
+        } else if (eventName === 'done') {
+          result = payload
+        } else if (eventName === 'error') {
+          throw new Error(payload.detail || 'ストリーミング中にエラーが発生しました')
+        }
+      }
+    }
+
+    if (!result) throw new Error('応答が途中で終了しました。')
+    return result
+  },
 }
\ No newline at end of file
@@ -0,0 +1,82 @@
+import math
+import re
+from typing import List, Optional, Sequence, Tuple
+
+# 英数字・記号の連続部分（それ以外は日本語などの全角文字として扱う）
+_ASCII_RUN = re.compile(r"[\x00-\x7f]+")
+# 文の区切り（要約では各発言の最初の一文だけを残す）
+_SENTENCE_END = re.compile(r"(?<=[。！？!?])")
+
+# 1メッセージあたりの役割・区切りのオーバーヘッド
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """トークン数の概算（API呼び出しなし）
+
+    英数字は4文字で1トークン、日本語などそれ以外の文字は1文字1トークンとして数える。
+    Gemini の実際の値よりやや多めに出るため、予算の判定には安全側に働く。
+    """
+    if not text:
+        return 0
+    ascii_chars = sum(len(run) for run in _ASCII_RUN.findall(text))
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+
+def message_tokens(content: str) -> int:
+    return estimate_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def split_history_by_budget(messages: Sequence, budget: int, max_messages: int = 0) -> Tuple[List, List]:
+    """履歴を (要約に回す古い発言, そのまま送る新しい発言) に分ける
+
+    messages は role / content 属性を持つ発言のリスト（古い順）。
+    新しい発言から順に ``budget`` トークンに収まるだけ残す。``max_messages`` が正なら件数でも制限する。
+    budget が0以下ならトークン数では制限しない。
+    """
+    limit = len(messages)
+    if max_messages > 0:
+        limit = min(limit, max_messages)
+
+    kept = 0
+    used = 0
+    for msg in reversed(messages[len(messages) - limit:]):
+        cost = message_tokens(msg.content)
+        if budget > 0 and used + cost > budget:
+            break
+        used += cost
+        kept += 1
+
+    split = len(messages) - kept
+    return list(messages[:split]), list(messages[split:])
+
+
+def summarize_message(role: str, content: str, max_chars: int = 60) -> str:
+    """発言を要約用の1行にする（最初の一文のみ、長ければ切り詰める）"""
+    text = " ".join(content.split())
+    first = _SENTENCE_END.split(text, 1)[0]
+    if len(first) > max_chars:
+        first = first[:max_chars - 1] + "…"
+    speaker = "ユーザー" if role == "user" else "コンシェルジュ"
+    return f"- {speaker}: {first}"
+
+
+def compact_summary(previous: Optional[str], older: Sequence, budget: int) -> Optional[str]:
+    """古い発言をこれまでの要約に畳み込む（ローリングサマリ）
+
+    要約が ``budget`` トークンを超えたら古い行から捨てる。budget が0以下なら要約しない。
+    """
+    if budget <= 0:
+        return None
+    lines = previous.splitlines() if previous else []
+    lines.extend(summarize_message(msg.role, msg.content) for msg in older)
+
+    kept: List[str] = []
+    used = 0
+    for line in reversed(lines):
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(reversed(kept)) or None
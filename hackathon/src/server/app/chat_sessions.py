@@ -0,0 +1,120 @@
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+
+
+class ChatSessionNotFound(Exception):
+    """会話IDが存在しない・期限切れ・他ユーザーのものだった場合の例外"""
+
+
+class ChatSessionStore(ABC):
+    """会話履歴の保存先のインターフェース
+
+    履歴は {"role": "user"|"assistant", "content": str} の dict のリストで扱う。
+    実装はメッセージ数の上限と有効期限を自前で管理する。
+    """
+
+    @abstractmethod
+    def create(self, user_id: int) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_messages(self, conversation_id: str, user_id: int) -> List[Dict[str, str]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def append(self, conversation_id: str, user_id: int, messages: List[Dict[str, str]]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, conversation_id: str, user_id: int) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_summary(self, conversation_id: str, user_id: int) -> Optional[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def compact(self, conversation_id: str, user_id: int, drop_count: int, summary: Optional[str]) -> None:
+        """古い方から drop_count 件の発言を捨て、代わりに要約を保存する"""
+        raise NotImplementedError
+
+
+class _Session:
+    __slots__ = ("user_id", "messages", "summary", "expires_at")
+
+    def __init__(self, user_id: int, max_messages: Optional[int], expires_at: float):
+        self.user_id = user_id
+        self.messages: Deque[Dict[str, str]] = deque(maxlen=max_messages)
+        self.summary: Optional[str] = None
+        self.expires_at = expires_at
+
+
+class InMemoryChatSessionStore(ChatSessionStore):
+    """プロセス内メモリに会話を保持する既定の実装
+
+    - 各会話は最新 ``max_messages`` 件のリングバッファ（0以下なら無制限）
+    - 最後の利用から ``ttl`` 秒で失効
+    - 会話数が ``max_sessions`` を超えたら最も古く使われた会話から破棄
+    """
+
+    def __init__(self, max_messages: int = 12, ttl: float = 1800.0, max_sessions: int = 10000):
+        self.max_messages = max_messages if max_messages > 0 else None
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _touch(self, conversation_id: str, user_id: int) -> _Session:
+        session = self._sessions.get(conversation_id)
+        now = time.monotonic()
+        if session is None or session.user_id != user_id or session.expires_at < now:
+            if session is not None and session.expires_at < now:
+                del self._sessions[conversation_id]
+            raise ChatSessionNotFound(conversation_id)
+        session.expires_at = now + self.ttl
+        self._sessions.move_to_end(conversation_id)
+        return session
+
+    def create(self, user_id: int) -> str:
+        conversation_id = secrets.token_urlsafe(16)
+        with self._lock:
+            self._sessions[conversation_id] = _Session(user_id, self.max_messages, time.monotonic() + self.ttl)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return conversation_id
+
+    def get_messages(self, conversation_id: str, user_id: int) -> List[Dict[str, str]]:
+        with self._lock:
+            return list(self._touch(conversation_id, user_id).messages)
+
+    def append(self, conversation_id: str, user_id: int, messages: List[Dict[str, str]]) -> None:
+        with self._lock:
+            self._touch(conversation_id, user_id).messages.extend(messages)
+
+    def get_summary(self, conversation_id: str, user_id: int) -> Optional[str]:
+        with self._lock:
+            return self._touch(conversation_id, user_id).summary
+
+    def compact(self, conversation_id: str, user_id: int, drop_count: int, summary: Optional[str]) -> None:
+        with self._lock:
+            session = self._touch(conversation_id, user_id)
+            for _ in range(min(drop_count, len(session.messages))):
+                session.messages.popleft()
+            session.summary = summary
+
+    def delete(self, conversation_id: str, user_id: int) -> None:
+        with self._lock:
+            session = self._sessions.get(conversation_id)
+            if session is not None and session.user_id == user_id:
+                del self._sessions[conversation_id]
+
+
+def create_chat_session_store(kind: str, **options) -> ChatSessionStore:
+    """CHAT_SESSION_STORE の値から保存先を作成"""
+    if kind == "memory":
+        return InMemoryChatSessionStore(**options)
+    raise ValueError(f"Unknown chat session store: {kind}")
@@ -0,0 +1,128 @@
+import re
+import time
+from functools import lru_cache
+from typing import Any, Callable, List
+
+# (正規化したSQL, 実行秒数, 行数) を受け取るリスナー
+QueryListener = Callable[[str, float, int], None]
+
+_listeners: List[QueryListener] = []
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER_LIST = re.compile(r"%s(?:\s*,\s*%s)+")
+
+
+def add_query_listener(listener: QueryListener) -> None:
+    """cursor.execute / executemany のたびに呼ばれるリスナーを登録する"""
+    _listeners.append(listener)
+
+
+@lru_cache(maxsize=512)
+def normalize_statement(query: str, max_length: int = 160) -> str:
+    """集計用のSQL表記（空白をまとめ、IN (%s, %s, ...) の個数の違いを吸収する）"""
+    text = _WHITESPACE.sub(" ", query).strip()
+    text = _PLACEHOLDER_LIST.sub("%s, ...", text)
+    return text[:max_length]
+
+
+def _notify(query: str, started: float, cursor: Any) -> None:
+    if not _listeners:
+        return
+    elapsed = time.perf_counter() - started
+    statement = normalize_statement(query)
+    rows = max(getattr(cursor, "rowcount", 0) or 0, 0)
+    for listener in _listeners:
+        listener(statement, elapsed, rows)
+
+
+class InstrumentedCursor:
+    """pymysql のカーソルを包み、実行時間と行数をリスナーへ通知する"""
+
+    def __init__(self, cursor: Any):
+        self._cursor = cursor
+
+    def execute(self, query: str, args: Any = None) -> Any:
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(query, args)
+        finally:
+            _notify(query, started, self._cursor)
+
+    def executemany(self, query: str, args: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, args)
+        finally:
+            _notify(query, started, self._cursor)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self) -> "InstrumentedCursor":
+        self._cursor.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> Any:
+        return self._cursor.__exit__(exc_type, exc, tb)
+
+
+class AsyncInstrumentedCursor:
+    """aiomysql のカーソル版 InstrumentedCursor"""
+
+    def __init__(self, cursor: Any):
+        self._cursor = cursor
+
+    async def execute(self, query: str, args: Any = None) -> Any:
+        started = time.perf_counter()
+        try:
+            return await self._cursor.execute(query, args)
+        finally:
+            _notify(query, started, self._cursor)
+
+    async def executemany(self, query: str, args: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await self._cursor.executemany(query, args)
+        finally:
+            _notify(query, started, self._cursor)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+
+class _AsyncCursorContext:
+    """``async with conn.cursor() as cur`` と ``cur = await conn.cursor()`` の両方に対応する"""
+
+    def __init__(self, context: Any):
+        self._context = context
+
+    async def __aenter__(self) -> AsyncInstrumentedCursor:
+        return AsyncInstrumentedCursor(await self._context.__aenter__())
+
+    async def __aexit__(self, exc_type, exc, tb) -> Any:
+        return await self._context.__aexit__(exc_type, exc, tb)
+
+    def __await__(self):
+        async def wrap():
+            return AsyncInstrumentedCursor(await self._context)
+        return wrap().__await__()
+
+
+class InstrumentedAsyncConnection:
+    """aiomysql の接続を包み、cursor() が計測付きカーソルを返すようにする"""
+
+    def __init__(self, conn: Any):
+        self._conn = conn
+
+    @property
+    def raw(self) -> Any:
+        return self._conn
+
+    def cursor(self, *args, **kwargs) -> _AsyncCursorContext:
+        return _AsyncCursorContext(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
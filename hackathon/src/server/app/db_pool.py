@@ -0,0 +1,195 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class PoolTimeoutError(Exception):
+    """プールから接続を取得できなかった場合の例外"""
+
+
+class PooledConnection:
+    """プール管理下の接続ラッパー
+
+    close() を呼ぶと実際には切断せずプールへ返却する。
+    それ以外の属性アクセスは元の接続へ委譲するため、
+    既存の ``conn = get_db_connection(); ...; conn.close()`` の書き方がそのまま使える。
+    """
+
+    def __init__(self, pool: "ConnectionPool", raw: Any):
+        self._pool = pool
+        self._raw = raw
+        self._released = False
+
+    @property
+    def raw(self) -> Any:
+        return self._raw
+
+    def close(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._pool.release(self._raw)
+
+    def cursor(self, *args, **kwargs) -> Any:
+        cursor = self._raw.cursor(*args, **kwargs)
+        if self._pool.cursor_wrapper is not None:
+            cursor = self._pool.cursor_wrapper(cursor)
+        return cursor
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._raw, name)
+
+    def __enter__(self) -> "PooledConnection":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class ConnectionPool:
+    """スレッドセーフな上限付きコネクションプール
+
+    - 接続はアプリ起動時に ``min_size`` 本まで作成し、最大 ``max_size`` 本まで増やす
+    - 空きが無い場合は ``timeout`` 秒まで返却を待ち、超えたら PoolTimeoutError
+    - ``ping_interval`` 秒以上アイドルだった接続は貸し出し前に ping で死活確認する
+    - ``cursor_wrapper`` を渡すと cursor() の戻り値をそれで包む（計測用）
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 5.0,
+        ping_interval: float = 30.0,
+        cursor_wrapper: Optional[Callable[[Any], Any]] = None,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        self._connect = connect
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.cursor_wrapper = cursor_wrapper
+
+        # (接続, 最終利用時刻) を LIFO で保持し、よく使われる接続を優先的に再利用する
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def idle_count(self) -> int:
+        return self._idle.qsize()
+
+    def open(self) -> None:
+        """最小接続数まで事前に接続を確立する"""
+        for _ in range(self.min_size - self._size):
+            if not self._reserve():
+                break
+            conn = self._create()
+            self._idle.put((conn, time.monotonic()))
+
+    def _reserve(self) -> bool:
+        """上限に達していなければ1本分の枠を確保する（確保後は必ず _create() を呼ぶ）"""
+        with self._lock:
+            if self._closed:
+                raise PoolTimeoutError("connection pool is closed")
+            if self._size >= self.max_size:
+                return False
+            self._size += 1
+            return True
+
+    def _create(self) -> Any:
+        """_reserve() で確保した枠で接続する（失敗したら枠を返す）"""
+        try:
+            return self._connect()
+        except BaseException:
+            with self._lock:
+                self._size -= 1
+            raise
+
+    def _discard(self, conn: Any) -> None:
+        with self._lock:
+            self._size -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_alive(self, conn: Any, last_used: float) -> bool:
+        if time.monotonic() - last_used < self.ping_interval:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """接続を借りる。使い終わったら close() で返却すること"""
+        wait = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + wait
+
+        while True:
+            if self._closed:
+                raise PoolTimeoutError("connection pool is closed")
+
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                conn = None
+
+            if conn is not None:
+                if self._is_alive(conn, last_used):
+                    return PooledConnection(self, conn)
+                self._discard(conn)
+                continue
+
+            # 枠の確保はロック内で行い、接続（時間がかかる）はロックの外で行う
+            if self._reserve():
+                return PooledConnection(self, self._create())
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PoolTimeoutError(
+                    f"timed out after {wait:.1f}s waiting for a database connection "
+                    f"(pool size {self.max_size})"
+                )
+            try:
+                conn, last_used = self._idle.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if self._is_alive(conn, last_used):
+                return PooledConnection(self, conn)
+            self._discard(conn)
+
+    def release(self, conn: Any) -> None:
+        """接続をプールへ戻す。未完了のトランザクションはロールバックする"""
+        if self._closed:
+            self._discard(conn)
+            return
+        try:
+            # 読み取りだけのリクエストでも暗黙のトランザクションが残るため、
+            # 次の利用者が古いスナップショットを見ないよう必ず終了させる
+            conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+        self._idle.put((conn, time.monotonic()))
+
+    def close(self) -> None:
+        """アイドル中の接続をすべて切断し、以降の貸し出しを止める"""
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
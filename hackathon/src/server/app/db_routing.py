@@ -0,0 +1,116 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+def replica_lag_seconds(cursor: Any) -> Optional[float]:
+    """レプリカの遅延秒数（レプリケーションが止まっていれば None、レプリカでなければ 0）"""
+    try:
+        cursor.execute("SHOW REPLICA STATUS")
+        column = "Seconds_Behind_Source"
+    except Exception:
+        # MySQL 8.0.22 より前
+        cursor.execute("SHOW SLAVE STATUS")
+        column = "Seconds_Behind_Master"
+    row = cursor.fetchone()
+    if not row:
+        return 0.0
+    lag = row.get(column)
+    return float(lag) if lag is not None else None
+
+
+class ReadYourWrites:
+    """書き込み直後の一定時間、そのユーザーの読み取りをプライマリへ向ける
+
+    プロセス内で保持するため、uvicorn を複数ワーカーで動かす場合は書き込みを受けたワーカーだけに効く。
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self._until: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, key: Hashable) -> None:
+        if self.window <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._until[key] = now + self.window
+            # 期限切れを掃除（件数が増えたときだけ）
+            if len(self._until) > 1024:
+                self._until = {k: until for k, until in self._until.items() if until > now}
+
+    def is_pinned(self, key: Hashable) -> bool:
+        with self._lock:
+            until = self._until.get(key)
+            if until is None:
+                return False
+            if until <= time.monotonic():
+                del self._until[key]
+                return False
+            return True
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            pinned = sum(1 for until in self._until.values() if until > now)
+        return {"window_seconds": self.window, "pinned_users": pinned}
+
+
+class ReplicaLagMonitor:
+    """レプリカの遅延を定期的に測り、読み取りに使ってよいかを判定する
+
+    - 遅延が ``max_lag`` 秒を超えた、レプリケーションが止まっている、接続できない場合は使わない
+    - 最後の測定から ``stale_after`` 秒以上経った場合も、状態が分からないため使わない
+    """
+
+    def __init__(self, measure: Callable[[], Optional[float]], max_lag: float, stale_after: float):
+        self._measure = measure
+        self.max_lag = max_lag
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._lag: Optional[float] = None
+        self._checked_at: Optional[float] = None
+        self._error: Optional[str] = None
+
+    def check(self) -> Optional[float]:
+        """遅延を測って記録する（接続できなければ使用不可として記録）"""
+        try:
+            lag = self._measure()
+            error = None if lag is not None else "replication is not running"
+        except Exception as e:
+            lag = None
+            error = str(e)
+        with self._lock:
+            self._lag = lag
+            self._error = error
+            self._checked_at = time.monotonic()
+        return lag
+
+    def mark_unavailable(self, error: Exception) -> None:
+        """接続に失敗したときに呼ぶ（次の測定までプライマリを使う）"""
+        with self._lock:
+            self._lag = None
+            self._error = str(error)
+            self._checked_at = time.monotonic()
+
+    def healthy(self) -> bool:
+        with self._lock:
+            if self._lag is None or self._checked_at is None:
+                return False
+            if time.monotonic() - self._checked_at > self.stale_after:
+                return False
+            return self._lag <= self.max_lag
+
+    def stats(self) -> dict:
+        with self._lock:
+            lag = self._lag
+            checked_at = self._checked_at
+            error = self._error
+        return {
+            "healthy": self.healthy(),
+            "lag_seconds": lag,
+            "max_lag_seconds": self.max_lag,
+            "checked_seconds_ago": round(time.monotonic() - checked_at, 1) if checked_at is not None else None,
+            "error": error,
+        }
@@ -0,0 +1,119 @@
+import asyncio
+import random
+import time
+from typing import Any, List, Optional
+
+from app.chat_budget import estimate_tokens
+
+
+class FakeUsage:
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeResponse:
+    """GenerateContentResponse と同じく .text / .candidates / .usage_metadata を持つ応答"""
+
+    def __init__(self, text: str, usage: Optional[FakeUsage] = None):
+        self.text = text
+        self.candidates: List[Any] = []
+        self.usage_metadata = usage
+
+
+class FakeStream:
+    """generate_content_async(stream=True) の戻り値の代わり（チャンクを順に返す）"""
+
+    def __init__(self, chunks: List[str], latency: float, usage: FakeUsage):
+        self._chunks = chunks
+        self._latency = latency
+        self.usage_metadata = usage
+
+    async def __aiter__(self):
+        delay = self._latency / max(len(self._chunks), 1)
+        for chunk in self._chunks:
+            await asyncio.sleep(delay)
+            yield FakeResponse(chunk)
+
+
+class FakeGenerativeModel:
+    """ネットワークに出ない GenerativeModel の代わり
+
+    ``latency`` 秒待ってから決まった形の応答を返し、``failure_rate`` の確率で例外を送出する。
+    request_options の timeout より latency が長ければ TimeoutError を送出する。
+    """
+
+    def __init__(self, model_name: str, system_instruction: str, latency: float = 0.0, failure_rate: float = 0.0):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    def _reply(self, contents: List[dict]) -> str:
+        message = contents[-1]["parts"][0]["text"] if contents else ""
+        return f"（テスト応答）「{message[:40]}」についてのおすすめです。未制覇の部位から気になるものを選んでみましょう。"
+
+    def _usage(self, contents: List[dict], reply: str) -> FakeUsage:
+        prompt = estimate_tokens(self.system_instruction) + sum(
+            estimate_tokens(part.get("text")) for content in contents for part in content["parts"]
+        )
+        return FakeUsage(prompt, estimate_tokens(reply))
+
+    def _delay(self, request_options: Optional[dict]) -> float:
+        """待つ秒数を返す。失敗させる場合は例外を送出する"""
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise RuntimeError("fake upstream error")
+        timeout = (request_options or {}).get("timeout")
+        if timeout is not None and self.latency > timeout:
+            return -timeout
+        return self.latency
+
+    def generate_content(self, contents: List[dict], request_options: Optional[dict] = None) -> FakeResponse:
+        delay = self._delay(request_options)
+        time.sleep(abs(delay))
+        if delay < 0:
+            raise TimeoutError("fake upstream timeout")
+        reply = self._reply(contents)
+        return FakeResponse(reply, self._usage(contents, reply))
+
+    async def generate_content_async(
+        self, contents: List[dict], stream: bool = False, request_options: Optional[dict] = None
+    ):
+        delay = self._delay(request_options)
+        if delay < 0:
+            await asyncio.sleep(-delay)
+            raise TimeoutError("fake upstream timeout")
+        reply = self._reply(contents)
+        usage = self._usage(contents, reply)
+        if stream:
+            chunks = [reply[i:i + 16] for i in range(0, len(reply), 16)]
+            return FakeStream(chunks, delay, usage)
+        await asyncio.sleep(delay)
+        return FakeResponse(reply, usage)
+
+
+class FakeGeminiRegistry:
+    """GeminiModelRegistry と同じインターフェースで FakeGenerativeModel を返す（GEMINI_FAKE=1）"""
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    @property
+    def is_configured(self) -> bool:
+        return True
+
+    def reload(self) -> bool:
+        return True
+
+    def get_model(self, model_name: str, system_prompt: str) -> FakeGenerativeModel:
+        return FakeGenerativeModel(model_name, system_prompt, self.latency, self.failure_rate)
+
+    def stats(self) -> dict:
+        return {
+            "configured": True,
+            "fake": True,
+            "latency": self.latency,
+            "failure_rate": self.failure_rate,
+        }
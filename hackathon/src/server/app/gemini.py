@@ -0,0 +1,96 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+
+class GeminiNotConfiguredError(Exception):
+    """APIキー未設定、またはSDK未インストールの場合の例外"""
+
+
+class GeminiModelRegistry:
+    """Gemini のクライアント設定と GenerativeModel を使い回すためのレジストリ
+
+    APIキーは初回利用時（またはアプリ起動時）に一度だけ解決し、reload() で読み直す。
+    モデルは (モデル名, システムプロンプトのハッシュ) ごとに保持し、
+    ユーザーごとのコンテキストでプロンプトが増え続けても ``max_models`` 件までに抑える。
+    """
+
+    def __init__(self, key_loader: Callable[[], Optional[str]], max_models: int = 64):
+        self._key_loader = key_loader
+        self.max_models = max_models
+        self._lock = threading.Lock()
+        self._genai: Any = None
+        self._api_key: Optional[str] = None
+        self._configured = False
+        self._resolved = False
+        self._error: Optional[str] = None
+        self._models: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+
+    @property
+    def is_configured(self) -> bool:
+        return self._configured
+
+    def _import_sdk(self) -> Any:
+        if self._genai is None:
+            try:
+                import google.generativeai as genai
+            except ImportError as exc:
+                raise GeminiNotConfiguredError(
+                    "google-generativeai package is not installed on the server."
+                ) from exc
+            self._genai = genai
+        return self._genai
+
+    def reload(self) -> bool:
+        """APIキーを読み直してSDKを再設定し、保持中のモデルを破棄する"""
+        with self._lock:
+            self._models.clear()
+            self._api_key = self._key_loader()
+            self._resolved = True
+            self._configured = False
+            if not self._api_key:
+                self._error = "GEMINI_API_KEY is not configured."
+                return False
+            try:
+                genai = self._import_sdk()
+            except GeminiNotConfiguredError as exc:
+                self._error = str(exc)
+                raise
+            genai.configure(api_key=self._api_key)
+            self._configured = True
+            self._error = None
+            return True
+
+    def _ensure_configured(self) -> None:
+        if self._configured:
+            return
+        # キーが見つからなかった場合も reload() が呼ばれるまで再探索しない
+        if self._resolved or not self.reload():
+            raise GeminiNotConfiguredError(self._error or "GEMINI_API_KEY is not configured.")
+
+    @staticmethod
+    def prompt_key(system_prompt: str) -> str:
+        return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+
+    def get_model(self, model_name: str, system_prompt: str) -> Any:
+        """(モデル名, システムプロンプト) に対応する GenerativeModel を返す"""
+        self._ensure_configured()
+        key = (model_name, self.prompt_key(system_prompt))
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                return model
+            model = self._genai.GenerativeModel(model_name, system_instruction=system_prompt)
+            self._models[key] = model
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+            return model
+
+    def stats(self) -> dict:
+        return {
+            "configured": self._configured,
+            "cached_models": len(self._models),
+            "max_models": self.max_models,
+        }
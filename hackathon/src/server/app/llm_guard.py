@@ -0,0 +1,188 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional
+
+
+class LLMUnavailableError(Exception):
+    """同時実行数の上限・タイムアウト・サーキットオープンで LLM を呼べなかった場合の例外"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CircuitBreaker:
+    """連続失敗でオープンし、一定時間後に1件だけ試行を通すサーキットブレーカー
+
+    - closed: 通常どおり呼び出す
+    - open: ``reset_timeout`` 秒間は呼び出さずに失敗させる
+    - half_open: 試行1件の成否で closed / open に戻る
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """成否が分からないまま終わった呼び出し（キャンセルなど）の試行枠を返す"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout": self.reset_timeout,
+            "rejected": self.rejected,
+        }
+
+
+class LLMGuard:
+    """LLM 呼び出しの同時実行数・待ち時間・呼び出し時間の上限とサーキットブレーカーをまとめたもの
+
+    同期エンドポイント（スレッドプール）とストリーミング（イベントループ）で同じ上限を共有する。
+    空きが ``queue_timeout`` 秒以内にできなければ LLMUnavailableError("busy") を送出する。
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        queue_timeout: float = 2.0,
+        call_timeout: float = 20.0,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.call_timeout = call_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency > 0 else None
+        self._in_flight = 0
+        self._counter_lock = threading.Lock()
+        self.busy_rejections = 0
+        self.timeouts = 0
+
+    def _enter(self) -> None:
+        with self._counter_lock:
+            self._in_flight += 1
+
+    def _exit(self) -> None:
+        with self._counter_lock:
+            self._in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    def _reject_busy(self) -> None:
+        with self._counter_lock:
+            self.busy_rejections += 1
+        raise LLMUnavailableError("busy")
+
+    def _check_breaker(self) -> None:
+        if not self.breaker.allow():
+            if self._slots is not None:
+                self._slots.release()
+            raise LLMUnavailableError("circuit_open")
+
+    @contextmanager
+    def slot(self):
+        """同期呼び出し用: 空きを待ってから中の処理を実行し、成否をブレーカーに記録する"""
+        if self._slots is not None and not self._slots.acquire(timeout=self.queue_timeout):
+            self._reject_busy()
+        self._check_breaker()
+        self._enter()
+        try:
+            yield
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # CancelledError / GeneratorExit（クライアント切断）は成否に数えないが、
+            # half_open の試行枠は必ず返す（返さないと以降の呼び出しがすべて拒否される）
+            self.breaker.release_trial()
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            self._exit()
+
+    @asynccontextmanager
+    async def async_slot(self):
+        """非同期呼び出し用: イベントループを止めずに空きを待つ"""
+        if self._slots is not None and not self._slots.acquire(blocking=False):
+            deadline = time.monotonic() + self.queue_timeout
+            while not self._slots.acquire(blocking=False):
+                if time.monotonic() >= deadline:
+                    self._reject_busy()
+                await asyncio.sleep(0.05)
+        self._check_breaker()
+        self._enter()
+        try:
+            yield
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # CancelledError / GeneratorExit（クライアント切断）は成否に数えないが、
+            # half_open の試行枠は必ず返す（返さないと以降の呼び出しがすべて拒否される）
+            self.breaker.release_trial()
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            self._exit()
+
+    def record_timeout(self) -> None:
+        with self._counter_lock:
+            self.timeouts += 1
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "queue_timeout": self.queue_timeout,
+            "call_timeout": self.call_timeout,
+            "busy_rejections": self.busy_rejections,
+            "timeouts": self.timeouts,
+            "circuit": self.breaker.stats(),
+        }
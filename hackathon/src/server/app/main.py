@@ -1,13 +1,64 @@
 import os
+import json
+import hashlib
+import signal
+import base64
+import asyncio
+import logging
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
 from typing import Optional, List, Literal, Dict
-from datetime import datetime
+from datetime import date, datetime
 from pathlib import Path as FilePath
 
+import aiomysql
+import orjson
 import pymysql
-from fastapi import FastAPI, Query, Path, HTTPException
+from fastapi import FastAPI, Query, Path, HTTPException, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
+from app.chat_budget import compact_summary, estimate_tokens, message_tokens, split_history_by_budget
+from app.chat_sessions import ChatSessionNotFound, create_chat_session_store
+from app.db_instrument import (
+    InstrumentedAsyncConnection,
+    InstrumentedCursor,
+    add_query_listener,
+)
+from app.db_pool import ConnectionPool
+from app.db_routing import ReadYourWrites, ReplicaLagMonitor, replica_lag_seconds
+from app.fake_gemini import FakeGeminiRegistry
+from app.gemini import GeminiModelRegistry, GeminiNotConfiguredError
+from app.llm_guard import CircuitBreaker, LLMGuard, LLMUnavailableError
+from app.metrics import MetricsRegistry
+from app.query_trace import record_query, trace_queries
+from app.queries import (
+    CONCIERGE_RECENT_SESSION_QUERY,
+    CONQUERED_PART_IDS_QUERY,
+    DASHBOARD_RECENT_RECORDS_QUERY,
+    DASHBOARD_SUMMARY_QUERY,
+    EATING_RECORDS_READ_BACK_QUERY,
+    PARTS_SELECT_QUERY,
+    RECOMMENDATION_PAIRS_QUERY,
+    SESSION_DETAIL_QUERY,
+    SESSIONS_COUNT_QUERY,
+    SESSIONS_LIST_KEYSET,
+    SESSIONS_LIST_QUERY,
+    USER_BY_GOOGLE_ID_QUERY,
+    USER_PROGRESS_BY_ANIMAL_QUERY,
+    USER_PROGRESS_QUERY,
+    in_placeholders,
+)
+from app.recommendations import RecommendationEngine, RecommendationModel
+from app.response_cache import SemanticResponseCache
+from app.shared_cache import UserResponseCache, create_shared_cache_backend
+from app.parts_cache import AnimalPartsCache, PartsSnapshot
+from app.ttl_cache import TTLCache
+from app.progress import ANIMAL_TYPES, PART_CATEGORIES, build_progress, conquest_rate, conquest_stats
+
 
 def get_env(name: str, default: Optional[str] = None) -> str:
     value = os.getenv(name, default)
@@ -21,9 +72,135 @@ DB_PORT = int(os.getenv("DB_PORT", "3306"))
 DB_USER = os.getenv("DB_USER", "app")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "app")
 DB_NAME = os.getenv("DB_NAME", "tabebui")
+# コネクションプール設定
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_POOL_PING_INTERVAL = float(os.getenv("DB_POOL_PING_INTERVAL", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# 読み取り専用のレプリカ（未設定なら読み取りもプライマリの DB_HOST へ）
+DB_READ_HOST = os.getenv("DB_READ_HOST", "")
+DB_READ_PORT = int(os.getenv("DB_READ_PORT", str(DB_PORT)))
+DB_READ_USER = os.getenv("DB_READ_USER", DB_USER)
+DB_READ_PASSWORD = os.getenv("DB_READ_PASSWORD", DB_PASSWORD)
+# レプリカの遅延がこの秒数を超えたら読み取りもプライマリへ
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "5"))
+# 食事記録の登録後、そのユーザーの読み取りをプライマリへ向ける秒数
+DB_READ_YOUR_WRITES_WINDOW = float(os.getenv("DB_READ_YOUR_WRITES_WINDOW", "10"))
+
+# 部位マスターのプロセス内キャッシュ有効期間（秒、0以下で無期限）
+PARTS_CACHE_TTL = float(os.getenv("PARTS_CACHE_TTL", "3600"))
+# 部位一覧APIのブラウザ/CDNキャッシュ有効期間（秒）
+PARTS_HTTP_MAX_AGE = int(os.getenv("PARTS_HTTP_MAX_AGE", "300"))
+# 部位の共起から作るおすすめモデルを作り直す間隔（秒、0以下なら定期更新しない）と、1回に返す件数の上限
+# モデルはワーカーごとに持つため、作り直し（eating_records の全件走査）はワーカー数 × 周期ごとに発生する。
+# ワーカー数を増やす場合は間隔も延ばすこと
+RECOMMENDATION_REFRESH_INTERVAL = float(os.getenv("RECOMMENDATION_REFRESH_INTERVAL", "600"))
+RECOMMENDATION_MAX_LIMIT = 20
+# 管理用エンドポイントの認証トークン（未設定なら管理用エンドポイントは無効）
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
 app = FastAPI(title="たべぶい API")
 
+# /metrics（Prometheus形式）で公開する計測値
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+metrics = MetricsRegistry()
+HTTP_REQUEST_DURATION = metrics.histogram(
+    "tabebui_http_request_duration_seconds", "HTTP request latency by route", ["method", "route"]
+)
+HTTP_REQUESTS = metrics.counter(
+    "tabebui_http_requests_total", "HTTP requests by route and status", ["method", "route", "status"]
+)
+DB_QUERY_DURATION = metrics.histogram(
+    "tabebui_db_query_duration_seconds", "SQL statement latency", ["statement"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+DB_QUERY_ROWS = metrics.histogram(
+    "tabebui_db_query_rows", "Rows returned or affected per SQL statement", ["statement"],
+    buckets=(0, 1, 5, 10, 50, 100, 500, 1000, 5000),
+)
+GEMINI_REQUEST_DURATION = metrics.histogram(
+    "tabebui_gemini_request_duration_seconds", "Gemini call latency by mode and outcome", ["mode", "outcome"]
+)
+GEMINI_TOKENS = metrics.counter(
+    "tabebui_gemini_tokens_total", "Gemini tokens reported by usage_metadata", ["type"]
+)
+DB_READ_ROUTES = metrics.counter(
+    "tabebui_db_read_connections_total", "Read-only connections by target and reason", ["target", "reason"]
+)
+
+
+def observe_query(statement: str, seconds: float, rows: int) -> None:
+    DB_QUERY_DURATION.observe(seconds, statement)
+    DB_QUERY_ROWS.observe(rows, statement)
+
+
+if METRICS_ENABLED:
+    add_query_listener(observe_query)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    if not METRICS_ENABLED:
+        return await call_next(request)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # ルートのテンプレート（/api/eating-sessions/{session_id} など）単位で集計する
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, request.method, route_path)
+        HTTP_REQUESTS.inc(request.method, route_path, str(status))
+
+
+# QUERY_DEBUG=1 でレスポンスに X-Query-Count / Server-Timing を付ける
+QUERY_DEBUG = os.getenv("QUERY_DEBUG", "0") == "1"
+# 1リクエストあたりのSQL発行数の目安（超えたら警告ログ、0で無効）
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "10"))
+query_logger = logging.getLogger("tabebui.query")
+
+add_query_listener(record_query)
+
+
+@app.middleware("http")
+async def trace_request_queries(request: Request, call_next):
+    with trace_queries() as trace:
+        response = await call_next(request)
+
+    if QUERY_DEBUG:
+        response.headers["X-Query-Count"] = str(trace.count)
+        response.headers["Server-Timing"] = trace.server_timing()
+    if QUERY_BUDGET > 0 and trace.count > QUERY_BUDGET:
+        route = getattr(request.scope.get("route"), "path", request.url.path)
+        query_logger.warning(
+            "query budget exceeded: %s %s issued %d queries (budget %d, %.1fms); repeated: %s",
+            request.method,
+            route,
+            trace.count,
+            QUERY_BUDGET,
+            trace.duration * 1000,
+            trace.repeated() or "none",
+        )
+    return response
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus のテキスト形式で計測値を返す（プロセス単位）"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(content=metrics.render(), media_type=MetricsRegistry.CONTENT_TYPE)
+
+
+# uvicorn はアプリのロガーを設定しないため、チャットのトークン使用量ログ用に設定する
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+chat_logger = logging.getLogger("tabebui.chat")
+
 
 # Pydantic models
 class AnimalPart(BaseModel):
@@ -45,6 +222,10 @@ class EatingRecordRequest(BaseModel):
     photo_url: Optional[str] = None
 
 
+class BulkEatingRecordRequest(BaseModel):
+    sessions: List[EatingRecordRequest]
+
+
 class EatingSessionResponse(BaseModel):
     id: int
     user_id: int
@@ -65,6 +246,129 @@ class EatingRecordResponse(BaseModel):
     created_at: datetime
 
 
+# 制覇状況・セッション一覧・ダッシュボードのレスポンス
+class PartProgressItem(BaseModel):
+    id: int
+    animal_type: str
+    part_category: str
+    part_name: str
+    part_name_jp: str
+    description: Optional[str] = None
+    difficulty_level: Optional[int] = None
+
+
+class ConqueredPartItem(PartProgressItem):
+    first_conquered_date: Optional[datetime] = None
+    last_eaten_date: Optional[datetime] = None
+    eat_count: int = 0
+    # 動物別の制覇状況のみ（訪問した店舗名のカンマ区切り）
+    restaurants: Optional[str] = None
+
+
+class CategoryProgress(BaseModel):
+    conquered: List[ConqueredPartItem]
+    unconquered: List[PartProgressItem]
+
+
+class ConquestStats(BaseModel):
+    conquered_count: int
+    total_count: int
+    conquest_rate: float
+
+
+class OverallProgressStats(BaseModel):
+    total_conquered: int
+    total_parts: int
+    overall_conquest_rate: float
+
+
+class UserProgressData(BaseModel):
+    progress: Dict[str, Dict[str, CategoryProgress]]
+    stats: Dict[str, ConquestStats]
+    overall_stats: OverallProgressStats
+    user_id: int
+
+
+class UserProgressResponse(BaseModel):
+    success: bool
+    data: UserProgressData
+
+
+class AnimalProgressStats(ConquestStats):
+    animal_type: str
+    category_stats: Dict[str, ConquestStats]
+
+
+class AnimalProgressData(BaseModel):
+    parts: Dict[str, CategoryProgress]
+    stats: AnimalProgressStats
+    user_id: int
+    animal_type: str
+
+
+class AnimalProgressResponse(BaseModel):
+    success: bool
+    data: AnimalProgressData
+
+
+class EatingSessionListItem(EatingSessionResponse):
+    parts_count: int
+    parts_list: Optional[str] = None
+
+
+class SessionPagination(BaseModel):
+    mode: str
+    per_page: int
+    page: Optional[int] = None
+    has_more: Optional[bool] = None
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+    total_pages: Optional[int] = None
+
+
+class EatingSessionListResponse(BaseModel):
+    success: bool
+    data: List[EatingSessionListItem]
+    pagination: SessionPagination
+
+
+class DashboardOverallStats(BaseModel):
+    conquered_parts: int
+    total_parts: int
+    conquest_rate: float
+
+
+class DashboardAnimalStats(BaseModel):
+    conquered: int
+    total: int
+    rate: float
+
+
+class DashboardActivityStats(BaseModel):
+    week_records: int
+    streak_days: int
+
+
+class DashboardRecentRecord(BaseModel):
+    part_name_jp: str
+    animal_type: str
+    restaurant_name: Optional[str] = None
+    eaten_at: datetime
+
+
+class DashboardStatsData(BaseModel):
+    overall_stats: DashboardOverallStats
+    animal_stats: Dict[str, DashboardAnimalStats]
+    activity_stats: DashboardActivityStats
+    recent_records: List[DashboardRecentRecord]
+    user_id: int
+
+
+class DashboardStatsResponse(BaseModel):
+    success: bool
+    data: DashboardStatsData
+
+
 DEFAULT_CONCIERGE_PROMPT = (
     """あなたは『たべぶい』アプリの食べ歩きコンシェルジュです。
 - 牛・豚・鶏それぞれの部位制覇を支援し、ユーザーの好みや進捗に合わせて案内します。
@@ -74,13 +378,62 @@ DEFAULT_CONCIERGE_PROMPT = (
     """
 )
 
-_CHAT_HISTORY_FALLBACK = 12
+_CHAT_HISTORY_FALLBACK = 40
 try:
     MAX_CHAT_HISTORY = int(os.getenv('CHAT_HISTORY_LIMIT', str(_CHAT_HISTORY_FALLBACK)))
 except ValueError:
     MAX_CHAT_HISTORY = _CHAT_HISTORY_FALLBACK
 
+# 送信する会話履歴のトークン予算と、それを超えた古い発言の要約のトークン予算（概算値、0で無制限/要約なし）
+_CHAT_HISTORY_TOKEN_BUDGET_FALLBACK = 1500
+try:
+    CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv('CHAT_HISTORY_TOKEN_BUDGET', str(_CHAT_HISTORY_TOKEN_BUDGET_FALLBACK)))
+except ValueError:
+    CHAT_HISTORY_TOKEN_BUDGET = _CHAT_HISTORY_TOKEN_BUDGET_FALLBACK
+
+_CHAT_SUMMARY_TOKEN_BUDGET_FALLBACK = 300
+try:
+    CHAT_SUMMARY_TOKEN_BUDGET = int(os.getenv('CHAT_SUMMARY_TOKEN_BUDGET', str(_CHAT_SUMMARY_TOKEN_BUDGET_FALLBACK)))
+except ValueError:
+    CHAT_SUMMARY_TOKEN_BUDGET = _CHAT_SUMMARY_TOKEN_BUDGET_FALLBACK
+
 GEMINI_MODEL_NAME = os.getenv('GEMINI_MODEL_NAME', 'gemini-1.5-flash')
+# サーバー側で保持する会話の保存先・有効秒数・最大会話数
+CHAT_SESSION_STORE = os.getenv('CHAT_SESSION_STORE', 'memory')
+CHAT_SESSION_TTL = float(os.getenv('CHAT_SESSION_TTL', '1800'))
+CHAT_SESSION_MAX = int(os.getenv('CHAT_SESSION_MAX', '10000'))
+
+# コンシェルジュ用ユーザーコンテキストのキャッシュ（件数上限・有効秒数）
+CONCIERGE_CONTEXT_CACHE_SIZE = int(os.getenv('CONCIERGE_CONTEXT_CACHE_SIZE', '1024'))
+CONCIERGE_CONTEXT_TTL = float(os.getenv('CONCIERGE_CONTEXT_TTL', '300'))
+
+# 制覇状況・ダッシュボードのレスポンスをワーカー間で共有するキャッシュ（none / redis / memory）
+# memory はプロセス内のみで共有も通知もワーカーをまたがないため、単一ワーカーでの動作確認用
+SHARED_CACHE_BACKEND = os.getenv('SHARED_CACHE_BACKEND', 'none')
+SHARED_CACHE_URL = os.getenv('SHARED_CACHE_URL', 'redis://localhost:6379/0')
+USER_RESPONSE_CACHE_TTL = float(os.getenv('USER_RESPONSE_CACHE_TTL', '300'))
+# 各ワーカーのメモリに版数・本体を持つ秒数（無効化の通知を取りこぼした場合の上限）
+USER_RESPONSE_CACHE_LOCAL_TTL = float(os.getenv('USER_RESPONSE_CACHE_LOCAL_TTL', '5'))
+
+# よくある質問への応答キャッシュ（類似度のしきい値・有効秒数・件数上限、0件で無効）
+CHAT_RESPONSE_CACHE_THRESHOLD = float(os.getenv('CHAT_RESPONSE_CACHE_THRESHOLD', '0.75'))
+CHAT_RESPONSE_CACHE_TTL = float(os.getenv('CHAT_RESPONSE_CACHE_TTL', '3600'))
+CHAT_RESPONSE_CACHE_SIZE = int(os.getenv('CHAT_RESPONSE_CACHE_SIZE', '2048'))
+
+# システムプロンプトごとに保持する GenerativeModel の上限
+GEMINI_MODEL_CACHE_SIZE = int(os.getenv('GEMINI_MODEL_CACHE_SIZE', '64'))
+
+# Gemini 呼び出しの同時実行数・空き待ち秒数・1回の呼び出し秒数の上限
+GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', '8'))
+GEMINI_QUEUE_TIMEOUT = float(os.getenv('GEMINI_QUEUE_TIMEOUT', '2'))
+GEMINI_CALL_TIMEOUT = float(os.getenv('GEMINI_CALL_TIMEOUT', '20'))
+# 連続失敗でサーキットを開く回数と、開いてから再試行するまでの秒数（0回で無効）
+GEMINI_CIRCUIT_FAILURES = int(os.getenv('GEMINI_CIRCUIT_FAILURES', '5'))
+GEMINI_CIRCUIT_RESET = float(os.getenv('GEMINI_CIRCUIT_RESET', '30'))
+# 1 にすると Gemini を呼ばずにローカルの擬似モデルで応答する（負荷試験・動作確認用）
+GEMINI_FAKE = os.getenv('GEMINI_FAKE', '0') == '1'
+GEMINI_FAKE_LATENCY = float(os.getenv('GEMINI_FAKE_LATENCY', '0.5'))
+GEMINI_FAKE_FAILURE_RATE = float(os.getenv('GEMINI_FAKE_FAILURE_RATE', '0'))
 
 
 ENV_FALLBACK_KEY = 'gemini-api-key'
@@ -128,69 +481,112 @@ def load_gemini_api_key() -> Optional[str]:
     return None
 
 
+RECENT_MEAL_HEADER = "【最近の食事】"
+
+concierge_context_cache = TTLCache(maxsize=CONCIERGE_CONTEXT_CACHE_SIZE, ttl=CONCIERGE_CONTEXT_TTL)
+
+
 def build_concierge_context(user_id: int) -> Optional[str]:
-    """ユーザーの制覇状況などをGeminiへの文脈として整形"""
+    """ユーザーの制覇状況などをGeminiへの文脈として整形（食事記録の登録まではキャッシュを使う）"""
+    context = concierge_context_cache.get(user_id)
+    if context is not None:
+        return context
+    context = _build_concierge_context(user_id)
+    if context is not None:
+        concierge_context_cache.set(user_id, context)
+    return context
+
+
+user_response_cache = UserResponseCache(
+    create_shared_cache_backend(SHARED_CACHE_BACKEND, SHARED_CACHE_URL),
+    ttl=USER_RESPONSE_CACHE_TTL,
+    local_ttl=USER_RESPONSE_CACHE_LOCAL_TTL,
+)
+# 他のワーカーで記録が登録された場合も、通知を受けてこのワーカーのコンテキストを破棄する
+user_response_cache.add_invalidation_listener(concierge_context_cache.pop)
+
+
+def invalidate_user_caches(user_id: int) -> None:
+    """ユーザーの記録が変わったときに、そのユーザーのキャッシュを破棄する（全ワーカーへ通知）"""
+    user_response_cache.invalidate(user_id)
+
+
+async def run_shared_cache(func, *args):
+    """共有キャッシュの操作を実行（Redisなどネットワーク越しならスレッドプールで）"""
+    if user_response_cache.blocking:
+        return await run_in_threadpool(func, *args)
+    return func(*args)
+
+
+def cached_response_db_connection(user_id: int, cache_key: Optional[str]):
+    """共有キャッシュに保存するレスポンスはプライマリから読む
+
+    読み取りの振り分け（read_your_writes）はワーカーごとのため、書き込みを受けていないワーカーが
+    遅延したレプリカから読んだ古い内容を新しい版数で保存し、全ワーカーに配ってしまうのを防ぐ。
+    """
+    if cache_key is not None:
+        return get_async_db_connection()
+    return get_async_read_db_connection(user_id)
+
+
+def user_json_response(body: bytes, cached: bool) -> Response:
+    return Response(content=body, media_type="application/json", headers={"X-Cache": "HIT" if cached else "MISS"})
+
+
+@app.on_event("startup")
+def start_user_response_cache():
     try:
-        conn = get_db_connection()
+        user_response_cache.start()
+    except Exception as e:
+        logging.getLogger("tabebui.cache").warning("shared cache subscription failed: %s", e)
+
+
+@app.on_event("shutdown")
+def close_user_response_cache():
+    user_response_cache.close()
+
+
+def _build_concierge_context(user_id: int) -> Optional[str]:
+    """DBから制覇状況を読み込みコンテキスト文字列を組み立てる"""
+    try:
+        parts = load_animal_parts()
+        conn = get_read_db_connection(user_id)
     except Exception:
         return None
 
     try:
         with conn.cursor() as cur:
             cur.execute(
-                """
-                SELECT animal_type, COUNT(*) AS total
-                FROM animal_parts
-                GROUP BY animal_type
-                """
-            )
-            totals = {row["animal_type"]: row["total"] for row in cur.fetchall()}
-
-            cur.execute(
-                """
-                SELECT ap.animal_type, COUNT(DISTINCT ap.id) AS eaten
-                FROM eating_records er
-                JOIN animal_parts ap ON ap.id = er.animal_part_id
-                WHERE er.user_id = %s
-                GROUP BY ap.animal_type
-                """,
+                CONQUERED_PART_IDS_QUERY,
                 (user_id,)
             )
-            eaten = {row["animal_type"]: row["eaten"] for row in cur.fetchall()}
+            eaten_ids = {row["animal_part_id"] for row in cur.fetchall()}
 
-            cur.execute(
-                """
-                SELECT restaurant_name, eaten_at
-                FROM eating_sessions
-                WHERE user_id = %s
-                ORDER BY eaten_at DESC, created_at DESC
-                LIMIT 1
-                """,
-                (user_id,),
-            )
+            cur.execute(CONCIERGE_RECENT_SESSION_QUERY, (user_id,))
             recent_session = cur.fetchone()
-
-            cur.execute(
-                """
-                SELECT ap.part_name_jp, ap.animal_type
-                FROM animal_parts ap
-                LEFT JOIN eating_records er
-                    ON er.animal_part_id = ap.id AND er.user_id = %s
-                WHERE er.id IS NULL
-                ORDER BY ap.difficulty_level DESC, ap.id
-                LIMIT 5
-                """,
-                (user_id,),
-            )
-            missing_parts = cur.fetchall()
     except Exception:
         return None
     finally:
         conn.close()
 
+    totals = parts.totals_by_type()
     if not totals:
         return None
 
+    eaten: Dict[str, int] = {}
+    for part_id in eaten_ids:
+        part = parts.by_id.get(part_id)
+        if part:
+            eaten[part["animal_type"]] = eaten.get(part["animal_type"], 0) + 1
+
+    missing_parts = recommend_parts(parts, eaten_ids, limit=5)
+    if missing_parts is None:
+        # おすすめモデルの作成前は難易度の高い順
+        missing_parts = sorted(
+            (part for part in parts.rows if part["id"] not in eaten_ids),
+            key=lambda part: (-part["difficulty_level"], part["id"]),
+        )[:5]
+
     progress_lines = []
     for animal_type, total in totals.items():
         label = ANIMAL_LABELS.get(animal_type, animal_type)
@@ -212,13 +608,17 @@ def build_concierge_context(user_id: int) -> Optional[str]:
         context_lines.append("【未制覇で提案したい部位候補】")
         for row in missing_parts:
             label = ANIMAL_LABELS.get(row["animal_type"], row["animal_type"])
-            context_lines.append(f"- {label}: {row['part_name_jp']}")
+            related = row.get("related_part")
+            if related:
+                context_lines.append(f"- {label}: {row['part_name_jp']}（{related['part_name_jp']}と一緒に食べられることが多い）")
+            else:
+                context_lines.append(f"- {label}: {row['part_name_jp']}")
 
     if recent_session:
         restaurant = recent_session.get("restaurant_name") or "不明な店舗"
         eaten_at = recent_session.get("eaten_at")
         date_label = eaten_at.strftime("%Y-%m-%d") if eaten_at else "訪問日不明"
-        context_lines.append("【最近の食事】")
+        context_lines.append(RECENT_MEAL_HEADER)
         context_lines.append(f"- {date_label} に {restaurant} を訪問")
 
     return "\n".join(context_lines) if context_lines else None
@@ -231,6 +631,9 @@ class ChatMessage(BaseModel):
 
 class ChatRequest(BaseModel):
     message: str
+    # 会話ID（サーバー側で履歴を保持）。省略時は新しい会話を開始する
+    conversation_id: Optional[str] = None
+    # 互換用: conversation_id を使わないクライアントは履歴全体を送る
     history: List[ChatMessage] = []
     system_prompt: Optional[str] = None
 
@@ -282,7 +685,7 @@ def create_or_update_user(user_request: UserCreateRequest):
         try:
             with conn.cursor() as cur:
                 # 既存ユーザーをチェック
-                cur.execute("SELECT * FROM users WHERE google_id = %s", (user_request.google_id,))
+                cur.execute(USER_BY_GOOGLE_ID_QUERY, (user_request.google_id,))
                 existing_user = cur.fetchone()
 
                 if existing_user:
@@ -304,7 +707,7 @@ def create_or_update_user(user_request: UserCreateRequest):
                     conn.commit()
 
                     # 更新されたユーザー情報を取得
-                    cur.execute("SELECT * FROM users WHERE google_id = %s", (user_request.google_id,))
+                    cur.execute(USER_BY_GOOGLE_ID_QUERY, (user_request.google_id,))
                     user = cur.fetchone()
 
                     return {
@@ -327,7 +730,7 @@ def create_or_update_user(user_request: UserCreateRequest):
                     conn.commit()
 
                     # 作成されたユーザー情報を取得
-                    cur.execute("SELECT * FROM users WHERE google_id = %s", (user_request.google_id,))
+                    cur.execute(USER_BY_GOOGLE_ID_QUERY, (user_request.google_id,))
                     user = cur.fetchone()
 
                     return {
@@ -348,7 +751,7 @@ def get_user_by_google_id(google_id: str):
         conn = get_db_connection()
         try:
             with conn.cursor() as cur:
-                cur.execute("SELECT * FROM users WHERE google_id = %s", (google_id,))
+                cur.execute(USER_BY_GOOGLE_ID_QUERY, (google_id,))
                 user = cur.fetchone()
 
                 if not user:
@@ -369,18 +772,11 @@ def get_user_by_google_id(google_id: str):
 @app.get("/db-version")
 def db_version():
     try:
-        conn = pymysql.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            connect_timeout=3,
-        )
+        conn = get_db_connection()
         try:
             with conn.cursor() as cur:
-                cur.execute("SELECT VERSION()")
-                version = cur.fetchone()[0]
+                cur.execute("SELECT VERSION() AS version")
+                version = cur.fetchone()["version"]
         finally:
             conn.close()
         return {"connected": True, "version": version}
@@ -389,282 +785,1197 @@ def db_version():
 
 
 
-def get_db_connection():
-    """データベース接続を取得"""
+def _connect_db(host: str = DB_HOST, port: int = DB_PORT, user: str = DB_USER, password: str = DB_PASSWORD):
+    """プールに補充する新しい接続を作成"""
     return pymysql.connect(
-        host=DB_HOST,
-        port=DB_PORT,
-        user=DB_USER,
-        password=DB_PASSWORD,
+        host=host,
+        port=port,
+        user=user,
+        password=password,
         database=DB_NAME,
         connect_timeout=3,
         cursorclass=pymysql.cursors.DictCursor
     )
 
 
+def _connect_read_db():
+    return _connect_db(DB_READ_HOST, DB_READ_PORT, DB_READ_USER, DB_READ_PASSWORD)
 
-def call_gemini_api(
-    message: str,
-    history: List[ChatMessage],
-    system_prompt: Optional[str] = None,
-    extra_context: Optional[str] = None,
-):
-    """Gemini APIを呼び出して応答を生成"""
-    api_key = load_gemini_api_key()
-    if not api_key:
-        raise HTTPException(status_code=500, detail="GEMINI_API_KEY is not configured.")
 
-    try:
-        import google.generativeai as genai
-    except ImportError as exc:
-        raise HTTPException(
-            status_code=500,
-            detail="google-generativeai package is not installed on the server."
-        ) from exc
+def _create_db_pool(connect) -> ConnectionPool:
+    return ConnectionPool(
+        connect,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_SIZE,
+        timeout=DB_POOL_TIMEOUT,
+        ping_interval=DB_POOL_PING_INTERVAL,
+        cursor_wrapper=InstrumentedCursor,
+    )
 
-    prompt = system_prompt or DEFAULT_CONCIERGE_PROMPT
-    if extra_context:
-        prompt = f"{prompt}\n\n### ユーザーコンテキスト\n{extra_context}"
 
-    genai.configure(api_key=api_key)
+db_pool = _create_db_pool(_connect_db)
+read_db_pool: Optional[ConnectionPool] = _create_db_pool(_connect_read_db) if DB_READ_HOST else None
 
-    model = genai.GenerativeModel(GEMINI_MODEL_NAME, system_instruction=prompt)
 
-    sanitized_history = [msg for msg in history if msg.role in {"user", "assistant"}]
-    trimmed_history = sanitized_history[-MAX_CHAT_HISTORY:] if MAX_CHAT_HISTORY > 0 else sanitized_history
+@app.on_event("startup")
+def open_db_pool():
+    for pool in (db_pool, read_db_pool):
+        if pool is None:
+            continue
+        try:
+            pool.open()
+        except Exception:
+            # DB起動待ちの間もAPI自体は立ち上げ、最初のリクエスト時に接続する
+            pass
+
+
+@app.on_event("shutdown")
+def close_db_pool():
+    db_pool.close()
+    if read_db_pool is not None:
+        read_db_pool.close()
+
+
+def get_db_connection():
+    """プールからデータベース接続を取得（close()でプールへ返却）"""
+    return db_pool.acquire()
 
-    contents = []
-    for past in trimmed_history:
-        role = "user" if past.role == "user" else "model"
-        contents.append({"role": role, "parts": [{"text": past.content}]})
-    contents.append({"role": "user", "parts": [{"text": message}]})
 
+def measure_replica_lag() -> Optional[float]:
+    conn = read_db_pool.acquire()
     try:
-        response = model.generate_content(contents)
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f"Gemini API error: {exc}") from exc
+        with conn.cursor() as cur:
+            return replica_lag_seconds(cur)
+    finally:
+        conn.close()
 
-    text = getattr(response, "text", None)
-    if not text and getattr(response, "candidates", None):
-        for candidate in response.candidates:
-            candidate_content = getattr(candidate, "content", None)
-            if not candidate_content:
-                continue
-            parts = getattr(candidate_content, "parts", None)
-            if not parts:
-                continue
-            for part in parts:
-                part_text = getattr(part, "text", None)
-                if part_text:
-                    text = part_text
-                    break
-            if text:
-                break
 
-    if not text:
-        raise HTTPException(status_code=500, detail="Gemini API returned no content.")
+replica_monitor = ReplicaLagMonitor(
+    measure_replica_lag,
+    max_lag=DB_REPLICA_MAX_LAG,
+    # 測定が2周期以上途切れたら状態不明としてプライマリへ
+    stale_after=DB_REPLICA_CHECK_INTERVAL * 2 + DB_POOL_TIMEOUT,
+)
+read_your_writes = ReadYourWrites(DB_READ_YOUR_WRITES_WINDOW)
 
-    usage = getattr(response, "usage_metadata", None)
-    return text.strip(), trimmed_history, usage
 
+def read_route(user_id: Optional[int] = None) -> str:
+    """読み取りの接続先を決める（"replica" 以外はプライマリへ向ける理由）"""
+    if read_db_pool is None:
+        return "no_replica"
+    if user_id is not None and read_your_writes.is_pinned(user_id):
+        return "read_your_writes"
+    if not replica_monitor.healthy():
+        return "replica_unhealthy"
+    return "replica"
 
-@app.post("/api/chat/message", response_model=dict)
-def post_chat_message(request: ChatRequest, user_id: int = Query(..., description="ログインユーザーのID")):
-    """Geminiを利用したチャット応答を生成"""
-    if not request.message.strip():
-        raise HTTPException(status_code=400, detail="message must not be empty.")
 
-    concierge_context = build_concierge_context(user_id=user_id)
+def get_read_db_connection(user_id: Optional[int] = None):
+    """読み取り専用の処理用の接続（レプリカが使えなければプライマリ）
 
-    reply, trimmed_history, usage = call_gemini_api(
-        message=request.message,
-        history=request.history,
-        system_prompt=request.system_prompt,
-        extra_context=concierge_context,
-    )
+    user_id を渡すと、そのユーザーが直前に書き込んでいればプライマリから読む。
+    """
+    reason = read_route(user_id)
+    if reason == "replica":
+        try:
+            conn = read_db_pool.acquire()
+            DB_READ_ROUTES.inc("replica", reason)
+            return conn
+        except Exception as e:
+            replica_monitor.mark_unavailable(e)
+            reason = "replica_unavailable"
+    DB_READ_ROUTES.inc("primary", reason)
+    return db_pool.acquire()
 
-    updated_history = [msg.dict() for msg in trimmed_history]
-    latest_user = updated_history[-1] if updated_history else None
-    if not (
-        latest_user
-        and latest_user.get("role") == "user"
-        and latest_user.get("content") == request.message
-    ):
-        updated_history.append({"role": "user", "content": request.message})
 
-    updated_history.append({"role": "assistant", "content": reply})
+# asyncio用のコネクションプール（async def のエンドポイントから利用）
+async_db_pool: Optional[aiomysql.Pool] = None
+async_read_db_pool: Optional[aiomysql.Pool] = None
+_async_db_pool_lock = asyncio.Lock()
 
-    data = {
-        "reply": reply,
-        "model": GEMINI_MODEL_NAME,
-        "history": updated_history,
-    }
 
-    if usage:
-        data["usage"] = {
-            "prompt_tokens": getattr(usage, "prompt_token_count", None),
-            "candidates_tokens": getattr(usage, "candidates_token_count", None),
-            "total_tokens": getattr(usage, "total_token_count", None),
-        }
+async def _create_async_db_pool(host: str, port: int, user: str, password: str) -> aiomysql.Pool:
+    return await aiomysql.create_pool(
+        host=host,
+        port=port,
+        user=user,
+        password=password,
+        db=DB_NAME,
+        connect_timeout=3,
+        minsize=DB_POOL_MIN_SIZE,
+        maxsize=DB_POOL_SIZE,
+        pool_recycle=DB_POOL_RECYCLE,
+        # 読み取り後に暗黙のトランザクションを残さないよう autocommit で運用し、
+        # 書き込み時のみ明示的に begin/commit する
+        autocommit=True,
+        cursorclass=aiomysql.DictCursor,
+    )
 
-    return {
-        "success": True,
-        "data": data,
-    }
 
+async def get_async_db_pool() -> aiomysql.Pool:
+    """asyncプールを取得（未作成なら作成）"""
+    global async_db_pool
+    if async_db_pool is not None:
+        return async_db_pool
+    async with _async_db_pool_lock:
+        if async_db_pool is None:
+            async_db_pool = await _create_async_db_pool(DB_HOST, DB_PORT, DB_USER, DB_PASSWORD)
+    return async_db_pool
+
+
+async def get_async_read_db_pool() -> aiomysql.Pool:
+    """レプリカ用のasyncプールを取得（未作成なら作成）"""
+    global async_read_db_pool
+    if async_read_db_pool is not None:
+        return async_read_db_pool
+    async with _async_db_pool_lock:
+        if async_read_db_pool is None:
+            async_read_db_pool = await _create_async_db_pool(
+                DB_READ_HOST, DB_READ_PORT, DB_READ_USER, DB_READ_PASSWORD
+            )
+    return async_read_db_pool
 
-@app.get("/api/animal-parts", response_model=dict)
-def get_animal_parts(
-    animal_type: Optional[str] = Query(None, regex="^(beef|pork|chicken)$"),
-    part_category: Optional[str] = Query(None, regex="^(meat|organ)$")
-):
-    """部位マスターデータを取得"""
+
+@asynccontextmanager
+async def get_async_db_connection():
+    """asyncプールから接続を借りる（ブロックの終わりで返却）"""
+    pool = await get_async_db_pool()
+    conn = await asyncio.wait_for(pool.acquire(), timeout=DB_POOL_TIMEOUT)
     try:
-        conn = get_db_connection()
+        yield InstrumentedAsyncConnection(conn)
+    finally:
+        pool.release(conn)
+
+
+@asynccontextmanager
+async def get_async_read_db_connection(user_id: Optional[int] = None):
+    """get_read_db_connection の async 版"""
+    reason = read_route(user_id)
+    if reason == "replica":
         try:
-            with conn.cursor() as cur:
-                query = "SELECT id, animal_type, part_category, part_name, part_name_jp, description, difficulty_level FROM animal_parts WHERE 1=1"
-                params = []
+            pool = await get_async_read_db_pool()
+            conn = await asyncio.wait_for(pool.acquire(), timeout=DB_POOL_TIMEOUT)
+        except Exception as e:
+            replica_monitor.mark_unavailable(e)
+            reason = "replica_unavailable"
+        else:
+            DB_READ_ROUTES.inc("replica", reason)
+            try:
+                yield InstrumentedAsyncConnection(conn)
+            finally:
+                pool.release(conn)
+            return
+    DB_READ_ROUTES.inc("primary", reason)
+    async with get_async_db_connection() as conn:
+        yield conn
+
+
+@app.on_event("startup")
+async def open_async_db_pool():
+    try:
+        await get_async_db_pool()
+    except Exception:
+        pass
+    if DB_READ_HOST:
+        try:
+            await get_async_read_db_pool()
+        except Exception:
+            pass
 
-                if animal_type:
-                    query += " AND animal_type = %s"
-                    params.append(animal_type)
 
-                if part_category:
-                    query += " AND part_category = %s"
-                    params.append(part_category)
+@app.on_event("shutdown")
+async def close_async_db_pool():
+    global async_db_pool, async_read_db_pool
+    for pool in (async_db_pool, async_read_db_pool):
+        if pool is not None:
+            pool.close()
+            await pool.wait_closed()
+    async_db_pool = None
+    async_read_db_pool = None
 
-                query += " ORDER BY animal_type, part_category, difficulty_level, id"
 
-                cur.execute(query, params)
-                results = cur.fetchall()
+_replica_check_task: Optional[asyncio.Task] = None
 
-                return {
-                    "success": True,
-                    "data": results
-                }
-        finally:
-            conn.close()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+async def check_replica_periodically():
+    while True:
+        await run_in_threadpool(replica_monitor.check)
+        await asyncio.sleep(DB_REPLICA_CHECK_INTERVAL)
 
-@app.get("/api/animal-parts/{animal_type}", response_model=dict)
-def get_animal_parts_by_type(
-    animal_type: str = Path(..., regex="^(beef|pork|chicken)$"),
-    part_category: Optional[str] = Query(None, regex="^(meat|organ)$")
-):
-    """動物別の部位一覧を取得"""
-    try:
-        conn = get_db_connection()
-        try:
-            with conn.cursor() as cur:
-                query = "SELECT id, animal_type, part_category, part_name, part_name_jp, description, difficulty_level FROM animal_parts WHERE animal_type = %s"
-                params = [animal_type]
 
-                if part_category:
-                    query += " AND part_category = %s"
-                    params.append(part_category)
+@app.on_event("startup")
+async def start_replica_check():
+    global _replica_check_task
+    if read_db_pool is not None:
+        _replica_check_task = asyncio.create_task(check_replica_periodically())
 
-                query += " ORDER BY part_category, difficulty_level, id"
 
-                cur.execute(query, params)
-                results = cur.fetchall()
+@app.on_event("shutdown")
+async def stop_replica_check():
+    if _replica_check_task is not None:
+        _replica_check_task.cancel()
 
-                return {
-                    "success": True,
-                    "data": results
-                }
-        finally:
-            conn.close()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
+parts_cache = AnimalPartsCache(ttl=PARTS_CACHE_TTL)
 
+# eating_records 登録時に user_part_progress を加算更新する
+USER_PART_PROGRESS_UPSERT = """
+INSERT INTO user_part_progress (
+    user_id, animal_part_id, first_conquered_at, last_eaten_at, eat_count
+) VALUES (%s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+    first_conquered_at = LEAST(first_conquered_at, VALUES(first_conquered_at)),
+    last_eaten_at = GREATEST(last_eaten_at, VALUES(last_eaten_at)),
+    eat_count = eat_count + VALUES(eat_count)
+"""
 
-@app.post("/api/eating-records", response_model=dict)
-def create_eating_records(record_request: EatingRecordRequest, user_id: int = Query(..., description="ログインユーザーのID")):
-    """複数の部位を一度にセッションとして記録"""
-    if not record_request.animal_part_ids:
-        raise HTTPException(status_code=400, detail="部位IDが指定されていません")
 
+def load_animal_parts() -> PartsSnapshot:
+    """部位マスターをキャッシュから取得（期限切れならDBから読み直す）"""
+    snapshot = parts_cache.get()
+    if snapshot is not None:
+        return snapshot
+    conn = get_read_db_connection()
     try:
-        conn = get_db_connection()
-        session_id = None
-        created_records = []
+        with conn.cursor() as cur:
+            cur.execute(PARTS_SELECT_QUERY)
+            rows = cur.fetchall()
+    finally:
+        conn.close()
+    return parts_cache.set(rows)
 
-        try:
-            with conn.cursor() as cur:
-                # 部位IDの存在確認
-                placeholders = ",".join(["%s"] * len(record_request.animal_part_ids))
-                cur.execute(f"SELECT id FROM animal_parts WHERE id IN ({placeholders})", record_request.animal_part_ids)
-                existing_parts = [row["id"] for row in cur.fetchall()]
 
-                invalid_ids = set(record_request.animal_part_ids) - set(existing_parts)
-                if invalid_ids:
-                    raise HTTPException(status_code=400, detail=f"存在しない部位ID: {list(invalid_ids)}")
+async def load_animal_parts_async(from_primary: bool = False) -> PartsSnapshot:
+    """load_animal_parts の async 版（from_primary=True ならレプリカを使わない）"""
+    snapshot = parts_cache.get()
+    if snapshot is not None:
+        return snapshot
+    connection = get_async_db_connection() if from_primary else get_async_read_db_connection()
+    async with connection as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(PARTS_SELECT_QUERY)
+            rows = await cur.fetchall()
+    return parts_cache.set(rows)
 
-                # 認証されたユーザーIDを使用
-                eaten_at = record_request.eaten_at or datetime.now()
-
-                # 食事セッションを作成
-                session_insert_query = """
-                INSERT INTO eating_sessions (
-                    user_id, restaurant_name, eaten_at, memo, rating, photo_url
-                ) VALUES (%s, %s, %s, %s, %s, %s)
-                """
-
-                cur.execute(session_insert_query, (
-                    user_id,
-                    record_request.restaurant_name,
-                    eaten_at,
-                    record_request.memo,
-                    record_request.rating,
-                    record_request.photo_url
-                ))
-
-                session_id = cur.lastrowid
-
-                # 各部位に対して記録を作成
-                for part_id in record_request.animal_part_ids:
-                    record_insert_query = """
-                    INSERT INTO eating_records (
-                        user_id, animal_part_id, session_id, eaten_at
-                    ) VALUES (%s, %s, %s, %s)
-                    """
 
-                    cur.execute(record_insert_query, (
-                        user_id,
-                        part_id,
-                        session_id,
-                        eaten_at
-                    ))
+async def reload_animal_parts_cache() -> PartsSnapshot:
+    """部位マスターを破棄してDBから読み直す（未知の部位IDを受け取ったときにも呼ばれるため軽い処理に留める）"""
+    parts_cache.invalidate()
+    # マスター更新直後はレプリカに反映されていない場合があるためプライマリから読む
+    return await load_animal_parts_async(from_primary=True)
 
-                    record_id = cur.lastrowid
-                    created_records.append({
-                        "id": record_id,
-                        "animal_part_id": part_id,
-                        "session_id": session_id,
-                        "eaten_at": eaten_at.isoformat(),
-                        "created_at": datetime.now().isoformat()
-                    })
 
-                conn.commit()
+async def rebuild_parts_derived_caches() -> None:
+    """部位マスターを元に組み立てたコンテキスト・応答キャッシュ・おすすめを作り直す
 
-                return {
-                    "success": True,
-                    "data": {
-                        "session_id": session_id,
-                        "records": created_records
-                    }
-                }
+    おすすめの再構築は eating_records の全件走査になるため、管理用の再読み込みからのみ呼ぶ。
+    """
+    concierge_context_cache.clear()
+    chat_response_cache.clear()
+    try:
+        await run_in_threadpool(recommendation_engine.refresh)
+    except Exception:
+        pass
 
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+
+@app.on_event("startup")
+async def warm_animal_parts_cache():
+    try:
+        await load_animal_parts_async()
+    except Exception:
+        # 読み込めなかった場合は最初のリクエストで再試行する
+        pass
+
+
+def build_recommendation_model() -> RecommendationModel:
+    """全ユーザーの食事記録から部位の共起を集計してモデルを作る"""
+    parts = load_animal_parts()
+    conn = get_read_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(RECOMMENDATION_PAIRS_QUERY)
+            pairs = []
+            while True:
+                rows = cur.fetchmany(10000)
+                if not rows:
+                    break
+                pairs.extend((row["session_id"], row["animal_part_id"]) for row in rows)
+    finally:
+        conn.close()
+    return RecommendationModel.build([part["id"] for part in parts.rows], pairs)
+
+
+recommendation_engine = RecommendationEngine(build_recommendation_model, RECOMMENDATION_REFRESH_INTERVAL)
+_recommendation_refresh_task: Optional[asyncio.Task] = None
+
+
+async def refresh_recommendations_periodically():
+    while True:
+        try:
+            await run_in_threadpool(recommendation_engine.refresh)
+        except Exception:
+            # DB未起動などで失敗した場合は次の周期で再試行する
+            pass
+        await asyncio.sleep(RECOMMENDATION_REFRESH_INTERVAL)
+
+
+@app.on_event("startup")
+async def start_recommendation_refresh():
+    global _recommendation_refresh_task
+    if RECOMMENDATION_REFRESH_INTERVAL <= 0:
+        # 最初のリクエスト時に作成し、以降は管理用の再読み込みでのみ作り直す
+        return
+    _recommendation_refresh_task = asyncio.create_task(refresh_recommendations_periodically())
+
+
+@app.on_event("shutdown")
+async def stop_recommendation_refresh():
+    if _recommendation_refresh_task is not None:
+        _recommendation_refresh_task.cancel()
+
+
+def recommend_parts(parts: PartsSnapshot, eaten_ids, limit: int = 5) -> Optional[List[dict]]:
+    """未制覇部位のおすすめ順（モデル作成前は None）"""
+    model = recommendation_engine.get()
+    if model is None:
+        return None
+    results = []
+    for rec in model.recommend(eaten_ids, limit):
+        part = parts.by_id.get(rec.part_id)
+        if part is None:
+            continue
+        related = parts.by_id.get(rec.related_part_id) if rec.related_part_id else None
+        results.append({
+            **part,
+            "score": rec.score,
+            "related_part": {"id": related["id"], "part_name_jp": related["part_name_jp"]} if related else None,
+        })
+    return results
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match ヘッダが現在のETagに一致するか（弱い比較）"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def catalog_response(parts: PartsSnapshot, data: List[dict], if_none_match: Optional[str], *variant: Optional[str]) -> Response:
+    """部位マスターのレスポンスにETag/Cache-Controlを付与（一致すれば304）"""
+    etag = parts.etag(*variant)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={PARTS_HTTP_MAX_AGE}",
+    }
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    body = orjson.dumps({"success": True, "data": data})
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def require_admin(token: Optional[str]) -> None:
+    """管理用エンドポイントのトークンを検証"""
+    if not ADMIN_TOKEN or token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+@app.get("/api/admin/cache-stats", response_model=dict)
+def get_cache_stats(x_admin_token: Optional[str] = Header(None)):
+    """各キャッシュの件数とヒット率"""
+    require_admin(x_admin_token)
+    parts = parts_cache.get()
+    return {
+        "success": True,
+        "data": {
+            "animal_parts": {
+                "loaded": parts is not None,
+                "version": parts.version if parts else None,
+                "parts_count": len(parts.rows) if parts else 0,
+            },
+            "concierge_context": concierge_context_cache.stats(),
+            "chat_response": chat_response_cache.stats(),
+            "gemini_models": gemini_registry.stats(),
+            "recommendations": recommendation_engine.stats(),
+            "user_responses": user_response_cache.stats(),
+        }
+    }
+
+
+@app.get("/api/admin/db/status", response_model=dict)
+def get_db_status(x_admin_token: Optional[str] = Header(None)):
+    """プライマリ/レプリカのプールと、読み取りの振り分け状況"""
+    require_admin(x_admin_token)
+    pools = {"primary": db_pool, "replica": read_db_pool}
+    return {
+        "success": True,
+        "data": {
+            "pools": {
+                name: {"size": pool.size, "idle": pool.idle_count, "max_size": pool.max_size}
+                for name, pool in pools.items() if pool is not None
+            },
+            "replica": replica_monitor.stats() if read_db_pool is not None else None,
+            "read_route": read_route(),
+            "read_your_writes": read_your_writes.stats(),
+        }
+    }
+
+
+@app.post("/api/admin/animal-parts/reload", response_model=dict)
+async def reload_animal_parts(x_admin_token: Optional[str] = Header(None)):
+    """部位マスターキャッシュを再読み込み"""
+    require_admin(x_admin_token)
+    try:
+        snapshot = await reload_animal_parts_cache()
+        await rebuild_parts_derived_caches()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    return {
+        "success": True,
+        "data": {"parts_count": len(snapshot.rows), "version": snapshot.version}
+    }
+
+
+if GEMINI_FAKE:
+    gemini_registry = FakeGeminiRegistry(latency=GEMINI_FAKE_LATENCY, failure_rate=GEMINI_FAKE_FAILURE_RATE)
+else:
+    gemini_registry = GeminiModelRegistry(load_gemini_api_key, max_models=GEMINI_MODEL_CACHE_SIZE)
+
+gemini_guard = LLMGuard(
+    max_concurrency=GEMINI_MAX_CONCURRENCY,
+    queue_timeout=GEMINI_QUEUE_TIMEOUT,
+    call_timeout=GEMINI_CALL_TIMEOUT,
+    breaker=CircuitBreaker(GEMINI_CIRCUIT_FAILURES, GEMINI_CIRCUIT_RESET),
+)
+
+
+def reload_gemini_client() -> bool:
+    """APIキーを読み直してGeminiクライアントを再設定"""
+    try:
+        return gemini_registry.reload()
+    except GeminiNotConfiguredError:
+        return False
+
+
+@app.on_event("startup")
+async def init_gemini_client():
+    reload_gemini_client()
+    # SIGHUP でAPIキーを再読み込み（kill -HUP <pid>）
+    if hasattr(signal, "SIGHUP"):
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_gemini_client)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+
+@app.post("/api/admin/gemini/reload", response_model=dict)
+def reload_gemini(x_admin_token: Optional[str] = Header(None)):
+    """GeminiのAPIキーを再読み込み"""
+    require_admin(x_admin_token)
+    reload_gemini_client()
+    return {
+        "success": True,
+        "data": gemini_registry.stats()
+    }
+
+
+@app.get("/api/admin/gemini/status", response_model=dict)
+def get_gemini_status(x_admin_token: Optional[str] = Header(None)):
+    """Gemini呼び出しの同時実行数・タイムアウト・サーキットの状態"""
+    require_admin(x_admin_token)
+    return {
+        "success": True,
+        "data": {
+            "client": gemini_registry.stats(),
+            "guard": gemini_guard.stats(),
+        }
+    }
+
+
+chat_session_store = create_chat_session_store(
+    CHAT_SESSION_STORE,
+    # 要約前に押し出されないよう、今回のやり取り(2件)分の余裕を持たせる
+    max_messages=MAX_CHAT_HISTORY + 2 if MAX_CHAT_HISTORY > 0 else 0,
+    ttl=CHAT_SESSION_TTL,
+    max_sessions=CHAT_SESSION_MAX,
+)
+
+
+def resolve_chat_history(request: ChatRequest, user_id: int):
+    """(会話ID, 履歴, これまでの要約) を返す
+
+    conversation_id 指定時はサーバー側の履歴を使い、無ければ新しい会話を作る。
+    conversation_id 無しで history が送られてきた場合のみ従来どおりクライアントの履歴を使う（会話IDは None）。
+    """
+    if request.conversation_id:
+        try:
+            messages = chat_session_store.get_messages(request.conversation_id, user_id)
+            summary = chat_session_store.get_summary(request.conversation_id, user_id)
+        except ChatSessionNotFound:
+            raise HTTPException(status_code=404, detail="会話が見つかりません。新しい会話を開始してください。")
+        return request.conversation_id, [ChatMessage(**msg) for msg in messages], summary
+
+    if request.history:
+        return None, request.history, None
+
+    return chat_session_store.create(user_id), [], None
+
+
+def compact_chat_history(
+    conversation_id: Optional[str],
+    user_id: int,
+    history: List[ChatMessage],
+    summary: Optional[str],
+):
+    """トークン予算に収まらない古い発言をローリングサマリに畳み込む
+
+    戻り値は (そのまま送る履歴, 要約)。サーバー側の会話では畳み込んだ結果を保存し、
+    次回以降は要約と残りの履歴だけを扱う。
+    """
+    history = [msg for msg in history if msg.role in {"user", "assistant"}]
+    older, recent = split_history_by_budget(history, CHAT_HISTORY_TOKEN_BUDGET, MAX_CHAT_HISTORY)
+    if not older:
+        return recent, summary
+
+    summary = compact_summary(summary, older, CHAT_SUMMARY_TOKEN_BUDGET)
+    if conversation_id:
+        try:
+            chat_session_store.compact(conversation_id, user_id, len(older), summary)
+        except ChatSessionNotFound:
+            pass
+    return recent, summary
+
+
+def record_chat_turn(conversation_id: Optional[str], user_id: int, message: str, reply: str) -> None:
+    """今回のやり取りをサーバー側の履歴に追加"""
+    if not conversation_id:
+        return
+    try:
+        chat_session_store.append(conversation_id, user_id, [
+            {"role": "user", "content": message},
+            {"role": "assistant", "content": reply},
+        ])
+    except ChatSessionNotFound:
+        # 応答生成中に期限切れになった場合は履歴を残さない
+        pass
+
+
+chat_response_cache = SemanticResponseCache(
+    threshold=CHAT_RESPONSE_CACHE_THRESHOLD,
+    ttl=CHAT_RESPONSE_CACHE_TTL,
+    max_entries=CHAT_RESPONSE_CACHE_SIZE,
+)
+
+
+def shared_concierge_context(context: str) -> str:
+    """ユーザー間で応答を使い回すときに送るコンテキスト（最近の食事を除いた制覇状況）
+
+    最近の食事（店舗名・日付）は他のユーザーへ返してはいけないため、キャッシュ対象の質問では送らない。
+    """
+    return context.split(RECENT_MEAL_HEADER, 1)[0].rstrip("\n")
+
+
+def concierge_context_fingerprint(system_prompt: Optional[str], context: str) -> str:
+    """同じ制覇状況のユーザーで同じ値になるコンテキストの指紋（Gemini へ送るコンテキスト全体から計算）"""
+    source = "\0".join([GEMINI_MODEL_NAME, system_prompt or DEFAULT_CONCIERGE_PROMPT, context])
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def lookup_cached_reply(
+    request: ChatRequest,
+    history: List[ChatMessage],
+    summary: Optional[str],
+    context: Optional[str],
+):
+    """(キャッシュ済みの応答 or None, 保存用の指紋 or None, Gemini へ送るコンテキスト) を返す
+
+    直前の会話に依存しない最初の質問だけを対象にし、その場合は shared_concierge_context() だけを送る。
+    コンテキストを作れなかった（DBエラー）場合は全員が同じ指紋になるため対象にしない。
+    """
+    if history or summary or context is None or not chat_response_cache.enabled:
+        return None, None, context
+    context = shared_concierge_context(context)
+    fingerprint = concierge_context_fingerprint(request.system_prompt, context)
+    cached = chat_response_cache.lookup(request.message, fingerprint)
+    return (cached[0] if cached else None), fingerprint, context
+
+
+def prepare_gemini_request(
+    message: str,
+    history: List[ChatMessage],
+    system_prompt: Optional[str] = None,
+    extra_context: Optional[str] = None,
+    summary: Optional[str] = None,
+):
+    """モデルと送信内容(contents)、送信トークン数の概算を組み立てる
+
+    history は compact_chat_history で予算内に収めたもの。要約は履歴の先頭に置く。
+    """
+    prompt = system_prompt or DEFAULT_CONCIERGE_PROMPT
+    if extra_context:
+        prompt = f"{prompt}\n\n### ユーザーコンテキスト\n{extra_context}"
+
+    try:
+        model = gemini_registry.get_model(GEMINI_MODEL_NAME, prompt)
+    except GeminiNotConfiguredError as exc:
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+    trimmed_history = [msg for msg in history if msg.role in {"user", "assistant"}]
+
+    contents = []
+    if summary:
+        contents.append({"role": "user", "parts": [{"text": f"（これまでの会話の要約）\n{summary}"}]})
+        contents.append({"role": "model", "parts": [{"text": "承知しました。"}]})
+    for past in trimmed_history:
+        role = "user" if past.role == "user" else "model"
+        contents.append({"role": role, "parts": [{"text": past.content}]})
+    contents.append({"role": "user", "parts": [{"text": message}]})
+
+    estimated_tokens = estimate_tokens(prompt) + sum(
+        message_tokens(content["parts"][0]["text"]) for content in contents
+    )
+    return model, contents, trimmed_history, estimated_tokens
+
+
+def log_chat_usage(estimated_tokens: int, trimmed_history: List[ChatMessage], summary: Optional[str], usage) -> None:
+    """送信トークン数の概算と、Geminiが返した実際の使用量を1行で記録する"""
+    chat_logger.info(
+        "gemini usage model=%s history=%d summary_tokens=%d estimated_prompt_tokens=%d "
+        "prompt_tokens=%s candidates_tokens=%s total_tokens=%s",
+        GEMINI_MODEL_NAME,
+        len(trimmed_history),
+        estimate_tokens(summary),
+        estimated_tokens,
+        getattr(usage, "prompt_token_count", None),
+        getattr(usage, "candidates_token_count", None),
+        getattr(usage, "total_token_count", None),
+    )
+    if usage:
+        GEMINI_TOKENS.inc("prompt", amount=getattr(usage, "prompt_token_count", 0) or 0)
+        GEMINI_TOKENS.inc("candidates", amount=getattr(usage, "candidates_token_count", 0) or 0)
+
+
+def extract_response_text(response) -> Optional[str]:
+    """Geminiの応答（ストリームの各チャンクを含む）からテキストを取り出す"""
+    try:
+        text = getattr(response, "text", None)
+    except ValueError:
+        # テキストを含まない応答（安全性フィルタ等）では .text が例外になる
+        text = None
+    if not text and getattr(response, "candidates", None):
+        for candidate in response.candidates:
+            candidate_content = getattr(candidate, "content", None)
+            if not candidate_content:
+                continue
+            parts = getattr(candidate_content, "parts", None)
+            if not parts:
+                continue
+            for part in parts:
+                part_text = getattr(part, "text", None)
+                if part_text:
+                    text = part_text
+                    break
+            if text:
+                break
+    return text
+
+
+def is_timeout_error(exc: Exception) -> bool:
+    """Gemini 呼び出しが期限切れで失敗したか（SDK の DeadlineExceeded を含む）"""
+    return isinstance(exc, (asyncio.TimeoutError, TimeoutError)) or type(exc).__name__ == "DeadlineExceeded"
+
+
+def build_fallback_reply(context: Optional[str]) -> str:
+    """Gemini を呼べないときに制覇状況から組み立てる定型の応答"""
+    lines = ["ただいまAIコンシェルジュが混み合っているため、これまでの記録から簡単にご案内します。"]
+    progress_context = (context or "").split(RECENT_MEAL_HEADER, 1)[0].strip()
+    if progress_context:
+        lines.append(progress_context)
+    else:
+        lines.append("まだ記録が少ないようです。気になる部位から気軽に挑戦してみてください。")
+    lines.append("少し時間をおいてから、もう一度話しかけてください。")
+    return "\n".join(lines)
+
+
+def build_fallback_chat_reply(
+    request: ChatRequest,
+    history: List[ChatMessage],
+    context: Optional[str],
+    reason: str,
+    conversation_id: Optional[str] = None,
+) -> dict:
+    """定型応答をレスポンス用に整形（会話履歴・応答キャッシュには残さない）"""
+    data = build_chat_reply(request, build_fallback_reply(context), history, None, conversation_id)
+    data["cached"] = False
+    data["fallback"] = True
+    data["fallback_reason"] = reason
+    return data
+
+
+def call_gemini_api(
+    message: str,
+    history: List[ChatMessage],
+    system_prompt: Optional[str] = None,
+    extra_context: Optional[str] = None,
+    summary: Optional[str] = None,
+):
+    """Gemini APIを呼び出して応答を生成"""
+    model, contents, trimmed_history, estimated_tokens = prepare_gemini_request(
+        message, history, system_prompt, extra_context, summary
+    )
+
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        with gemini_guard.slot():
+            response = model.generate_content(contents, request_options={"timeout": gemini_guard.call_timeout})
+        outcome = "ok"
+    except LLMUnavailableError as exc:
+        outcome = exc.reason
+        raise
+    except Exception as exc:
+        if is_timeout_error(exc):
+            outcome = "timeout"
+            gemini_guard.record_timeout()
+            raise LLMUnavailableError("timeout") from exc
+        raise HTTPException(status_code=500, detail=f"Gemini API error: {exc}") from exc
+    finally:
+        GEMINI_REQUEST_DURATION.observe(time.perf_counter() - started, "sync", outcome)
+
+    text = extract_response_text(response)
+    if not text:
+        raise HTTPException(status_code=500, detail="Gemini API returned no content.")
+
+    usage = getattr(response, "usage_metadata", None)
+    log_chat_usage(estimated_tokens, trimmed_history, summary, usage)
+    return text.strip(), trimmed_history, usage
+
+
+async def stream_gemini_api(
+    message: str,
+    history: List[ChatMessage],
+    system_prompt: Optional[str] = None,
+    extra_context: Optional[str] = None,
+    summary: Optional[str] = None,
+):
+    """Gemini APIをストリーミングで呼び出す
+
+    生成されたテキストを ("token", text) として順に返し、
+    最後に ("done", (reply, trimmed_history, usage)) を返す。
+    """
+    model, contents, trimmed_history, estimated_tokens = prepare_gemini_request(
+        message, history, system_prompt, extra_context, summary
+    )
+
+    chunks = []
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + gemini_guard.call_timeout
+    started = time.perf_counter()
+    # クライアント切断でジェネレーターが閉じられた場合は cancelled のまま記録する
+    outcome = "cancelled"
+    try:
+        async with gemini_guard.async_slot():
+            response = await asyncio.wait_for(
+                model.generate_content_async(
+                    contents, stream=True, request_options={"timeout": gemini_guard.call_timeout}
+                ),
+                max(deadline - loop.time(), 0),
+            )
+            # 最初のトークンだけでなくストリーム全体を期限内に終わらせる
+            stream = response.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), max(deadline - loop.time(), 0))
+                except StopAsyncIteration:
+                    break
+                text = extract_response_text(chunk)
+                if text:
+                    chunks.append(text)
+                    yield "token", text
+        outcome = "ok"
+    except LLMUnavailableError as exc:
+        outcome = exc.reason
+        raise
+    except Exception as exc:
+        outcome = "error"
+        if is_timeout_error(exc):
+            outcome = "timeout"
+            gemini_guard.record_timeout()
+            raise LLMUnavailableError("timeout") from exc
+        raise HTTPException(status_code=500, detail=f"Gemini API error: {exc}") from exc
+    finally:
+        GEMINI_REQUEST_DURATION.observe(time.perf_counter() - started, "stream", outcome)
+
+    reply = "".join(chunks).strip()
+    if not reply:
+        raise HTTPException(status_code=500, detail="Gemini API returned no content.")
+
+    usage = getattr(response, "usage_metadata", None)
+    log_chat_usage(estimated_tokens, trimmed_history, summary, usage)
+    yield "done", (reply, trimmed_history, usage)
+
+
+def build_chat_reply(
+    request: ChatRequest,
+    reply: str,
+    trimmed_history: List[ChatMessage],
+    usage,
+    conversation_id: Optional[str] = None,
+) -> dict:
+    """応答とトークン使用量をレスポンス用に整形
+
+    サーバー側で会話を保持している場合は会話IDのみを返し、
+    従来の履歴送信方式の場合は更新後の履歴全体を返す。
+    """
+    data = {
+        "reply": reply,
+        "model": GEMINI_MODEL_NAME,
+    }
+    if conversation_id:
+        data["conversation_id"] = conversation_id
+    else:
+        data["history"] = legacy_updated_history(request, reply, trimmed_history)
+
+    if usage:
+        data["usage"] = {
+            "prompt_tokens": getattr(usage, "prompt_token_count", None),
+            "candidates_tokens": getattr(usage, "candidates_token_count", None),
+            "total_tokens": getattr(usage, "total_token_count", None),
+        }
+
+    return data
+
+
+def legacy_updated_history(request: ChatRequest, reply: str, trimmed_history: List[ChatMessage]) -> List[dict]:
+    """クライアント送信の履歴に今回のやり取りを加えたもの"""
+    updated_history = [msg.dict() for msg in trimmed_history]
+    latest_user = updated_history[-1] if updated_history else None
+    if not (
+        latest_user
+        and latest_user.get("role") == "user"
+        and latest_user.get("content") == request.message
+    ):
+        updated_history.append({"role": "user", "content": request.message})
+
+    updated_history.append({"role": "assistant", "content": reply})
+    return updated_history
+
+
+@app.post("/api/chat/message", response_model=dict)
+def post_chat_message(request: ChatRequest, user_id: int = Query(..., description="ログインユーザーのID")):
+    """Geminiを利用したチャット応答を生成"""
+    if not request.message.strip():
+        raise HTTPException(status_code=400, detail="message must not be empty.")
+
+    conversation_id, history, summary = resolve_chat_history(request, user_id)
+    history, summary = compact_chat_history(conversation_id, user_id, history, summary)
+    concierge_context = build_concierge_context(user_id=user_id)
+
+    cached_reply, fingerprint, gemini_context = lookup_cached_reply(request, history, summary, concierge_context)
+    if cached_reply:
+        reply, trimmed_history, usage = cached_reply, history, None
+    else:
+        try:
+            reply, trimmed_history, usage = call_gemini_api(
+                message=request.message,
+                history=history,
+                system_prompt=request.system_prompt,
+                extra_context=gemini_context,
+                summary=summary,
+            )
+        except LLMUnavailableError as exc:
+            return {
+                "success": True,
+                "data": build_fallback_chat_reply(request, history, concierge_context, exc.reason, conversation_id),
+            }
+        if fingerprint:
+            chat_response_cache.store(request.message, fingerprint, reply)
+    record_chat_turn(conversation_id, user_id, request.message, reply)
+
+    data = build_chat_reply(request, reply, trimmed_history, usage, conversation_id)
+    data["cached"] = cached_reply is not None
+    return {
+        "success": True,
+        "data": data,
+    }
+
+
+async def cached_reply_events(reply: str, history: List[ChatMessage]):
+    """キャッシュ済みの応答を stream_gemini_api と同じ形式で返す"""
+    yield "token", reply
+    yield "done", (reply, history, None)
+
+
+def sse_event(event: str, data) -> str:
+    """Server-Sent Events の1イベント分の文字列"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+@app.post("/api/chat/message/stream")
+async def post_chat_message_stream(request: ChatRequest, user_id: int = Query(..., description="ログインユーザーのID")):
+    """Geminiの応答をServer-Sent Eventsで逐次返す
+
+    event: token  … {"text": 生成されたテキストの断片}
+    event: done   … /api/chat/message の data と同じ内容（reply, history, usage）
+    event: error  … {"detail": エラー内容}
+    """
+    if not request.message.strip():
+        raise HTTPException(status_code=400, detail="message must not be empty.")
+
+    conversation_id, history, summary = resolve_chat_history(request, user_id)
+    history, summary = compact_chat_history(conversation_id, user_id, history, summary)
+    concierge_context = await run_in_threadpool(build_concierge_context, user_id)
+
+    cached_reply, fingerprint, gemini_context = lookup_cached_reply(request, history, summary, concierge_context)
+    if cached_reply:
+        events = cached_reply_events(cached_reply, history)
+    else:
+        events = stream_gemini_api(
+            message=request.message,
+            history=history,
+            system_prompt=request.system_prompt,
+            extra_context=gemini_context,
+            summary=summary,
+        )
+
+    async def event_stream():
+        sent_tokens = False
+        try:
+            async for kind, payload in events:
+                if kind == "token":
+                    sent_tokens = True
+                    yield sse_event("token", {"text": payload})
+                else:
+                    reply, trimmed_history, usage = payload
+                    if fingerprint and not cached_reply:
+                        chat_response_cache.store(request.message, fingerprint, reply)
+                    record_chat_turn(conversation_id, user_id, request.message, reply)
+                    data = build_chat_reply(request, reply, trimmed_history, usage, conversation_id)
+                    data["cached"] = cached_reply is not None
+                    yield sse_event("done", data)
+        except LLMUnavailableError as exc:
+            if sent_tokens:
+                yield sse_event("error", {"detail": "Gemini API timed out."})
+                return
+            data = build_fallback_chat_reply(request, history, concierge_context, exc.reason, conversation_id)
+            yield sse_event("token", {"text": data["reply"]})
+            yield sse_event("done", data)
+        except HTTPException as exc:
+            yield sse_event("error", {"detail": exc.detail})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/chat/conversations/{conversation_id}", response_model=dict)
+def get_chat_conversation(conversation_id: str, user_id: int = Query(..., description="ログインユーザーのID")):
+    """サーバー側で保持している会話履歴を取得"""
+    try:
+        messages = chat_session_store.get_messages(conversation_id, user_id)
+    except ChatSessionNotFound:
+        raise HTTPException(status_code=404, detail="会話が見つかりません")
+    return {
+        "success": True,
+        "data": {
+            "conversation_id": conversation_id,
+            "history": messages
+        }
+    }
+
+
+@app.delete("/api/chat/conversations/{conversation_id}", response_model=dict)
+def delete_chat_conversation(conversation_id: str, user_id: int = Query(..., description="ログインユーザーのID")):
+    """会話を終了して履歴を破棄"""
+    chat_session_store.delete(conversation_id, user_id)
+    return {"success": True}
+
+
+@app.get("/api/animal-parts", response_model=dict)
+async def get_animal_parts(
+    animal_type: Optional[str] = Query(None, regex="^(beef|pork|chicken)$"),
+    part_category: Optional[str] = Query(None, regex="^(meat|organ)$"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """部位マスターデータを取得"""
+    try:
+        parts = await load_animal_parts_async()
+        return catalog_response(
+            parts, parts.filter(animal_type, part_category), if_none_match,
+            "all", animal_type, part_category
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/api/animal-parts/{animal_type}", response_model=dict)
+def get_animal_parts_by_type(
+    animal_type: str = Path(..., regex="^(beef|pork|chicken)$"),
+    part_category: Optional[str] = Query(None, regex="^(meat|organ)$"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """動物別の部位一覧を取得"""
+    try:
+        parts = load_animal_parts()
+        return catalog_response(
+            parts, parts.filter(animal_type, part_category), if_none_match,
+            "by_type", animal_type, part_category
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+
+
+EATING_SESSION_INSERT = """
+INSERT INTO eating_sessions (
+    user_id, restaurant_name, eaten_at, memo, rating, photo_url
+) VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+# executemany で1つの複数行INSERTにまとめて送信される
+EATING_RECORD_INSERT = """
+INSERT INTO eating_records (
+    user_id, animal_part_id, session_id, eaten_at
+) VALUES (%s, %s, %s, %s)
+"""
+
+# 一括登録APIで1リクエストに含められるセッション数の上限
+BULK_SESSIONS_LIMIT = int(os.getenv("BULK_SESSIONS_LIMIT", "100"))
+
+
+async def validate_animal_part_ids(part_ids) -> None:
+    """部位IDの存在確認（未知のIDがあればマスター更新の可能性があるので一度だけ読み直す）"""
+    part_ids = set(part_ids)
+    parts = await load_animal_parts_async()
+    invalid_ids = part_ids - parts.by_id.keys()
+    if invalid_ids:
+        parts = await reload_animal_parts_cache()
+        invalid_ids = part_ids - parts.by_id.keys()
+    if invalid_ids:
+        raise HTTPException(status_code=400, detail=f"存在しない部位ID: {list(invalid_ids)}")
+
+
+def normalize_eaten_at(eaten_at: Optional[datetime], now: datetime) -> datetime:
+    """食事日時をサーバーのローカル時刻（タイムゾーンなし）に揃える
+
+    未指定時の既定値 datetime.now() と同じ表現にしないと、"...Z" 付きの値と混在したときに比較できない。
+    """
+    if eaten_at is None:
+        return now
+    if eaten_at.tzinfo is not None:
+        return eaten_at.astimezone().replace(tzinfo=None)
+    return eaten_at
+
+
+async def insert_eating_sessions(cur, user_id: int, record_requests: List[EatingRecordRequest]) -> List[dict]:
+    """食事セッションと部位記録をまとめて登録（トランザクションは呼び出し側で管理）
+
+    セッションは1件ずつINSERTしてIDを得るが、部位記録と制覇状況サマリは
+    全セッション分を1回ずつの複数行INSERTで書き込み、採番されたIDは1回のSELECTで読み戻す。
+    """
+    now = datetime.now()
+    session_ids = []
+    record_rows = []
+    progress_counts: Counter = Counter()
+    progress_dates: Dict[int, List[datetime]] = {}
+
+    for record_request in record_requests:
+        # 認証されたユーザーIDを使用
+        eaten_at = normalize_eaten_at(record_request.eaten_at, now)
+
+        # 食事セッションを作成
+        await cur.execute(EATING_SESSION_INSERT, (
+            user_id,
+            record_request.restaurant_name,
+            eaten_at,
+            record_request.memo,
+            record_request.rating,
+            record_request.photo_url
+        ))
+        session_id = cur.lastrowid
+        session_ids.append(session_id)
+
+        for part_id in record_request.animal_part_ids:
+            record_rows.append((user_id, part_id, session_id, eaten_at))
+            progress_counts[part_id] += 1
+            dates = progress_dates.setdefault(part_id, [eaten_at, eaten_at])
+            dates[0] = min(dates[0], eaten_at)
+            dates[1] = max(dates[1], eaten_at)
+
+    # 各部位に対する記録を一括作成
+    await cur.executemany(EATING_RECORD_INSERT, record_rows)
+
+    # 制覇状況サマリを同じトランザクションで更新
+    await cur.executemany(
+        USER_PART_PROGRESS_UPSERT,
+        [
+            (user_id, part_id, progress_dates[part_id][0], progress_dates[part_id][1], count)
+            for part_id, count in progress_counts.items()
+        ]
+    )
+
+    # 採番されたIDをまとめて取得
+    await cur.execute(
+        EATING_RECORDS_READ_BACK_QUERY.format(placeholders=in_placeholders(len(session_ids))),
+        session_ids
+    )
+    records_by_session: Dict[int, List[dict]] = {session_id: [] for session_id in session_ids}
+    for row in await cur.fetchall():
+        records_by_session[row["session_id"]].append({
+            "id": row["id"],
+            "animal_part_id": row["animal_part_id"],
+            "session_id": row["session_id"],
+            "eaten_at": row["eaten_at"].isoformat(),
+            "created_at": row["created_at"].isoformat()
+        })
+
+    return [
+        {"session_id": session_id, "records": records_by_session[session_id]}
+        for session_id in session_ids
+    ]
+
+
+async def save_eating_sessions(user_id: int, record_requests: List[EatingRecordRequest]) -> List[dict]:
+    """insert_eating_sessions を1トランザクションで実行"""
+    async with get_async_db_connection() as conn:
+        await conn.begin()
+        try:
+            async with conn.cursor() as cur:
+                created = await insert_eating_sessions(cur, user_id, record_requests)
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+    read_your_writes.mark(user_id)
+    await run_shared_cache(invalidate_user_caches, user_id)
+    return created
+
+
+@app.post("/api/eating-records", response_model=dict)
+async def create_eating_records(record_request: EatingRecordRequest, user_id: int = Query(..., description="ログインユーザーのID")):
+    """複数の部位を一度にセッションとして記録"""
+    if not record_request.animal_part_ids:
+        raise HTTPException(status_code=400, detail="部位IDが指定されていません")
+
+    try:
+        await validate_animal_part_ids(record_request.animal_part_ids)
+        created = await save_eating_sessions(user_id, [record_request])
+        return {
+            "success": True,
+            "data": created[0]
+        }
 
     except HTTPException:
         raise
@@ -672,55 +1983,193 @@ def create_eating_records(record_request: EatingRecordRequest, user_id: int = Qu
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
-@app.get("/api/eating-sessions", response_model=dict)
-def get_eating_sessions(
+@app.post("/api/eating-records/bulk", response_model=dict)
+async def create_eating_records_bulk(bulk_request: BulkEatingRecordRequest, user_id: int = Query(..., description="ログインユーザーのID")):
+    """複数の食事セッションを一括で記録（オフライン同期用、全件成功か全件失敗）"""
+    if not bulk_request.sessions:
+        raise HTTPException(status_code=400, detail="セッションが指定されていません")
+    if len(bulk_request.sessions) > BULK_SESSIONS_LIMIT:
+        raise HTTPException(
+            status_code=400,
+            detail=f"一度に登録できるセッションは{BULK_SESSIONS_LIMIT}件までです"
+        )
+    for index, record_request in enumerate(bulk_request.sessions):
+        if not record_request.animal_part_ids:
+            raise HTTPException(status_code=400, detail=f"sessions[{index}]: 部位IDが指定されていません")
+
+    try:
+        await validate_animal_part_ids(
+            part_id for record_request in bulk_request.sessions for part_id in record_request.animal_part_ids
+        )
+        created = await save_eating_sessions(user_id, bulk_request.sessions)
+        return {
+            "success": True,
+            "data": {
+                "sessions": created
+            }
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+def encode_session_cursor(session: dict) -> str:
+    """一覧の最終行から次ページ用の不透明なカーソルを作る"""
+    eaten_at = session.get("eaten_at")
+    payload = json.dumps({
+        "e": eaten_at.isoformat() if eaten_at else None,
+        "i": session["id"],
+    }, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_session_cursor(cursor: str):
+    """カーソルを (eaten_at, id) に戻す。不正な値なら400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["e"]), int(payload["i"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="cursor が不正です")
+
+
+# offset/cursor で返すページ情報の項目が異なるため、値の無い項目は出力しない
+@app.get("/api/eating-sessions", response_model=EatingSessionListResponse, response_model_exclude_unset=True)
+async def get_eating_sessions(
     user_id: int = Query(..., description="ログインユーザーのID"),
     page: int = Query(1, ge=1),
-    per_page: int = Query(20, ge=1, le=100)
+    per_page: int = Query(20, ge=1, le=100),
+    pagination: str = Query("offset", regex="^(offset|cursor)$", description="offset: ページ番号指定 / cursor: next_cursor で続きを取得"),
+    cursor: Optional[str] = Query(None, description="前ページの next_cursor（指定時は cursor モード）"),
+    include_total: Optional[bool] = Query(None, description="総件数を返すか（既定: offset=true, cursor=false）")
 ):
     """食事セッション一覧を取得"""
+    use_cursor = pagination == "cursor" or cursor is not None
+    if include_total is None:
+        include_total = not use_cursor
+    keyset = decode_session_cursor(cursor) if cursor else None
+
     try:
-        conn = get_db_connection()
-        try:
-            with conn.cursor() as cur:
+        async with get_async_read_db_connection(user_id) as conn:
+            async with conn.cursor() as cur:
                 # 認証されたユーザーIDを使用
-                offset = (page - 1) * per_page
-
-                # セッション一覧を取得
-                sessions_query = """
-                SELECT es.*,
-                       COUNT(er.id) as parts_count,
-                       GROUP_CONCAT(ap.part_name_jp ORDER BY ap.part_name_jp) as parts_list
-                FROM eating_sessions es
-                LEFT JOIN eating_records er ON es.id = er.session_id
-                LEFT JOIN animal_parts ap ON er.animal_part_id = ap.id
-                WHERE es.user_id = %s
-                GROUP BY es.id
-                ORDER BY es.eaten_at DESC, es.created_at DESC
-                LIMIT %s OFFSET %s
-                """
-
-                cur.execute(sessions_query, (user_id, per_page, offset))
-                sessions = cur.fetchall()
-
-                # 総件数を取得
-                count_query = "SELECT COUNT(*) as total FROM eating_sessions WHERE user_id = %s"
-                cur.execute(count_query, (user_id,))
-                total = cur.fetchone()["total"]
+                if use_cursor:
+                    # (eaten_at, id) のキーセットで続きから取得し、1件多く読んで次ページ有無を判定
+                    params = [user_id]
+                    keyset_sql = ""
+                    if keyset:
+                        keyset_sql = SESSIONS_LIST_KEYSET
+                        params += [keyset[0], keyset[0], keyset[1]]
+                    params.append(per_page + 1)
+                    await cur.execute(SESSIONS_LIST_QUERY.format(keyset=keyset_sql, offset=""), params)
+                    sessions = await cur.fetchall()
+                    has_more = len(sessions) > per_page
+                    sessions = sessions[:per_page]
+                    pagination_data = {
+                        "mode": "cursor",
+                        "per_page": per_page,
+                        "has_more": has_more,
+                        "next_cursor": encode_session_cursor(sessions[-1]) if has_more else None,
+                    }
+                else:
+                    offset = (page - 1) * per_page
+                    await cur.execute(
+                        SESSIONS_LIST_QUERY.format(keyset="", offset="OFFSET %s"),
+                        (user_id, per_page, offset)
+                    )
+                    sessions = await cur.fetchall()
+                    pagination_data = {
+                        "mode": "offset",
+                        "page": page,
+                        "per_page": per_page,
+                    }
+
+                if include_total:
+                    # 総件数を取得
+                    await cur.execute(SESSIONS_COUNT_QUERY, (user_id,))
+                    total = (await cur.fetchone())["total"]
+                    pagination_data["total"] = total
+                    pagination_data["total_pages"] = (total + per_page - 1) // per_page
 
                 return {
                     "success": True,
                     "data": sessions,
-                    "pagination": {
-                        "page": page,
-                        "per_page": per_page,
-                        "total": total,
-                        "total_pages": (total + per_page - 1) // per_page
-                    }
+                    "pagination": pagination_data
                 }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-        finally:
-            conn.close()
+
+SESSION_COLUMNS = (
+    "id", "user_id", "restaurant_name", "eaten_at", "memo", "rating", "photo_url", "created_at", "updated_at"
+)
+
+# 一括取得で1回に指定できるセッション数の上限
+SESSION_DETAILS_MAX_IDS = 100
+
+
+def session_detail_query(session_ids: List[int]) -> str:
+    return SESSION_DETAIL_QUERY.format(placeholders=in_placeholders(len(session_ids)))
+
+
+def group_session_detail_rows(rows) -> Dict[int, dict]:
+    """セッション×記録のJOIN結果をセッションごとの {session, records} にまとめる
+
+    records の各行は従来の詳細API（eating_records の列 + 部位情報）と同じ形にする。
+    """
+    details: Dict[int, dict] = {}
+    for row in rows:
+        detail = details.get(row["id"])
+        if detail is None:
+            detail = details[row["id"]] = {
+                "session": {column: row[column] for column in SESSION_COLUMNS},
+                "records": [],
+            }
+        if row["record_id"] is None:
+            continue
+        detail["records"].append({
+            "id": row["record_id"],
+            "user_id": row["user_id"],
+            "animal_part_id": row["animal_part_id"],
+            "session_id": row["id"],
+            "eaten_at": row["record_eaten_at"],
+            "created_at": row["record_created_at"],
+            "animal_type": row["animal_type"],
+            "part_category": row["part_category"],
+            "part_name": row["part_name"],
+            "part_name_jp": row["part_name_jp"],
+            "description": row["description"],
+        })
+    return details
+
+
+@app.get("/api/eating-sessions/details", response_model=dict)
+async def get_eating_session_details(
+    user_id: int = Query(..., description="ログインユーザーのID"),
+    session_ids: List[int] = Query(..., description="取得するセッションID（複数指定可）"),
+):
+    """複数の食事セッションの詳細を1回のクエリでまとめて取得（履歴一覧の展開用）"""
+    session_ids = list(dict.fromkeys(session_ids))
+    if len(session_ids) > SESSION_DETAILS_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"session_ids は {SESSION_DETAILS_MAX_IDS} 件までです"
+        )
+
+    try:
+        async with get_async_read_db_connection(user_id) as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(session_detail_query(session_ids), (*session_ids, user_id))
+                details = group_session_detail_rows(await cur.fetchall())
+
+        return {
+            "success": True,
+            # 指定された順に並べ、見つからない（他ユーザーの）IDは not_found に入れる
+            "data": [details[session_id] for session_id in session_ids if session_id in details],
+            "not_found": [session_id for session_id in session_ids if session_id not in details]
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
@@ -729,38 +2178,19 @@ def get_eating_sessions(
 def get_eating_session_detail(session_id: int, user_id: int = Query(..., description="ログインユーザーのID")):
     """特定の食事セッションの詳細を取得"""
     try:
-        conn = get_db_connection()
+        conn = get_read_db_connection(user_id)
         try:
             with conn.cursor() as cur:
-                # 認証されたユーザーIDを使用
-                # セッション詳細を取得
-                session_query = """
-                SELECT * FROM eating_sessions
-                WHERE id = %s AND user_id = %s
-                """
-                cur.execute(session_query, (session_id, user_id))
-                session = cur.fetchone()
-
-                if not session:
-                    raise HTTPException(status_code=404, detail="セッションが見つかりません")
+                # セッションと部位記録を1回のクエリで取得
+                cur.execute(session_detail_query([session_id]), (session_id, user_id))
+                detail = group_session_detail_rows(cur.fetchall()).get(session_id)
 
-                # セッションに含まれる部位記録を取得
-                records_query = """
-                SELECT er.*, ap.animal_type, ap.part_category, ap.part_name, ap.part_name_jp, ap.description
-                FROM eating_records er
-                JOIN animal_parts ap ON er.animal_part_id = ap.id
-                WHERE er.session_id = %s
-                ORDER BY ap.animal_type, ap.part_category, ap.part_name_jp
-                """
-                cur.execute(records_query, (session_id,))
-                records = cur.fetchall()
+                if not detail:
+                    raise HTTPException(status_code=404, detail="セッションが見つかりません")
 
                 return {
                     "success": True,
-                    "data": {
-                        "session": session,
-                        "records": records
-                    }
+                    "data": detail
                 }
 
         finally:
@@ -771,307 +2201,233 @@ def get_eating_session_detail(session_id: int, user_id: int = Query(..., descrip
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
-@app.get("/api/user-progress", response_model=dict)
-def get_user_progress(user_id: int = Query(..., description="ログインユーザーのID")):
+@app.get("/api/user-progress", response_model=UserProgressResponse, response_model_exclude_unset=True)
+async def get_user_progress(user_id: int = Query(..., description="ログインユーザーのID")):
     """ユーザーの部位制覇状況を取得"""
     try:
-        conn = get_db_connection()
-        try:
-            with conn.cursor() as cur:
-                # 全部位情報を取得
-                all_parts_query = """
-                SELECT id, animal_type, part_category, part_name, part_name_jp, description, difficulty_level
-                FROM animal_parts
-                ORDER BY animal_type, part_category, difficulty_level, id
-                """
-                cur.execute(all_parts_query)
-                all_parts = cur.fetchall()
+        # 全部位情報はキャッシュから取得
+        parts = await load_animal_parts_async()
+        all_parts = parts.rows
+        cache_key, body = await run_shared_cache(
+            user_response_cache.lookup, "progress", user_id, parts.content_hash[:16]
+        )
+        if body is not None:
+            return user_json_response(body, cached=True)
 
+        async with cached_response_db_connection(user_id, cache_key) as conn:
+            async with conn.cursor() as cur:
                 # ユーザーが制覇済みの部位を取得
-                conquered_query = """
-                SELECT
-                    ap.id,
-                    ap.animal_type,
-                    ap.part_category,
-                    ap.part_name,
-                    ap.part_name_jp,
-                    ap.description,
-                    ap.difficulty_level,
-                    MIN(er.eaten_at) as first_conquered_date,
-                    MAX(er.eaten_at) as last_eaten_date,
-                    COUNT(er.id) as eat_count
-                FROM animal_parts ap
-                JOIN eating_records er ON ap.id = er.animal_part_id
-                WHERE er.user_id = %s
-                GROUP BY ap.id, ap.animal_type, ap.part_category, ap.part_name, ap.part_name_jp, ap.description, ap.difficulty_level
-                ORDER BY ap.animal_type, ap.part_category, ap.difficulty_level, ap.id
-                """
-                cur.execute(conquered_query, (user_id,))
-                conquered_parts = cur.fetchall()
-
-                # 制覇済み部位のIDセットを作成
-                conquered_ids = {part['id'] for part in conquered_parts}
-
-                # 結果をマージして整理
-                progress_data = {}
-                for animal_type in ['beef', 'pork', 'chicken']:
-                    progress_data[animal_type] = {
-                        'meat': {'conquered': [], 'unconquered': []},
-                        'organ': {'conquered': [], 'unconquered': []}
-                    }
-
-                # 全部位を分類
-                for part in all_parts:
-                    animal_type = part['animal_type']
-                    part_category = part['part_category']
+                await cur.execute(USER_PROGRESS_QUERY, (user_id,))
+                conquered_parts = [cp for cp in await cur.fetchall() if cp['id'] in parts.by_id]
 
-                    if part['id'] in conquered_ids:
-                        # 制覇済み部位に制覇情報を追加
-                        conquered_part = next(cp for cp in conquered_parts if cp['id'] == part['id'])
-                        part_with_progress = {**part, **conquered_part}
-                        progress_data[animal_type][part_category]['conquered'].append(part_with_progress)
-                    else:
-                        progress_data[animal_type][part_category]['unconquered'].append(part)
-
-                # 統計情報を計算
-                stats = {}
-                for animal_type in ['beef', 'pork', 'chicken']:
-                    animal_parts = [p for p in all_parts if p['animal_type'] == animal_type]
-                    conquered_count = len([p for p in animal_parts if p['id'] in conquered_ids])
-                    total_count = len(animal_parts)
-
-                    stats[animal_type] = {
-                        'conquered_count': conquered_count,
-                        'total_count': total_count,
-                        'conquest_rate': round((conquered_count / total_count * 100), 1) if total_count > 0 else 0
-                    }
+        # 結果をマージして整理
+        summary = build_progress(all_parts, conquered_parts)
 
-                # 全体統計
-                total_parts = len(all_parts)
-                total_conquered = len(conquered_ids)
-                overall_stats = {
-                    'total_conquered': total_conquered,
-                    'total_parts': total_parts,
-                    'overall_conquest_rate': round((total_conquered / total_parts * 100), 1) if total_parts > 0 else 0
-                }
+        # 統計情報
+        stats = {
+            animal_type: conquest_stats(
+                summary['counts'][animal_type]['conquered'],
+                summary['counts'][animal_type]['total']
+            )
+            for animal_type in ANIMAL_TYPES
+        }
 
-                return {
-                    "success": True,
-                    "data": {
-                        "progress": progress_data,
-                        "stats": stats,
-                        "overall_stats": overall_stats,
-                        "user_id": user_id
-                    }
-                }
+        # 全体統計
+        total_parts = summary['total_parts']
+        total_conquered = summary['total_conquered']
+        overall_stats = {
+            'total_conquered': total_conquered,
+            'total_parts': total_parts,
+            'overall_conquest_rate': conquest_rate(total_conquered, total_parts)
+        }
 
-        finally:
-            conn.close()
+        result = {
+            "success": True,
+            "data": {
+                "progress": summary['progress'],
+                "stats": stats,
+                "overall_stats": overall_stats,
+                "user_id": user_id
+            }
+        }
+        body = UserProgressResponse.model_validate(result).model_dump_json(exclude_unset=True).encode("utf-8")
+        await run_shared_cache(user_response_cache.store, cache_key, body)
+        return user_json_response(body, cached=False)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
-@app.get("/api/user-progress/{animal_type}", response_model=dict)
+@app.get("/api/user-progress/{animal_type}", response_model=AnimalProgressResponse, response_model_exclude_unset=True)
 def get_user_progress_by_animal(
     animal_type: str = Path(..., regex="^(beef|pork|chicken)$"),
     user_id: int = Query(..., description="ログインユーザーのID")
 ):
     """特定動物のユーザー制覇状況を詳細取得"""
     try:
-        conn = get_db_connection()
-        try:
-            with conn.cursor() as cur:
-                # 指定動物の全部位を取得
-                parts_query = """
-                SELECT id, animal_type, part_category, part_name, part_name_jp, description, difficulty_level
-                FROM animal_parts
-                WHERE animal_type = %s
-                ORDER BY part_category, difficulty_level, id
-                """
-                cur.execute(parts_query, (animal_type,))
-                all_parts = cur.fetchall()
-
-                # ユーザーの制覇済み部位を取得
-                conquered_query = """
-                SELECT
-                    ap.id,
-                    ap.animal_type,
-                    ap.part_category,
-                    ap.part_name,
-                    ap.part_name_jp,
-                    ap.description,
-                    ap.difficulty_level,
-                    MIN(er.eaten_at) as first_conquered_date,
-                    MAX(er.eaten_at) as last_eaten_date,
-                    COUNT(er.id) as eat_count,
-                    GROUP_CONCAT(DISTINCT es.restaurant_name) as restaurants
-                FROM animal_parts ap
-                JOIN eating_records er ON ap.id = er.animal_part_id
-                LEFT JOIN eating_sessions es ON er.session_id = es.id
-                WHERE er.user_id = %s AND ap.animal_type = %s
-                GROUP BY ap.id, ap.animal_type, ap.part_category, ap.part_name, ap.part_name_jp, ap.description, ap.difficulty_level
-                ORDER BY ap.part_category, ap.difficulty_level, ap.id
-                """
-                cur.execute(conquered_query, (user_id, animal_type))
-                conquered_parts = cur.fetchall()
-
-                # 制覇済み部位のIDセットを作成
-                conquered_ids = {part['id'] for part in conquered_parts}
-
-                # 結果をカテゴリ別に整理
-                result_data = {
-                    'meat': {'conquered': [], 'unconquered': []},
-                    'organ': {'conquered': [], 'unconquered': []}
-                }
-
-                for part in all_parts:
-                    part_category = part['part_category']
+        # 指定動物の全部位はキャッシュから取得
+        parts = load_animal_parts()
+        all_parts = parts.filter(animal_type)
+        cache_key, body = user_response_cache.lookup("progress", user_id, parts.content_hash[:16], animal_type)
+        if body is not None:
+            return user_json_response(body, cached=True)
+
+        if not all_parts:
+            conquered_parts = []
+        else:
+            # 共有キャッシュに保存する場合はプライマリから読む（cached_response_db_connection を参照）
+            conn = get_db_connection() if cache_key is not None else get_read_db_connection(user_id)
+            try:
+                with conn.cursor() as cur:
+                    # ユーザーの制覇済み部位を取得
+                    cur.execute(
+                        USER_PROGRESS_BY_ANIMAL_QUERY.format(placeholders=in_placeholders(len(all_parts))),
+                        [user_id] + [part['id'] for part in all_parts]
+                    )
+                    conquered_parts = cur.fetchall()
+            finally:
+                conn.close()
+
+        # 結果をカテゴリ別に整理
+        summary = build_progress(all_parts, conquered_parts)
+        result_data = summary['progress'][animal_type]
+        animal_counts = summary['counts'][animal_type]
+
+        # カテゴリ別統計
+        category_stats = {
+            category: conquest_stats(
+                animal_counts['categories'][category]['conquered'],
+                animal_counts['categories'][category]['total']
+            )
+            for category in PART_CATEGORIES
+        }
 
-                    if part['id'] in conquered_ids:
-                        conquered_part = next(cp for cp in conquered_parts if cp['id'] == part['id'])
-                        part_with_progress = {**part, **conquered_part}
-                        result_data[part_category]['conquered'].append(part_with_progress)
-                    else:
-                        result_data[part_category]['unconquered'].append(part)
-
-                # 統計計算
-                total_parts = len(all_parts)
-                conquered_count = len(conquered_ids)
-
-                # カテゴリ別統計
-                category_stats = {}
-                for category in ['meat', 'organ']:
-                    cat_parts = [p for p in all_parts if p['part_category'] == category]
-                    cat_conquered = len([p for p in cat_parts if p['id'] in conquered_ids])
-                    cat_total = len(cat_parts)
-
-                    category_stats[category] = {
-                        'conquered_count': cat_conquered,
-                        'total_count': cat_total,
-                        'conquest_rate': round((cat_conquered / cat_total * 100), 1) if cat_total > 0 else 0
-                    }
+        # 統計計算
+        total_parts = summary['total_parts']
+        conquered_count = summary['total_conquered']
+        stats = {
+            'animal_type': animal_type,
+            'conquered_count': conquered_count,
+            'total_count': total_parts,
+            'conquest_rate': conquest_rate(conquered_count, total_parts),
+            'category_stats': category_stats
+        }
 
-                stats = {
-                    'animal_type': animal_type,
-                    'conquered_count': conquered_count,
-                    'total_count': total_parts,
-                    'conquest_rate': round((conquered_count / total_parts * 100), 1) if total_parts > 0 else 0,
-                    'category_stats': category_stats
-                }
+        result = {
+            "success": True,
+            "data": {
+                "parts": result_data,
+                "stats": stats,
+                "user_id": user_id,
+                "animal_type": animal_type
+            }
+        }
+        body = AnimalProgressResponse.model_validate(result).model_dump_json(exclude_unset=True).encode("utf-8")
+        user_response_cache.store(cache_key, body)
+        return user_json_response(body, cached=False)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-                return {
-                    "success": True,
-                    "data": {
-                        "parts": result_data,
-                        "stats": stats,
-                        "user_id": user_id,
-                        "animal_type": animal_type
-                    }
-                }
 
-        finally:
-            conn.close()
+@app.get("/api/recommendations", response_model=dict)
+async def get_recommendations(
+    user_id: int = Query(..., description="ログインユーザーのID"),
+    limit: int = Query(5, ge=1, le=RECOMMENDATION_MAX_LIMIT, description="取得件数"),
+):
+    """次に制覇したい部位のおすすめ（同じ食事で一緒に食べられることが多い順）"""
+    try:
+        parts = await load_animal_parts_async()
+        async with get_async_read_db_connection(user_id) as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    CONQUERED_PART_IDS_QUERY,
+                    (user_id,)
+                )
+                eaten_ids = {row["animal_part_id"] for row in await cur.fetchall()}
+
+        if recommendation_engine.get() is None:
+            await run_in_threadpool(recommendation_engine.get_or_build)
+        recommendations = recommend_parts(parts, eaten_ids, limit) or []
+
+        return {
+            "success": True,
+            "data": {
+                "recommendations": recommendations,
+                "user_id": user_id
+            }
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
-@app.get("/api/dashboard-stats", response_model=dict)
-def get_dashboard_stats(user_id: int = Query(..., description="ログインユーザーのID")):
+
+
+@app.get("/api/dashboard-stats", response_model=DashboardStatsResponse, response_model_exclude_unset=True)
+async def get_dashboard_stats(user_id: int = Query(..., description="ログインユーザーのID")):
     """ダッシュボード用の統計情報を取得"""
     try:
-        conn = get_db_connection()
-        try:
-            with conn.cursor() as cur:
-                # 全体の制覇状況を取得
-                all_parts_query = "SELECT COUNT(*) as total FROM animal_parts"
-                cur.execute(all_parts_query)
-                total_parts = cur.fetchone()['total']
-
-                conquered_parts_query = """
-                SELECT COUNT(DISTINCT animal_part_id) as conquered
-                FROM eating_records
-                WHERE user_id = %s
-                """
-                cur.execute(conquered_parts_query, (user_id,))
-                conquered_parts = cur.fetchone()['conquered']
-
-                # 動物別制覇状況
-                animal_stats = {}
-                for animal_type in ['beef', 'pork', 'chicken']:
-                    animal_total_query = "SELECT COUNT(*) as total FROM animal_parts WHERE animal_type = %s"
-                    cur.execute(animal_total_query, (animal_type,))
-                    animal_total = cur.fetchone()['total']
-
-                    animal_conquered_query = """
-                    SELECT COUNT(DISTINCT ap.id) as conquered
-                    FROM animal_parts ap
-                    JOIN eating_records er ON ap.id = er.animal_part_id
-                    WHERE er.user_id = %s AND ap.animal_type = %s
-                    """
-                    cur.execute(animal_conquered_query, (user_id, animal_type))
-                    animal_conquered = cur.fetchone()['conquered']
+        # 部位数はキャッシュから取得
+        parts = await load_animal_parts_async()
+        total_parts = len(parts.rows)
+        # 今週の記録数などは日付で変わるため日付もキーに含める
+        cache_key, body = await run_shared_cache(
+            user_response_cache.lookup, "dashboard", user_id, parts.content_hash[:16], date.today().isoformat()
+        )
+        if body is not None:
+            return user_json_response(body, cached=True)
+
+        async with cached_response_db_connection(user_id, cache_key) as conn:
+            async with conn.cursor() as cur:
+                # 動物別の制覇数と今週の記録数・直近7日の記録日数（animal_type が NULL の行が全体）
+                await cur.execute(DASHBOARD_SUMMARY_QUERY, (user_id, user_id))
+                conquered_by_animal = {}
+                overall_row = {}
+                for row in await cur.fetchall():
+                    if row['animal_type'] is None:
+                        overall_row = row
+                    else:
+                        conquered_by_animal[row['animal_type']] = row['conquered']
+
+                conquered_parts = int(overall_row.get('conquered') or 0)
+                # 今週の記録数
+                week_records = int(overall_row.get('week_records') or 0)
+                # 連続記録日数（簡易版：過去7日間で記録がある日数）
+                streak_days = int(overall_row.get('streak_days') or 0)
 
+                # 動物別制覇状況（動物の種類が増えてもクエリ数は変わらない）
+                animal_stats = {}
+                for animal_type in dict.fromkeys(ANIMAL_TYPES + tuple(parts.by_type)):
+                    animal_total = len(parts.filter(animal_type))
+                    animal_conquered = conquered_by_animal.get(animal_type, 0)
                     animal_stats[animal_type] = {
                         'conquered': animal_conquered,
                         'total': animal_total,
-                        'rate': round((animal_conquered / animal_total * 100), 1) if animal_total > 0 else 0
+                        'rate': conquest_rate(animal_conquered, animal_total)
                     }
 
-                # 今週の記録数
-                week_records_query = """
-                SELECT COUNT(*) as count
-                FROM eating_records
-                WHERE user_id = %s AND eaten_at >= DATE_SUB(CURDATE(), INTERVAL WEEKDAY(CURDATE()) DAY)
-                """
-                cur.execute(week_records_query, (user_id,))
-                week_records = cur.fetchone()['count']
-
-                # 連続記録日数（簡易版：過去7日間で記録がある日数）
-                streak_query = """
-                SELECT COUNT(DISTINCT DATE(eaten_at)) as streak_days
-                FROM eating_records
-                WHERE user_id = %s AND eaten_at >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)
-                """
-                cur.execute(streak_query, (user_id,))
-                streak_days = cur.fetchone()['streak_days']
-
                 # 最近の記録を取得
-                recent_records_query = """
-                SELECT
-                    ap.part_name_jp,
-                    ap.animal_type,
-                    es.restaurant_name,
-                    er.eaten_at
-                FROM eating_records er
-                JOIN animal_parts ap ON er.animal_part_id = ap.id
-                LEFT JOIN eating_sessions es ON er.session_id = es.id
-                WHERE er.user_id = %s
-                ORDER BY er.eaten_at DESC
-                LIMIT 5
-                """
-                cur.execute(recent_records_query, (user_id,))
-                recent_records = cur.fetchall()
-
-                # 全体制覇率計算
-                overall_rate = round((conquered_parts / total_parts * 100), 1) if total_parts > 0 else 0
-
-                return {
-                    "success": True,
-                    "data": {
-                        "overall_stats": {
-                            "conquered_parts": conquered_parts,
-                            "total_parts": total_parts,
-                            "conquest_rate": overall_rate
-                        },
-                        "animal_stats": animal_stats,
-                        "activity_stats": {
-                            "week_records": week_records,
-                            "streak_days": streak_days
-                        },
-                        "recent_records": recent_records,
-                        "user_id": user_id
-                    }
-                }
-
-        finally:
-            conn.close()
+                await cur.execute(DASHBOARD_RECENT_RECORDS_QUERY, (user_id,))
+                recent_records = await cur.fetchall()
+
+        # 全体制覇率計算
+        overall_rate = conquest_rate(conquered_parts, total_parts)
+
+        result = {
+            "success": True,
+            "data": {
+                "overall_stats": {
+                    "conquered_parts": conquered_parts,
+                    "total_parts": total_parts,
+                    "conquest_rate": overall_rate
+                },
+                "animal_stats": animal_stats,
+                "activity_stats": {
+                    "week_records": week_records,
+                    "streak_days": streak_days
+                },
+                "recent_records": recent_records,
+                "user_id": user_id
+            }
+        }
+        body = DashboardStatsResponse.model_validate(result).model_dump_json(exclude_unset=True).encode("utf-8")
+        await run_shared_cache(user_response_cache.store, cache_key, body)
+        return user_json_response(body, cached=False)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
\ No newline at end of file
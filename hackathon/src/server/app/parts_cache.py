@@ -0,0 +1,83 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class PartsSnapshot:
+    """読み込み済みの部位マスター（読み取り専用として扱う）
+
+    rows は ``ORDER BY animal_type, part_category, difficulty_level, id`` の順で保持するため、
+    絞り込み結果もそのままAPIの並び順になる。
+    """
+
+    def __init__(self, rows: List[dict], version: int):
+        self.rows = [dict(row) for row in rows]
+        self.version = version
+        # HTTPのETagに使う内容ハッシュ（同じ内容なら再読み込みしても変わらない）
+        self.content_hash = hashlib.sha256(
+            json.dumps(self.rows, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+        ).hexdigest()
+        self.by_id: Dict[int, dict] = {}
+        self.by_type: Dict[str, List[dict]] = {}
+        self.by_type_category: Dict[Tuple[str, str], List[dict]] = {}
+        self.by_category: Dict[str, List[dict]] = {}
+        for row in self.rows:
+            self.by_id[row["id"]] = row
+            self.by_type.setdefault(row["animal_type"], []).append(row)
+            self.by_category.setdefault(row["part_category"], []).append(row)
+            self.by_type_category.setdefault((row["animal_type"], row["part_category"]), []).append(row)
+
+    def filter(self, animal_type: Optional[str] = None, part_category: Optional[str] = None) -> List[dict]:
+        if animal_type and part_category:
+            return self.by_type_category.get((animal_type, part_category), [])
+        if animal_type:
+            return self.by_type.get(animal_type, [])
+        if part_category:
+            return self.by_category.get(part_category, [])
+        return self.rows
+
+    def etag(self, *variant: Optional[str]) -> str:
+        """絞り込み条件ごとの強いETagを返す"""
+        key = "|".join(v or "" for v in variant)
+        digest = hashlib.sha256(f"{self.content_hash}|{key}".encode("utf-8")).hexdigest()
+        return f'"{digest[:32]}"'
+
+    def totals_by_type(self) -> Dict[str, int]:
+        return {animal_type: len(parts) for animal_type, parts in self.by_type.items()}
+
+
+class AnimalPartsCache:
+    """プロセス内で共有する部位マスターのキャッシュ
+
+    ``ttl`` 秒を過ぎるか invalidate() されると get() が None を返すので、
+    呼び出し側がDBから読み直して set() する。
+    """
+
+    def __init__(self, ttl: float = 3600.0):
+        self.ttl = ttl
+        self._snapshot: Optional[PartsSnapshot] = None
+        self._loaded_at = 0.0
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def get(self) -> Optional[PartsSnapshot]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        if self.ttl > 0 and time.monotonic() - self._loaded_at > self.ttl:
+            return None
+        return snapshot
+
+    def set(self, rows: List[dict]) -> PartsSnapshot:
+        with self._lock:
+            self._version += 1
+            snapshot = PartsSnapshot(rows, self._version)
+            self._snapshot = snapshot
+            self._loaded_at = time.monotonic()
+        return snapshot
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshot = None
@@ -0,0 +1,81 @@
+from typing import Dict, Iterable, List
+
+ANIMAL_TYPES = ('beef', 'pork', 'chicken')
+PART_CATEGORIES = ('meat', 'organ')
+
+
+def conquest_rate(conquered: int, total: int) -> float:
+    """制覇率(%)を小数1桁で返す"""
+    return round((conquered / total * 100), 1) if total > 0 else 0
+
+
+def conquest_stats(conquered: int, total: int) -> Dict[str, float]:
+    return {
+        'conquered_count': conquered,
+        'total_count': total,
+        'conquest_rate': conquest_rate(conquered, total),
+    }
+
+
+def _empty_categories() -> Dict[str, Dict[str, List[dict]]]:
+    return {category: {'conquered': [], 'unconquered': []} for category in PART_CATEGORIES}
+
+
+def build_progress(all_parts: Iterable[dict], conquered_parts: Iterable[dict]) -> dict:
+    """部位一覧と制覇済み部位を1パスで突き合わせる
+
+    conquered_parts は部位IDごとの制覇情報（first_conquered_date など）を持つ行。
+    all_parts の並び順を保ったまま動物・カテゴリ別に振り分け、同時に件数も数えるため
+    部位数に対して線形時間で終わる。
+
+    戻り値:
+        progress: {animal_type: {part_category: {'conquered': [...], 'unconquered': [...]}}}
+        counts: {animal_type: {'conquered', 'total', 'categories': {part_category: {'conquered', 'total'}}}}
+        total_conquered / total_parts: 全体の件数
+    """
+    conquered_by_id = {cp['id']: cp for cp in conquered_parts}
+
+    progress = {animal_type: _empty_categories() for animal_type in ANIMAL_TYPES}
+    counts = {
+        animal_type: {
+            'conquered': 0,
+            'total': 0,
+            'categories': {category: {'conquered': 0, 'total': 0} for category in PART_CATEGORIES},
+        }
+        for animal_type in ANIMAL_TYPES
+    }
+    total_parts = 0
+    total_conquered = 0
+
+    for part in all_parts:
+        animal_type = part['animal_type']
+        part_category = part['part_category']
+
+        animal_progress = progress.get(animal_type)
+        if animal_progress is None:
+            animal_progress = progress[animal_type] = _empty_categories()
+            counts[animal_type] = {'conquered': 0, 'total': 0, 'categories': {}}
+        animal_counts = counts[animal_type]
+        category_counts = animal_counts['categories'].setdefault(part_category, {'conquered': 0, 'total': 0})
+        bucket = animal_progress.setdefault(part_category, {'conquered': [], 'unconquered': []})
+
+        total_parts += 1
+        animal_counts['total'] += 1
+        category_counts['total'] += 1
+
+        conquered_part = conquered_by_id.get(part['id'])
+        if conquered_part is not None:
+            # 制覇済み部位に制覇情報を追加
+            bucket['conquered'].append({**part, **conquered_part})
+            total_conquered += 1
+            animal_counts['conquered'] += 1
+            category_counts['conquered'] += 1
+        else:
+            bucket['unconquered'].append(part)
+
+    return {
+        'progress': progress,
+        'counts': counts,
+        'total_conquered': total_conquered,
+        'total_parts': total_parts,
+    }
@@ -0,0 +1,141 @@
+"""API の読み取りクエリ
+
+main.py のハンドラーと scripts/explain_queries.py（EXPLAIN によるインデックス確認）の両方から使う。
+{placeholders} を含むものは IN (...) の個数に合わせて format してから実行する。
+"""
+
+PARTS_SELECT_QUERY = """
+SELECT id, animal_type, part_category, part_name, part_name_jp, description, difficulty_level
+FROM animal_parts
+ORDER BY animal_type, part_category, difficulty_level, id
+"""
+
+USER_BY_GOOGLE_ID_QUERY = "SELECT * FROM users WHERE google_id = %s"
+
+# 制覇済みの部位ID（コンシェルジュ・おすすめ）
+CONQUERED_PART_IDS_QUERY = "SELECT animal_part_id FROM user_part_progress WHERE user_id = %s"
+
+CONCIERGE_RECENT_SESSION_QUERY = """
+SELECT restaurant_name, eaten_at
+FROM eating_sessions
+WHERE user_id = %s
+ORDER BY eaten_at DESC, id DESC
+LIMIT 1
+"""
+
+RECOMMENDATION_PAIRS_QUERY = """
+SELECT er.session_id, er.animal_part_id
+FROM eating_records er
+WHERE er.session_id IS NOT NULL
+"""
+
+# 登録した記録の採番されたIDを読み戻す
+EATING_RECORDS_READ_BACK_QUERY = """
+SELECT id, animal_part_id, session_id, eaten_at, created_at
+FROM eating_records
+WHERE session_id IN ({placeholders})
+ORDER BY id
+"""
+
+# セッション一覧: 部位の集計は返却する行だけに対して相関サブクエリで行う
+# （idx_eating_sessions_user_eaten_at を使って LIMIT 件で走査が止まる）
+SESSIONS_LIST_QUERY = """
+SELECT es.*,
+       (SELECT COUNT(er.id)
+        FROM eating_records er
+        WHERE er.session_id = es.id) as parts_count,
+       (SELECT GROUP_CONCAT(ap.part_name_jp ORDER BY ap.part_name_jp)
+        FROM eating_records er
+        JOIN animal_parts ap ON er.animal_part_id = ap.id
+        WHERE er.session_id = es.id) as parts_list
+FROM eating_sessions es
+WHERE es.user_id = %s {keyset}
+ORDER BY es.eaten_at DESC, es.id DESC
+LIMIT %s {offset}
+"""
+
+# cursor モードで (eaten_at, id) の続きから読む条件
+SESSIONS_LIST_KEYSET = "AND (es.eaten_at < %s OR (es.eaten_at = %s AND es.id < %s))"
+
+SESSIONS_COUNT_QUERY = "SELECT COUNT(*) as total FROM eating_sessions WHERE user_id = %s"
+
+SESSION_DETAIL_QUERY = """
+SELECT
+    es.id, es.user_id, es.restaurant_name, es.eaten_at, es.memo, es.rating, es.photo_url,
+    es.created_at, es.updated_at,
+    er.id AS record_id, er.animal_part_id, er.eaten_at AS record_eaten_at, er.created_at AS record_created_at,
+    ap.animal_type, ap.part_category, ap.part_name, ap.part_name_jp, ap.description
+FROM eating_sessions es
+LEFT JOIN eating_records er ON er.session_id = es.id
+LEFT JOIN animal_parts ap ON ap.id = er.animal_part_id
+WHERE es.id IN ({placeholders}) AND es.user_id = %s
+ORDER BY es.id, ap.animal_type, ap.part_category, ap.part_name_jp
+"""
+
+# ユーザーが制覇済みの部位（user_part_progress）
+USER_PROGRESS_QUERY = """
+SELECT
+    animal_part_id as id,
+    first_conquered_at as first_conquered_date,
+    last_eaten_at as last_eaten_date,
+    eat_count
+FROM user_part_progress
+WHERE user_id = %s
+"""
+
+# 動物別: 店舗名も返すため eating_records から集計する
+USER_PROGRESS_BY_ANIMAL_QUERY = """
+SELECT
+    er.animal_part_id as id,
+    MIN(er.eaten_at) as first_conquered_date,
+    MAX(er.eaten_at) as last_eaten_date,
+    COUNT(er.id) as eat_count,
+    GROUP_CONCAT(DISTINCT es.restaurant_name) as restaurants
+FROM eating_records er
+LEFT JOIN eating_sessions es ON er.session_id = es.id
+WHERE er.user_id = %s AND er.animal_part_id IN ({placeholders})
+GROUP BY er.animal_part_id
+"""
+
+# 動物別の制覇数（user_part_progress）と今週の記録数・直近7日の記録日数を1クエリで集計
+# （WITH ROLLUP の animal_type が NULL の行が全体の値）
+DASHBOARD_SUMMARY_QUERY = """
+SELECT
+    progress.animal_type,
+    progress.conquered,
+    activity.week_records,
+    activity.streak_days
+FROM (
+    SELECT ap.animal_type, COUNT(*) as conquered
+    FROM user_part_progress upp
+    JOIN animal_parts ap ON upp.animal_part_id = ap.id
+    WHERE upp.user_id = %s
+    GROUP BY ap.animal_type WITH ROLLUP
+) progress
+CROSS JOIN (
+    SELECT
+        SUM(eaten_at >= DATE_SUB(CURDATE(), INTERVAL WEEKDAY(CURDATE()) DAY)) as week_records,
+        COUNT(DISTINCT DATE(eaten_at)) as streak_days
+    FROM eating_records
+    WHERE user_id = %s AND eaten_at >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)
+) activity
+"""
+
+DASHBOARD_RECENT_RECORDS_QUERY = """
+SELECT
+    ap.part_name_jp,
+    ap.animal_type,
+    es.restaurant_name,
+    er.eaten_at
+FROM eating_records er
+JOIN animal_parts ap ON er.animal_part_id = ap.id
+LEFT JOIN eating_sessions es ON er.session_id = es.id
+WHERE er.user_id = %s
+ORDER BY er.eaten_at DESC
+LIMIT 5
+"""
+
+
+def in_placeholders(count: int) -> str:
+    """IN (...) に埋め込む %s の並び"""
+    return ", ".join(["%s"] * count)
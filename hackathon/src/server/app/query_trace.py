@@ -0,0 +1,68 @@
+import contextvars
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+
+class QueryTrace:
+    """1リクエストの間に発行したSQLの件数・合計時間・文ごとの回数
+
+    ``parent`` があれば（trace_queries() を入れ子にした場合）外側のトレースにも記録する。
+    """
+
+    def __init__(self, parent: Optional["QueryTrace"] = None):
+        self.parent = parent
+        self.started = time.perf_counter()
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, seconds: float, rows: int) -> None:
+        self.count += 1
+        self.duration += seconds
+        self.statements[statement] += 1
+        if self.parent is not None:
+            self.parent.record(statement, seconds, rows)
+
+    def repeated(self, min_count: int = 2) -> List[Tuple[str, int]]:
+        """同じ文を複数回発行していれば (文, 回数) を返す（N+1 の手がかり）"""
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= min_count]
+
+    def server_timing(self) -> str:
+        """Server-Timing ヘッダの値（db: SQLの合計時間, app: リクエスト全体）"""
+        elapsed = (time.perf_counter() - self.started) * 1000
+        return f'db;dur={self.duration * 1000:.1f};desc="{self.count} queries", app;dur={elapsed:.1f}'
+
+
+_current_trace: "contextvars.ContextVar[Optional[QueryTrace]]" = contextvars.ContextVar("query_trace", default=None)
+
+
+def current_trace() -> Optional[QueryTrace]:
+    return _current_trace.get()
+
+
+def record_query(statement: str, seconds: float, rows: int) -> None:
+    """db_instrument のリスナー。トレース中のリクエストにだけ記録する"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record(statement, seconds, rows)
+
+
+@contextmanager
+def trace_queries() -> Iterator[QueryTrace]:
+    """ブロック内（同じコンテキストから呼ばれたスレッドプールを含む）で発行したSQLを数える
+
+        with trace_queries() as trace:
+            ...
+        assert trace.count <= 3
+
+    外側でも trace_queries() していれば、ブロック内のSQLは外側の件数にも含まれる
+    （テストからリクエスト全体の件数を数える場合など）。
+    """
+    trace = QueryTrace(_current_trace.get())
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
@@ -0,0 +1,169 @@
+import threading
+import time
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 共起の近さに加える人気度（その部位を含む食事回数）の重み
+POPULARITY_WEIGHT = 0.1
+
+
+class Recommendation:
+    __slots__ = ("part_id", "score", "related_part_id")
+
+    def __init__(self, part_id: int, score: float, related_part_id: Optional[int]):
+        self.part_id = part_id
+        self.score = score
+        # この部位を推す理由になった制覇済み部位（一緒に食べられることが最も多いもの）
+        self.related_part_id = related_part_id
+
+
+class RecommendationModel:
+    """同じ食事（eating_sessions）で一緒に食べられた部位の共起から作った推薦モデル
+
+    similarity[i, j] は部位 i と j を含む食事回数をそれぞれの食事回数で正規化した値（コサイン類似度）。
+    作成後は変更しないため、複数スレッドからそのまま参照できる。
+    """
+
+    def __init__(self, part_ids: Sequence[int], similarity: np.ndarray, popularity: np.ndarray, sessions: int):
+        self.part_ids = np.asarray(part_ids, dtype=np.int64)
+        self.index = {int(part_id): i for i, part_id in enumerate(self.part_ids)}
+        self.similarity = similarity
+        self.popularity = popularity
+        self.sessions = sessions
+        self.built_at = time.time()
+        peak = popularity.max() if popularity.size else 0
+        self._popularity_score = popularity / peak if peak > 0 else np.zeros_like(popularity)
+
+    @classmethod
+    def build(
+        cls,
+        part_ids: Sequence[int],
+        pairs: Iterable[Tuple[int, int]],
+        chunk_sessions: int = 20000,
+    ) -> "RecommendationModel":
+        """(session_id, animal_part_id) の組から共起行列を作る
+
+        食事×部位の 0/1 行列 S を ``chunk_sessions`` 件ずつ作り、S.T @ S を足し合わせる。
+        """
+        part_ids = list(part_ids)
+        n = len(part_ids)
+        data = np.fromiter(
+            (value for pair in pairs for value in pair), dtype=np.int64
+        ).reshape(-1, 2)
+
+        counts = np.zeros((n, n), dtype=np.float64)
+        sessions = 0
+        if n and len(data):
+            # 部位IDを行列の列番号へ（部位マスターに無いIDは除く）
+            lookup = np.full(max(max(part_ids), int(data[:, 1].max())) + 1, -1, dtype=np.int64)
+            lookup[part_ids] = np.arange(n)
+            cols = lookup[data[:, 1]]
+            valid = cols >= 0
+            session_ids, rows = np.unique(data[valid, 0], return_inverse=True)
+            cols = cols[valid]
+            sessions = len(session_ids)
+
+            order = np.argsort(rows, kind="stable")
+            rows, cols = rows[order], cols[order]
+            bounds = np.searchsorted(rows, np.arange(0, sessions + chunk_sessions, chunk_sessions))
+            for chunk, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+                if start == end:
+                    continue
+                incidence = np.zeros((chunk_sessions, n), dtype=np.float32)
+                incidence[rows[start:end] - chunk * chunk_sessions, cols[start:end]] = 1.0
+                counts += incidence.T @ incidence
+
+        popularity = counts.diagonal().copy()
+        np.fill_diagonal(counts, 0.0)
+        norms = np.sqrt(np.outer(popularity, popularity))
+        similarity = np.divide(counts, norms, out=np.zeros_like(counts), where=norms > 0)
+        return cls(part_ids, similarity, popularity, sessions)
+
+    def recommend(self, eaten_part_ids: Iterable[int], limit: int = 5) -> List[Recommendation]:
+        """未制覇の部位を、制覇済み部位との共起の近さ（平均）と人気度で順位付けする
+
+        制覇済みが無いユーザーは人気度のみで並べる。同点は部位マスターの並び順。
+        """
+        n = len(self.part_ids)
+        if n == 0 or limit <= 0:
+            return []
+
+        eaten = np.fromiter(
+            (self.index[part_id] for part_id in set(eaten_part_ids) if part_id in self.index), dtype=np.int64
+        )
+        scores = POPULARITY_WEIGHT * self._popularity_score
+        related = None
+        if len(eaten):
+            contributions = self.similarity[eaten]
+            scores = scores + contributions.mean(axis=0)
+            related = contributions.argmax(axis=0)
+            has_related = contributions.max(axis=0) > 0
+        scores = scores.copy()
+        scores[eaten] = -np.inf
+
+        results = []
+        for i in np.argsort(-scores, kind="stable")[:limit]:
+            if not np.isfinite(scores[i]):
+                break
+            related_part_id = None
+            if related is not None and has_related[i]:
+                related_part_id = int(self.part_ids[eaten[related[i]]])
+            results.append(Recommendation(int(self.part_ids[i]), round(float(scores[i]), 4), related_part_id))
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "parts": len(self.part_ids),
+            "sessions": self.sessions,
+            "built_at": self.built_at,
+        }
+
+
+class RecommendationEngine:
+    """最新の RecommendationModel を保持し、定期的に作り直す
+
+    作成中も古いモデルでそのまま応答し、作成が重ならないようにだけ排他する。
+    """
+
+    def __init__(self, builder: Callable[[], RecommendationModel], refresh_interval: float = 600.0):
+        self._builder = builder
+        self.refresh_interval = refresh_interval
+        self._model: Optional[RecommendationModel] = None
+        self._build_lock = threading.Lock()
+        self.last_build_seconds: Optional[float] = None
+
+    def get(self) -> Optional[RecommendationModel]:
+        return self._model
+
+    def refresh(self) -> RecommendationModel:
+        """モデルを作り直す（定期更新・管理用の再読み込み）"""
+        with self._build_lock:
+            return self._build()
+
+    def get_or_build(self) -> RecommendationModel:
+        """モデルが無ければ作る（同時に呼ばれても作成は1回だけ）"""
+        model = self._model
+        if model is not None:
+            return model
+        with self._build_lock:
+            # 待っている間に他のスレッドが作り終えていればそれを使う
+            if self._model is not None:
+                return self._model
+            return self._build()
+
+    def _build(self) -> RecommendationModel:
+        started = time.perf_counter()
+        model = self._builder()
+        self.last_build_seconds = round(time.perf_counter() - started, 3)
+        self._model = model
+        return model
+
+    def stats(self) -> dict:
+        model = self._model
+        return {
+            "loaded": model is not None,
+            "refresh_interval": self.refresh_interval,
+            "last_build_seconds": self.last_build_seconds,
+            **(model.stats() if model else {}),
+        }
@@ -0,0 +1,143 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import FrozenSet, Optional, Tuple
+
+# 比較時に無視する記号・空白（全角は NFKC で半角に寄せてから除去する）
+_IGNORED_CHARS = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def normalize_message(message: str) -> str:
+    """表記ゆれを吸収した比較用の文字列"""
+    text = unicodedata.normalize("NFKC", message).lower()
+    return _IGNORED_CHARS.sub("", text)
+
+
+def char_bigrams(text: str) -> FrozenSet[str]:
+    if len(text) < 2:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + 2] for i in range(len(text) - 1))
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """文字bigramのJaccard係数"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class _Entry:
+    __slots__ = ("normalized", "bigrams", "reply", "expires_at")
+
+    def __init__(self, normalized: str, bigrams: FrozenSet[str], reply: str, expires_at: float):
+        self.normalized = normalized
+        self.bigrams = bigrams
+        self.reply = reply
+        self.expires_at = expires_at
+
+
+class SemanticResponseCache:
+    """よくある質問への応答を使い回すキャッシュ
+
+    コンテキストの指紋（同じ制覇状況なら同じ値）ごとに応答を保持し、
+    正規化した質問文が一致するか、文字bigramの類似度が ``threshold`` 以上なら再利用する。
+    """
+
+    def __init__(self, threshold: float = 0.75, ttl: float = 3600.0, max_entries: int = 2048, max_per_fingerprint: int = 32):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_per_fingerprint = max_per_fingerprint
+        self._buckets: "OrderedDict[str, OrderedDict[str, _Entry]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def lookup(self, message: str, fingerprint: str) -> Optional[Tuple[str, float]]:
+        """(応答, 類似度) を返す。該当なしなら None"""
+        normalized = normalize_message(message)
+        if not normalized:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(fingerprint)
+            if bucket is None:
+                self.misses += 1
+                return None
+
+            entry = bucket.get(normalized)
+            if entry is not None and entry.expires_at >= now:
+                bucket.move_to_end(normalized)
+                self.exact_hits += 1
+                return entry.reply, 1.0
+
+            bigrams = char_bigrams(normalized)
+            best: Optional[_Entry] = None
+            best_score = 0.0
+            for key, candidate in list(bucket.items()):
+                if candidate.expires_at < now:
+                    del bucket[key]
+                    self._size -= 1
+                    continue
+                score = similarity(bigrams, candidate.bigrams)
+                if score > best_score:
+                    best, best_score = candidate, score
+
+            if best is not None and best_score >= self.threshold:
+                bucket.move_to_end(best.normalized)
+                self.similar_hits += 1
+                return best.reply, best_score
+
+            self.misses += 1
+            return None
+
+    def store(self, message: str, fingerprint: str, reply: str) -> None:
+        if not self.enabled:
+            return
+        normalized = normalize_message(message)
+        if not normalized:
+            return
+        entry = _Entry(normalized, char_bigrams(normalized), reply, time.monotonic() + self.ttl)
+        with self._lock:
+            bucket = self._buckets.setdefault(fingerprint, OrderedDict())
+            self._buckets.move_to_end(fingerprint)
+            if normalized not in bucket:
+                self._size += 1
+            bucket[normalized] = entry
+            bucket.move_to_end(normalized)
+            while len(bucket) > self.max_per_fingerprint:
+                bucket.popitem(last=False)
+                self._size -= 1
+            # 全体の上限を超えたら最も使われていない指紋の古い応答から捨てる
+            while self._size > self.max_entries and self._buckets:
+                oldest_fingerprint, oldest_bucket = next(iter(self._buckets.items()))
+                oldest_bucket.popitem(last=False)
+                self._size -= 1
+                if not oldest_bucket:
+                    del self._buckets[oldest_fingerprint]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return {
+            "size": self._size,
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl": self.ttl,
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.similar_hits) / lookups, 3) if lookups else 0,
+        }
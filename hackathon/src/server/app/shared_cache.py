@@ -0,0 +1,305 @@
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.ttl_cache import TTLCache
+
+logger = logging.getLogger("tabebui.cache")
+
+# 無効化の通知を受け取るリスナー（引数はユーザーID）
+InvalidationListener = Callable[[int], None]
+
+
+class SharedCacheBackend(ABC):
+    """ワーカー間で共有するキャッシュの保存先のインターフェース
+
+    値は bytes で扱う。publish した通知は subscribe した全ワーカー（自分を含む）に届く。
+    ``blocking`` が True の実装はネットワーク越しの呼び出しになるため、
+    async のエンドポイントからはスレッドプール経由で呼ぶ。
+    """
+
+    blocking = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def publish(self, channel: str, message: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def subscribe(self, channel: str, callback: Callable[[str], None]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class InMemorySharedCacheBackend(SharedCacheBackend):
+    """プロセス内メモリの実装（単一ワーカー・動作確認用）
+
+    同じインスタンスを複数の UserResponseCache に渡すと、ワーカー間の共有と通知を同じプロセス内で再現できる。
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        # キー → (期限, 値)。件数上限を超えたら最も古く使われたものから捨てる
+        self._values: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        # 版数などのカウンター（期限なし・件数上限の対象外）
+        self._counters: Dict[str, int] = {}
+        self._subscribers: Dict[str, List[Callable[[str], None]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if key in self._counters:
+                return str(self._counters[key]).encode()
+            entry = self._values.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._values[key]
+                return None
+            self._values.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._values[key] = (time.monotonic() + ttl, value)
+            self._values.move_to_end(key)
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def publish(self, channel: str, message: str) -> None:
+        with self._lock:
+            callbacks = list(self._subscribers.get(channel, ()))
+        for callback in callbacks:
+            callback(message)
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]) -> None:
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(callback)
+
+
+class RedisSharedCacheBackend(SharedCacheBackend):
+    """Redis（または Redis プロトコル互換のサーバー）の実装
+
+    通知は Redis の Pub/Sub で配信し、購読はワーカーごとのバックグラウンドスレッドで受ける。
+    """
+
+    blocking = True
+
+    def __init__(self, url: str, socket_timeout: float = 0.5):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("redis package is not installed on the server.") from exc
+        self._redis = redis.Redis.from_url(url, socket_timeout=socket_timeout, socket_connect_timeout=socket_timeout)
+        self._threads: List[threading.Thread] = []
+        self._closed = threading.Event()
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._redis.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._redis.set(key, value, px=max(int(ttl * 1000), 1))
+
+    def incr(self, key: str) -> int:
+        return int(self._redis.incr(key))
+
+    def publish(self, channel: str, message: str) -> None:
+        self._redis.publish(channel, message)
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]) -> None:
+        thread = threading.Thread(
+            target=self._listen, args=(channel, callback), name=f"shared-cache-{channel}", daemon=True
+        )
+        self._threads.append(thread)
+        thread.start()
+
+    def _listen(self, channel: str, callback: Callable[[str], None]) -> None:
+        while not self._closed.is_set():
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(channel)
+                while not self._closed.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None and message["type"] == "message":
+                        data = message["data"]
+                        callback(data.decode() if isinstance(data, bytes) else str(data))
+            except Exception as e:
+                # 切断中の通知は失われるため、ローカルのキャッシュは短い有効期限で自然に失効させる
+                logger.warning("shared cache subscription to %s failed: %s", channel, e)
+                self._closed.wait(1.0)
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+    def close(self) -> None:
+        self._closed.set()
+        self._redis.close()
+
+
+def create_shared_cache_backend(kind: str, url: Optional[str] = None) -> Optional[SharedCacheBackend]:
+    """SHARED_CACHE_BACKEND の値から保存先を作成（none なら None）"""
+    if kind == "none":
+        return None
+    if kind == "memory":
+        return InMemorySharedCacheBackend()
+    if kind == "redis":
+        return RedisSharedCacheBackend(url or "redis://localhost:6379/0")
+    raise ValueError(f"Unknown shared cache backend: {kind}")
+
+
+class UserResponseCache:
+    """ユーザーごとのAPIレスポンス（JSONのbytes）をワーカー間で共有するキャッシュ
+
+    - キーはユーザーごとのデータ版数を含む（``<prefix>:<種類>:<ユーザーID>:<版数>:<その他>``）。
+      invalidate() は共有ストアの版数を進めるため、古い版のエントリは以後どのワーカーからも読まれない
+    - 版数と本体は各ワーカーのメモリにも ``local_ttl`` 秒だけ持ち、共有ストアへの往復を減らす
+    - invalidate() はPub/Subで全ワーカーへ通知し、受け取ったワーカーはそのユーザーの版数を捨てる
+      （通知を取りこぼしても ``local_ttl`` 秒で共有ストアから読み直す）
+    - 共有ストアの障害時はキャッシュなしとして振る舞う
+    """
+
+    CHANNEL = "tabebui:user-invalidate"
+
+    def __init__(
+        self,
+        backend: Optional[SharedCacheBackend],
+        prefix: str = "tabebui:v1",
+        ttl: float = 300.0,
+        local_ttl: float = 5.0,
+        local_size: int = 2048,
+    ):
+        self.backend = backend
+        self.prefix = prefix
+        self.ttl = ttl
+        self._versions = TTLCache(maxsize=local_size, ttl=local_ttl)
+        self._bodies = TTLCache(maxsize=local_size if local_ttl > 0 else 0, ttl=local_ttl)
+        self._listeners: List[InvalidationListener] = []
+        self._subscribed = False
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @property
+    def blocking(self) -> bool:
+        return self.backend is not None and self.backend.blocking
+
+    def add_invalidation_listener(self, listener: InvalidationListener) -> None:
+        """他のワーカーを含め、ユーザーのデータが変わったときに呼ばれる処理を登録する"""
+        self._listeners.append(listener)
+
+    def start(self) -> None:
+        """無効化の通知の購読を始める（アプリ起動時に一度呼ぶ）"""
+        if self.backend is None or self._subscribed:
+            return
+        self.backend.subscribe(self.CHANNEL, self._on_invalidate)
+        self._subscribed = True
+
+    def close(self) -> None:
+        if self.backend is not None:
+            self.backend.close()
+
+    def _version_key(self, user_id: int) -> str:
+        return f"{self.prefix}:user-version:{user_id}"
+
+    def _user_version(self, user_id: int) -> int:
+        version = self._versions.get(user_id)
+        if version is None:
+            raw = self.backend.get(self._version_key(user_id))
+            version = int(raw) if raw else 0
+            self._versions.set(user_id, version)
+        return version
+
+    def lookup(self, kind: str, user_id: int, *variant: str) -> Tuple[Optional[str], Optional[bytes]]:
+        """(キー, キャッシュ済みの本体) を返す。本体が None なら作った結果を store(キー, 本体) する"""
+        if self.backend is None:
+            return None, None
+        try:
+            key = ":".join([self.prefix, kind, str(user_id), str(self._user_version(user_id)), *variant])
+            body = self._bodies.get(key)
+            if body is None:
+                body = self.backend.get(key)
+                if body is not None:
+                    self._bodies.set(key, body)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("shared cache lookup failed: %s", e)
+            return None, None
+        if body is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return key, body
+
+    def store(self, key: Optional[str], body: bytes) -> None:
+        if self.backend is None or key is None:
+            return
+        try:
+            self.backend.set(key, body, self.ttl)
+            self._bodies.set(key, body)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("shared cache store failed: %s", e)
+
+    def invalidate(self, user_id: int) -> None:
+        """ユーザーの版数を進め、全ワーカーへ通知する（書き込みのコミット後に呼ぶ）"""
+        if self.backend is not None:
+            try:
+                self.backend.incr(self._version_key(user_id))
+            except Exception as e:
+                self.errors += 1
+                logger.warning("shared cache invalidation for user %s failed: %s", user_id, e)
+        # 自分のワーカーは通知の到着を待たずに破棄する（自分宛ての通知が届いても二重に捨てるだけ）
+        self._on_invalidate(str(user_id))
+        if self.backend is not None:
+            try:
+                self.backend.publish(self.CHANNEL, str(user_id))
+            except Exception as e:
+                self.errors += 1
+                logger.warning("shared cache invalidation notice for user %s failed: %s", user_id, e)
+
+    def _on_invalidate(self, message: str) -> None:
+        try:
+            user_id = int(message)
+        except ValueError:
+            return
+        self._versions.pop(user_id)
+        for listener in self._listeners:
+            listener(user_id)
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "local": self._bodies.stats(),
+        }
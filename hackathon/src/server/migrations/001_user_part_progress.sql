@@ -0,0 +1,13 @@
+-- user_part_progress（ユーザー×部位の制覇状況サマリ）を追加
+-- 作成後に scripts/backfill_user_part_progress.py で既存の eating_records から集計すること
+CREATE TABLE IF NOT EXISTS user_part_progress (
+    user_id INT NOT NULL,
+    animal_part_id INT NOT NULL,
+    first_conquered_at TIMESTAMP NOT NULL,
+    last_eaten_at TIMESTAMP NOT NULL,
+    eat_count INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, animal_part_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (animal_part_id) REFERENCES animal_parts(id)
+);
@@ -0,0 +1,3 @@
+-- セッション一覧のキーセットページング / 最新セッション取得用
+-- GET /api/eating-sessions, build_concierge_context
+CREATE INDEX idx_eating_sessions_user_eaten_at ON eating_sessions(user_id, eaten_at, id);
@@ -0,0 +1,24 @@
+-- セッション単位の部位記録取得・件数集計（session_id の外部キー用インデックスを置き換える）
+-- GET /api/eating-sessions の parts_count/parts_list, GET /api/eating-sessions/{id}, 記録登録後の読み戻し
+CREATE INDEX idx_eating_records_session_part ON eating_records(session_id, animal_part_id);
+
+-- ユーザー×部位ごとの記録集計（user_id の外部キー用インデックスを置き換える）
+-- GET /api/user-progress/{animal_type}
+CREATE INDEX idx_eating_records_user_part ON eating_records(user_id, animal_part_id, eaten_at, session_id);
+
+-- 未制覇部位ビューを CROSS JOIN + LEFT JOIN eating_records から
+-- user_part_progress の主キーを使った反結合に変更
+CREATE OR REPLACE VIEW user_missing_parts AS
+SELECT
+    u.id as user_id,
+    u.name,
+    ap.id as animal_part_id,
+    ap.animal_type,
+    ap.part_name_jp
+FROM users u
+JOIN animal_parts ap
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM user_part_progress upp
+    WHERE upp.user_id = u.id AND upp.animal_part_id = ap.id
+);
@@ -0,0 +1,74 @@
+"""eating_records から user_part_progress を再構築するバックフィルコマンド
+
+    cd src/server
+    python -m scripts.backfill_user_part_progress            # 全ユーザー
+    python -m scripts.backfill_user_part_progress --user-id 1
+
+接続先は scripts/dbutil.py の connect()（API と同じ DB_* 環境変数）。
+ユーザーごとに DELETE + INSERT ... SELECT を1トランザクションで行うため、
+稼働中に実行しても対象ユーザーの集計が途中状態で見えることはない。
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.dbutil import connect  # noqa: E402
+
+REBUILD_DELETE = "DELETE FROM user_part_progress WHERE user_id IN ({placeholders})"
+
+REBUILD_INSERT = """
+INSERT INTO user_part_progress (user_id, animal_part_id, first_conquered_at, last_eaten_at, eat_count)
+SELECT user_id, animal_part_id, MIN(eaten_at), MAX(eaten_at), COUNT(*)
+FROM eating_records
+WHERE user_id IN ({placeholders})
+GROUP BY user_id, animal_part_id
+"""
+
+
+def target_user_ids(conn, user_id: Optional[int]) -> List[int]:
+    if user_id is not None:
+        return [user_id]
+    with conn.cursor() as cur:
+        cur.execute("SELECT id FROM users ORDER BY id")
+        return [row["id"] for row in cur.fetchall()]
+
+
+def rebuild(conn, user_ids: List[int]) -> int:
+    """指定ユーザーの集計を作り直し、作成した行数を返す"""
+    placeholders = ",".join(["%s"] * len(user_ids))
+    try:
+        with conn.cursor() as cur:
+            cur.execute(REBUILD_DELETE.format(placeholders=placeholders), user_ids)
+            cur.execute(REBUILD_INSERT.format(placeholders=placeholders), user_ids)
+            inserted = cur.rowcount
+        conn.commit()
+        return inserted
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="user_part_progress を eating_records から再構築")
+    parser.add_argument("--user-id", type=int, help="対象ユーザー（省略時は全ユーザー）")
+    parser.add_argument("--batch-size", type=int, default=100, help="1トランザクションで処理するユーザー数")
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        user_ids = target_user_ids(conn, args.user_id)
+        total_rows = 0
+        for start in range(0, len(user_ids), args.batch_size):
+            batch = user_ids[start:start + args.batch_size]
+            total_rows += rebuild(conn, batch)
+            print(f"users {start + len(batch)}/{len(user_ids)} done")
+        print(f"rebuilt {total_rows} user_part_progress rows for {len(user_ids)} users")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
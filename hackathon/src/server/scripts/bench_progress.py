@@ -0,0 +1,104 @@
+"""進捗集計(build_progress)のスケーリングを計測するベンチマーク
+
+部位数を増やした合成カタログで、旧実装（部位ごとに next() で制覇情報を探索し、
+動物ごとに全部位を再走査する方式）と build_progress の処理時間を比較する。
+
+    cd src/server
+    python -m scripts.bench_progress --sizes 100 1000 5000 10000
+
+部位数が10倍になったとき、build_progress はおおむね10倍、旧実装はおおむね100倍になる。
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.progress import ANIMAL_TYPES, PART_CATEGORIES, build_progress  # noqa: E402
+
+
+def make_catalog(size: int, conquered_ratio: float, seed: int) -> Tuple[List[dict], List[dict]]:
+    rng = random.Random(seed)
+    parts = []
+    for part_id in range(1, size + 1):
+        parts.append({
+            'id': part_id,
+            'animal_type': ANIMAL_TYPES[part_id % len(ANIMAL_TYPES)],
+            'part_category': PART_CATEGORIES[part_id % len(PART_CATEGORIES)],
+            'part_name': f'part_{part_id}',
+            'part_name_jp': f'部位{part_id}',
+            'description': None,
+            'difficulty_level': rng.randint(1, 5),
+        })
+    conquered = [
+        {'id': part['id'], 'first_conquered_date': None, 'last_eaten_date': None, 'eat_count': 1}
+        for part in parts
+        if rng.random() < conquered_ratio
+    ]
+    return parts, conquered
+
+
+def legacy_progress(all_parts: List[dict], conquered_parts: List[dict]) -> dict:
+    """変更前の get_user_progress と同じ計算方法"""
+    conquered_ids = {part['id'] for part in conquered_parts}
+    progress_data = {
+        animal_type: {category: {'conquered': [], 'unconquered': []} for category in PART_CATEGORIES}
+        for animal_type in ANIMAL_TYPES
+    }
+    for part in all_parts:
+        bucket = progress_data[part['animal_type']][part['part_category']]
+        if part['id'] in conquered_ids:
+            conquered_part = next(cp for cp in conquered_parts if cp['id'] == part['id'])
+            bucket['conquered'].append({**part, **conquered_part})
+        else:
+            bucket['unconquered'].append(part)
+
+    stats = {}
+    for animal_type in ANIMAL_TYPES:
+        animal_parts = [p for p in all_parts if p['animal_type'] == animal_type]
+        stats[animal_type] = len([p for p in animal_parts if p['id'] in conquered_ids])
+    return {'progress': progress_data, 'stats': stats}
+
+
+def best_of(func: Callable[[], object], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 2000, 5000, 10000])
+    parser.add_argument('--conquered-ratio', type=float, default=0.5)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-legacy-above', type=int, default=20000,
+                        help='この部位数を超えたら旧実装の計測を省略する')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'parts':>8} {'build_progress(ms)':>20} {'per part(us)':>14} {'legacy(ms)':>12} {'speedup':>9}")
+    for size in args.sizes:
+        parts, conquered = make_catalog(size, args.conquered_ratio, args.seed)
+
+        new_seconds = best_of(lambda: build_progress(parts, conquered), args.repeat)
+        per_part_us = new_seconds / size * 1e6
+
+        if size <= args.skip_legacy_above:
+            legacy_seconds = best_of(lambda: legacy_progress(parts, conquered), args.repeat)
+            legacy_label = f"{legacy_seconds * 1000:12.2f}"
+            speedup = f"{legacy_seconds / new_seconds:8.1f}x"
+        else:
+            legacy_label = f"{'-':>12}"
+            speedup = f"{'-':>9}"
+
+        print(f"{size:>8} {new_seconds * 1000:>20.3f} {per_part_us:>14.3f} {legacy_label} {speedup}")
+
+
+if __name__ == '__main__':
+    main()
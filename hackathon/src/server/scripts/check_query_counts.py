@@ -0,0 +1,129 @@
+"""エンドポイントごとのSQL発行数が上限以内かを確かめるチェック（N+1 の混入を検出する）
+
+QUERY_DEBUG=1 で起動した API の X-Query-Count ヘッダを読み、QUERY_BUDGETS を超えたら失敗する。
+部位マスターや推薦モデルの読み込みを除いた定常状態で比べるため、各エンドポイントは
+1回目を捨てて2回目の値で判定する。
+
+    cd src/server
+    python -m scripts.seed_load_data --reset
+    # API をこのコマンドから起動して確認（QUERY_DEBUG=1, GEMINI_FAKE=1。終了時に停止）
+    python -m scripts.check_query_counts --start-server
+    # 起動済みの API に対して確認（サーバー側を QUERY_DEBUG=1, SHARED_CACHE_BACKEND=none で起動しておく）
+    python -m scripts.check_query_counts --base-url http://localhost:8000
+
+main.py のハンドラーでクエリを増減させたら QUERY_BUDGETS も合わせて更新すること。
+同じ上限は tests/test_query_budgets.py（擬似的な接続で API を呼ぶ pytest）でも確認する。
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+from pathlib import Path
+from urllib.parse import urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.load_test import ENDPOINTS, SERVER_DIR, load_context, wait_for_health  # noqa: E402
+
+# 集計名（scripts.load_test.ENDPOINTS と同じ）→ 1リクエストあたりのSQL発行数の上限
+QUERY_BUDGETS = {
+    "GET /api/animal-parts": 0,
+    "GET /api/animal-parts/{animal_type}": 0,
+    "GET /api/users/{google_id}": 1,
+    "GET /api/user-progress": 1,
+    "GET /api/user-progress/{animal_type}": 1,
+    "GET /api/dashboard-stats": 2,
+    "GET /api/eating-sessions": 2,
+    "GET /api/eating-sessions?pagination=cursor": 1,
+    "GET /api/eating-sessions/{session_id}": 1,
+    "GET /api/eating-sessions/details": 1,
+    "GET /api/recommendations": 1,
+    "POST /api/eating-records": 4,
+    "POST /api/chat/message": 2,
+    "POST /api/chat/message/stream": 2,
+}
+
+
+def query_count(conn: http.client.HTTPConnection, request) -> int:
+    method, path, body = request
+    headers = {}
+    payload = None
+    if body is not None:
+        payload = json.dumps(body).encode("utf-8")
+        headers["Content-Type"] = "application/json"
+    conn.request(method, path, body=payload, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    if response.status >= 400:
+        raise RuntimeError(f"{method} {path} returned {response.status}")
+    value = response.getheader("X-Query-Count")
+    if value is None:
+        sys.exit("X-Query-Count ヘッダがありません。API を QUERY_DEBUG=1 で起動してください。")
+    return int(value)
+
+
+def start_server(base_url: str) -> subprocess.Popen:
+    target = urlsplit(base_url)
+    env = dict(os.environ)
+    # レスポンスキャッシュが効くと2回目が0件になり判定にならないため無効にする
+    env.update({
+        "QUERY_DEBUG": "1",
+        "GEMINI_FAKE": "1",
+        "GEMINI_FAKE_LATENCY": "0",
+        "CHAT_RESPONSE_CACHE_SIZE": "0",
+        "SHARED_CACHE_BACKEND": "none",
+    })
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", target.hostname, "--port", str(target.port or 80), "--log-level", "warning",
+    ]
+    return subprocess.Popen(command, cwd=SERVER_DIR, env=env)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="エンドポイントごとのSQL発行数をチェック")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="API のURL")
+    parser.add_argument("--start-server", action="store_true", help="uvicorn をこのコマンドから起動する（QUERY_DEBUG=1）")
+    parser.add_argument("--read-only", action="store_true", help="書き込み（食事記録の登録）を送らない")
+    parser.add_argument("--prefix", default="load", help="負荷試験用ユーザーの google_id の接頭辞")
+    parser.add_argument("--seed", type=int, default=42, help="乱数シード")
+    args = parser.parse_args()
+
+    ctx = load_context(args.prefix)
+    rng = random.Random(args.seed)
+    user = ctx.users[0]
+
+    server = start_server(args.base_url) if args.start_server else None
+    try:
+        wait_for_health(args.base_url, 60.0, server)
+        target = urlsplit(args.base_url)
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        failures = []
+        try:
+            for name, _, build, writes in ENDPOINTS:
+                if args.read_only and writes:
+                    continue
+                budget = QUERY_BUDGETS.get(name)
+                query_count(conn, build(ctx, rng, user))
+                count = query_count(conn, build(ctx, rng, user))
+                status = "ok" if budget is None or count <= budget else "FAIL"
+                print(f"{status:4} {name}: {count} queries (budget {budget if budget is not None else '-'})")
+                if status == "FAIL":
+                    failures.append(name)
+        finally:
+            conn.close()
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if failures:
+        sys.exit(f"{len(failures)} endpoint(s) exceeded the query budget")
+    print("all endpoints within budget")
+
+
+if __name__ == "__main__":
+    main()
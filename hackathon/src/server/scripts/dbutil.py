@@ -0,0 +1,21 @@
+"""scripts 配下のコマンドで共通のDB接続
+
+接続先は API と同じ DB_HOST / DB_PORT / DB_USER / DB_PASSWORD / DB_NAME 環境変数で指定する。
+"""
+import os
+
+import pymysql
+
+
+def connect(**overrides):
+    params = dict(
+        host=os.getenv("DB_HOST", "db"),
+        port=int(os.getenv("DB_PORT", "3306")),
+        user=os.getenv("DB_USER", "app"),
+        password=os.getenv("DB_PASSWORD", "app"),
+        database=os.getenv("DB_NAME", "tabebui"),
+        connect_timeout=3,
+        cursorclass=pymysql.cursors.DictCursor,
+    )
+    params.update(overrides)
+    return pymysql.connect(**params)
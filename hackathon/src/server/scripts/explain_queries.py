@@ -0,0 +1,169 @@
+"""API が発行するクエリを EXPLAIN し、フルスキャンがあれば失敗するチェック
+
+    cd src/server
+    python -m scripts.migrate
+    python -m scripts.explain_queries [--min-rows 1000]
+
+シード済みのローカルMySQL（db/ の初期化SQL、または負荷試験用のデータ生成で投入したもの）に対して実行する。
+SQL は app/queries.py の定数をそのまま使う。API に読み取りクエリを追加したら QUERIES にも加えること。
+
+判定:
+- type が ALL（テーブルフルスキャン）または index（インデックスフルスキャン）の行を検出する
+- 使えるインデックスが無い（possible_keys が空）場合は行数に関係なく失敗
+- インデックスがあっても見積もり行数が --min-rows 以上でフルスキャンしていれば失敗
+  （数行しかないテーブルではオプティマイザがあえてフルスキャンを選ぶため）
+- ALLOWED_FULL_SCANS のテーブルは対象外（部位マスターの読み込みとおすすめモデルの作り直しは全件が必要なため）
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.queries import (  # noqa: E402
+    CONCIERGE_RECENT_SESSION_QUERY,
+    CONQUERED_PART_IDS_QUERY,
+    DASHBOARD_RECENT_RECORDS_QUERY,
+    DASHBOARD_SUMMARY_QUERY,
+    EATING_RECORDS_READ_BACK_QUERY,
+    PARTS_SELECT_QUERY,
+    RECOMMENDATION_PAIRS_QUERY,
+    SESSION_DETAIL_QUERY,
+    SESSIONS_COUNT_QUERY,
+    SESSIONS_LIST_KEYSET,
+    SESSIONS_LIST_QUERY,
+    USER_BY_GOOGLE_ID_QUERY,
+    USER_PROGRESS_BY_ANIMAL_QUERY,
+    USER_PROGRESS_QUERY,
+    in_placeholders,
+)
+from scripts.dbutil import connect  # noqa: E402
+
+# (クエリ名, 許可するフルスキャン対象テーブル)
+ALLOWED_FULL_SCANS = {
+    ("parts_cache_load", "animal_parts"),
+    # おすすめモデルの作成は全件の共起を集計するため走査が前提。各ワーカーが起動時（または最初のおすすめ要求時）、
+    # RECOMMENDATION_REFRESH_INTERVAL 秒ごと、管理用の再読み込み時に実行する（通常のリクエストでは実行しない）
+    ("recommendations.pairs", "eating_records"),
+}
+
+# (クエリ名, SQL, パラメータを作る関数) — パラメータ関数は sample() の結果を受け取る
+# SQL は API と同じ app.queries の定数を使う。{placeholders} は check() で IN (...) の個数に合わせる
+QUERIES: List[Tuple[str, str, Callable[[Dict], list]]] = [
+    ("parts_cache_load", PARTS_SELECT_QUERY, lambda s: []),
+    ("users.by_google_id", USER_BY_GOOGLE_ID_QUERY, lambda s: [s["google_id"]]),
+    ("concierge.conquered_ids", CONQUERED_PART_IDS_QUERY, lambda s: [s["user_id"]]),
+    ("concierge.recent_session", CONCIERGE_RECENT_SESSION_QUERY, lambda s: [s["user_id"]]),
+    ("recommendations.pairs", RECOMMENDATION_PAIRS_QUERY, lambda s: []),
+    ("eating_records.read_back", EATING_RECORDS_READ_BACK_QUERY, lambda s: [s["session_id"]]),
+    (
+        "eating_sessions.list_offset",
+        SESSIONS_LIST_QUERY.format(keyset="", offset="OFFSET %s"),
+        lambda s: [s["user_id"], 20, 0],
+    ),
+    (
+        "eating_sessions.list_cursor",
+        SESSIONS_LIST_QUERY.format(keyset=SESSIONS_LIST_KEYSET, offset=""),
+        lambda s: [s["user_id"], s["eaten_at"], s["eaten_at"], s["session_id"], 21],
+    ),
+    ("eating_sessions.count", SESSIONS_COUNT_QUERY, lambda s: [s["user_id"]]),
+    ("eating_session_detail", SESSION_DETAIL_QUERY, lambda s: [s["session_id"], s["user_id"]]),
+    ("user_progress.conquered", USER_PROGRESS_QUERY, lambda s: [s["user_id"]]),
+    (
+        "user_progress_by_animal.conquered",
+        USER_PROGRESS_BY_ANIMAL_QUERY,
+        lambda s: [s["user_id"]] + s["beef_part_ids"],
+    ),
+    ("dashboard.summary", DASHBOARD_SUMMARY_QUERY, lambda s: [s["user_id"], s["user_id"]]),
+    ("dashboard.recent_records", DASHBOARD_RECENT_RECORDS_QUERY, lambda s: [s["user_id"]]),
+]
+
+# {placeholders} の個数 = パラメータ数 - IN (...) 以外のパラメータ数
+IN_EXTRA_PARAMS = {
+    "eating_records.read_back": 0,
+    "eating_session_detail": 1,
+    "user_progress_by_animal.conquered": 1,
+}
+
+
+def sample(conn) -> Dict:
+    """EXPLAIN に使う代表値（記録が最も多いユーザーとその最新セッション）"""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT u.id, u.google_id, COUNT(er.id) as records
+            FROM users u
+            LEFT JOIN eating_records er ON er.user_id = u.id
+            GROUP BY u.id, u.google_id
+            ORDER BY records DESC
+            LIMIT 1
+            """
+        )
+        user = cur.fetchone()
+        if not user:
+            raise SystemExit("users が空です。シード済みのDBに対して実行してください")
+        cur.execute(
+            "SELECT id, eaten_at FROM eating_sessions WHERE user_id = %s ORDER BY eaten_at DESC, id DESC LIMIT 1",
+            (user["id"],),
+        )
+        session = cur.fetchone() or {"id": 0, "eaten_at": None}
+        cur.execute("SELECT id FROM animal_parts WHERE animal_type = 'beef' ORDER BY id")
+        beef_part_ids = [row["id"] for row in cur.fetchall()] or [0]
+    return {
+        "user_id": user["id"],
+        "google_id": user["google_id"],
+        "session_id": session["id"],
+        "eaten_at": session["eaten_at"],
+        "beef_part_ids": beef_part_ids,
+    }
+
+
+def check(conn, min_rows: int) -> List[str]:
+    values = sample(conn)
+    violations = []
+    with conn.cursor() as cur:
+        for name, sql, params_for in QUERIES:
+            params = params_for(values)
+            if "{placeholders}" in sql:
+                sql = sql.format(placeholders=in_placeholders(len(params) - IN_EXTRA_PARAMS[name]))
+            cur.execute("EXPLAIN " + sql, params)
+            for row in cur.fetchall():
+                table = row.get("table") or ""
+                access = row.get("type")
+                if table.startswith("<") or access not in ("ALL", "index"):
+                    continue
+                if (name, table) in ALLOWED_FULL_SCANS:
+                    continue
+                rows = row.get("rows") or 0
+                if row.get("possible_keys") is None or rows >= min_rows:
+                    violations.append(
+                        f"{name}: {table} type={access} rows={rows} "
+                        f"possible_keys={row.get('possible_keys')} key={row.get('key')} extra={row.get('Extra')}"
+                    )
+            print(f"checked {name}")
+    return violations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="APIクエリのEXPLAINチェック")
+    parser.add_argument("--min-rows", type=int, default=1000,
+                        help="インデックスがあってもフルスキャンを失敗とみなす見積もり行数")
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        violations = check(conn, args.min_rows)
+    finally:
+        conn.close()
+
+    if violations:
+        print("\nfull scans detected:")
+        for violation in violations:
+            print(f"  {violation}")
+        sys.exit(1)
+    print("\nno full scans")
+
+
+if __name__ == "__main__":
+    main()
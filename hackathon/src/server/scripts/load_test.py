@@ -0,0 +1,351 @@
+"""API の負荷試験（エンドポイント別の p50/p95/p99 とスループットを JSON で出力）
+
+scripts.seed_load_data で投入した負荷試験用ユーザーを使い、/api 配下の各エンドポイントに
+重み付きの混合トラフィックを送る。Gemini は GEMINI_FAKE=1 の擬似モデルで応答させる。
+
+    cd src/server
+    python -m scripts.seed_load_data --reset
+    # API をこのコマンドから起動して計測（終了時に停止）
+    python -m scripts.load_test --start-server --duration 60 --concurrency 32 --output load.json
+    # 起動済みの API に対して計測（サーバー側を GEMINI_FAKE=1 で起動しておく）
+    python -m scripts.load_test --base-url http://localhost:8000 --duration 60
+
+接続先DBは scripts/dbutil.py の connect()（API と同じ DB_* 環境変数）。
+結果は同じ引数・同じシードで比較できるよう、送信するリクエストの並びも乱数シードで固定する。
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(SERVER_DIR))
+
+from scripts.dbutil import connect  # noqa: E402
+
+ANIMAL_TYPES = ("beef", "pork", "chicken")
+CHAT_MESSAGES = ("おすすめの部位は？", "次に何を食べる？", "ホルモンに挑戦したい", "鶏の珍しい部位を教えて")
+
+Request = Tuple[str, str, Optional[dict]]
+
+
+class LoadContext:
+    """リクエストの組み立てに使う負荷試験用ユーザー・セッション・部位"""
+
+    def __init__(self, users: List[dict], part_ids: List[int]):
+        self.users = users
+        self.part_ids = part_ids
+
+
+def load_context(prefix: str, sessions_per_user: int = 50) -> LoadContext:
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, google_id FROM users WHERE google_id LIKE %s ORDER BY id", (f"{prefix}-%",))
+            users = cur.fetchall()
+            cur.execute("SELECT id FROM animal_parts ORDER BY id")
+            part_ids = [row["id"] for row in cur.fetchall()]
+            for user in users:
+                cur.execute(
+                    "SELECT id FROM eating_sessions WHERE user_id = %s ORDER BY eaten_at DESC, id DESC LIMIT %s",
+                    (user["id"], sessions_per_user)
+                )
+                user["session_ids"] = [row["id"] for row in cur.fetchall()]
+    finally:
+        conn.close()
+    if not users:
+        sys.exit(f"google_id が {prefix}- で始まるユーザーがいません。先に scripts.seed_load_data を実行してください。")
+    return LoadContext(users, part_ids)
+
+
+def _get(path: str, **params) -> Request:
+    return "GET", f"{path}?{urlencode(params, doseq=True)}" if params else path, None
+
+
+def req_parts(ctx, rng, user):
+    return _get("/api/animal-parts")
+
+
+def req_parts_by_type(ctx, rng, user):
+    return _get(f"/api/animal-parts/{rng.choice(ANIMAL_TYPES)}")
+
+
+def req_user(ctx, rng, user):
+    return _get(f"/api/users/{user['google_id']}")
+
+
+def req_progress(ctx, rng, user):
+    return _get("/api/user-progress", user_id=user["id"])
+
+
+def req_progress_by_animal(ctx, rng, user):
+    return _get(f"/api/user-progress/{rng.choice(ANIMAL_TYPES)}", user_id=user["id"])
+
+
+def req_dashboard(ctx, rng, user):
+    return _get("/api/dashboard-stats", user_id=user["id"])
+
+
+def req_sessions(ctx, rng, user):
+    return _get("/api/eating-sessions", user_id=user["id"], page=rng.randint(1, 2), per_page=20)
+
+
+def req_sessions_cursor(ctx, rng, user):
+    return _get("/api/eating-sessions", user_id=user["id"], pagination="cursor", per_page=20)
+
+
+def req_session_detail(ctx, rng, user):
+    session_id = rng.choice(user["session_ids"]) if user["session_ids"] else 0
+    return _get(f"/api/eating-sessions/{session_id}", user_id=user["id"])
+
+
+def req_session_details(ctx, rng, user):
+    return _get("/api/eating-sessions/details", user_id=user["id"], session_ids=user["session_ids"][:20] or [0])
+
+
+def req_recommendations(ctx, rng, user):
+    return _get("/api/recommendations", user_id=user["id"], limit=5)
+
+
+def req_create_record(ctx, rng, user):
+    body = {
+        "animal_part_ids": rng.sample(ctx.part_ids, min(3, len(ctx.part_ids))),
+        "restaurant_name": "負荷試験",
+        "rating": rng.randint(1, 5),
+    }
+    return "POST", f"/api/eating-records?{urlencode({'user_id': user['id']})}", body
+
+
+def req_chat(ctx, rng, user):
+    return "POST", f"/api/chat/message?{urlencode({'user_id': user['id']})}", {"message": rng.choice(CHAT_MESSAGES)}
+
+
+def req_chat_stream(ctx, rng, user):
+    return "POST", f"/api/chat/message/stream?{urlencode({'user_id': user['id']})}", {"message": rng.choice(CHAT_MESSAGES)}
+
+
+# (集計名, 重み, リクエストの組み立て, 書き込みか)
+ENDPOINTS: List[Tuple[str, int, Callable, bool]] = [
+    ("GET /api/animal-parts", 10, req_parts, False),
+    ("GET /api/animal-parts/{animal_type}", 5, req_parts_by_type, False),
+    ("GET /api/users/{google_id}", 5, req_user, False),
+    ("GET /api/user-progress", 15, req_progress, False),
+    ("GET /api/user-progress/{animal_type}", 8, req_progress_by_animal, False),
+    ("GET /api/dashboard-stats", 15, req_dashboard, False),
+    ("GET /api/eating-sessions", 8, req_sessions, False),
+    ("GET /api/eating-sessions?pagination=cursor", 4, req_sessions_cursor, False),
+    ("GET /api/eating-sessions/{session_id}", 6, req_session_detail, False),
+    ("GET /api/eating-sessions/details", 4, req_session_details, False),
+    ("GET /api/recommendations", 6, req_recommendations, False),
+    ("POST /api/eating-records", 5, req_create_record, True),
+    ("POST /api/chat/message", 3, req_chat, False),
+    ("POST /api/chat/message/stream", 2, req_chat_stream, False),
+]
+
+
+def percentile(sorted_values: List[float], ratio: float) -> float:
+    """最近傍順位法のパーセンタイル"""
+    if not sorted_values:
+        return 0.0
+    index = max(math.ceil(ratio * len(sorted_values)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+
+    def add(self, name: str, status: int, seconds: float) -> None:
+        with self._lock:
+            self.latencies.setdefault(name, []).append(seconds * 1000)
+            by_status = self.statuses.setdefault(name, {})
+            by_status[str(status)] = by_status.get(str(status), 0) + 1
+            if status == 0 or status >= 500:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self, elapsed: float) -> dict:
+        def stats(values: List[float], errors: int, statuses: Optional[dict] = None) -> dict:
+            values = sorted(values)
+            result = {
+                "requests": len(values),
+                "errors": errors,
+                "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0,
+                "mean_ms": round(sum(values) / len(values), 2) if values else 0,
+                "p50_ms": round(percentile(values, 0.50), 2),
+                "p95_ms": round(percentile(values, 0.95), 2),
+                "p99_ms": round(percentile(values, 0.99), 2),
+                "max_ms": round(values[-1], 2) if values else 0,
+            }
+            if statuses is not None:
+                result["status_counts"] = statuses
+            return result
+
+        endpoints = {
+            name: stats(values, self.errors.get(name, 0), self.statuses.get(name))
+            for name, values in sorted(self.latencies.items())
+        }
+        all_values = [value for values in self.latencies.values() for value in values]
+        return {
+            "total": stats(all_values, sum(self.errors.values())),
+            "endpoints": endpoints,
+        }
+
+
+def send(conn: http.client.HTTPConnection, request: Request) -> int:
+    method, path, body = request
+    headers = {}
+    payload = None
+    if body is not None:
+        payload = json.dumps(body).encode("utf-8")
+        headers["Content-Type"] = "application/json"
+    conn.request(method, path, body=payload, headers=headers)
+    response = conn.getresponse()
+    # ストリーミング応答も最後まで読んでから計測を終える
+    response.read()
+    return response.status
+
+
+def worker(worker_id: int, args, ctx: LoadContext, endpoints, recorder: Recorder, warmup_until: float, deadline: float):
+    rng = random.Random(args.seed * 1000 + worker_id)
+    target = urlsplit(args.base_url)
+    weights = [weight for _, weight, _, _ in endpoints]
+    conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=args.timeout)
+    try:
+        while time.monotonic() < deadline:
+            name, _, build, _ = rng.choices(endpoints, weights=weights)[0]
+            request = build(ctx, rng, rng.choice(ctx.users))
+            started = time.perf_counter()
+            try:
+                status = send(conn, request)
+            except Exception:
+                status = 0
+                conn.close()
+                conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=args.timeout)
+            elapsed = time.perf_counter() - started
+            if time.monotonic() >= warmup_until:
+                recorder.add(name, status, elapsed)
+    finally:
+        conn.close()
+
+
+def wait_for_health(base_url: str, timeout: float, server: Optional[subprocess.Popen] = None) -> None:
+    target = urlsplit(base_url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            sys.exit(f"API が終了しました（exit code {server.returncode}）")
+        try:
+            conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=2)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except Exception:
+            pass
+        time.sleep(0.5)
+    sys.exit(f"{base_url} が {timeout:.0f} 秒以内に起動しませんでした")
+
+
+def start_server(args) -> subprocess.Popen:
+    target = urlsplit(args.base_url)
+    env = dict(os.environ)
+    env.update({
+        "GEMINI_FAKE": "1",
+        "GEMINI_FAKE_LATENCY": str(args.gemini_latency),
+        "GEMINI_FAKE_FAILURE_RATE": str(args.gemini_failure_rate),
+    })
+    if not args.response_cache:
+        env["CHAT_RESPONSE_CACHE_SIZE"] = "0"
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", target.hostname, "--port", str(target.port or 80),
+        "--workers", str(args.workers), "--log-level", "warning",
+    ]
+    return subprocess.Popen(command, cwd=SERVER_DIR, env=env)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="API の負荷試験")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="API のURL")
+    parser.add_argument("--start-server", action="store_true", help="uvicorn をこのコマンドから起動する（GEMINI_FAKE=1）")
+    parser.add_argument("--workers", type=int, default=1, help="--start-server 時の uvicorn ワーカー数")
+    parser.add_argument("--gemini-latency", type=float, default=0.5, help="擬似Geminiの応答秒数")
+    parser.add_argument("--gemini-failure-rate", type=float, default=0.0, help="擬似Geminiの失敗率")
+    parser.add_argument("--response-cache", action="store_true", help="チャット応答キャッシュを有効にしたまま計測する")
+    parser.add_argument("--duration", type=float, default=30.0, help="計測秒数")
+    parser.add_argument("--warmup", type=float, default=5.0, help="計測前のウォームアップ秒数")
+    parser.add_argument("--concurrency", type=int, default=16, help="同時に送るクライアント数")
+    parser.add_argument("--timeout", type=float, default=30.0, help="1リクエストのタイムアウト秒数")
+    parser.add_argument("--read-only", action="store_true", help="書き込み（食事記録の登録）を送らない")
+    parser.add_argument("--only", nargs="*", help="対象エンドポイント名の部分一致で絞り込む")
+    parser.add_argument("--prefix", default="load", help="負荷試験用ユーザーの google_id の接頭辞")
+    parser.add_argument("--seed", type=int, default=42, help="乱数シード")
+    parser.add_argument("--output", help="結果JSONの出力先（省略時は標準出力）")
+    args = parser.parse_args()
+
+    endpoints = [
+        endpoint for endpoint in ENDPOINTS
+        if not (args.read_only and endpoint[3])
+        and (not args.only or any(keyword in endpoint[0] for keyword in args.only))
+    ]
+    if not endpoints:
+        sys.exit("対象のエンドポイントがありません")
+
+    ctx = load_context(args.prefix)
+    server = start_server(args) if args.start_server else None
+    try:
+        wait_for_health(args.base_url, timeout=60, server=server)
+        recorder = Recorder()
+        started = time.monotonic()
+        warmup_until = started + args.warmup
+        deadline = warmup_until + args.duration
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = [
+                pool.submit(worker, i, args, ctx, endpoints, recorder, warmup_until, deadline)
+                for i in range(args.concurrency)
+            ]
+            for future in futures:
+                future.result()
+        elapsed = time.monotonic() - warmup_until
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    result = {
+        "config": {
+            "base_url": args.base_url,
+            "duration_seconds": args.duration,
+            "warmup_seconds": args.warmup,
+            "concurrency": args.concurrency,
+            "workers": args.workers if args.start_server else None,
+            "gemini_latency": args.gemini_latency if args.start_server else None,
+            "users": len(ctx.users),
+            "seed": args.seed,
+            "read_only": args.read_only,
+        },
+        "elapsed_seconds": round(elapsed, 2),
+        **recorder.summary(elapsed),
+    }
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+        print(f"wrote {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
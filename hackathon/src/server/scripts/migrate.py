@@ -0,0 +1,103 @@
+"""server/migrations の SQL を番号順に適用するマイグレーションコマンド
+
+    cd src/server
+    python -m scripts.migrate            # 未適用のマイグレーションを適用
+    python -m scripts.migrate --status   # 適用状況を表示
+
+適用済みのバージョンは schema_migrations に記録する。
+db/01_create_tables.sql で作成した新規DBは作成時点のマイグレーションが適用済みとして記録されている。
+"""
+import argparse
+import re
+import sys
+from pathlib import Path
+from typing import List
+
+import pymysql
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.dbutil import connect  # noqa: E402
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[1] / "migrations"
+
+# 既に同じ定義が存在する場合のエラー（スキーマ作成SQL側で先に反映済みのケース）
+ALREADY_APPLIED_ERRORS = {
+    1050,  # Table already exists
+    1060,  # Duplicate column name
+    1061,  # Duplicate key name
+}
+
+
+def split_statements(sql: str) -> List[str]:
+    """行末の ; で文を区切る（ストアドプロシージャは扱わない）"""
+    without_comments = "\n".join(
+        line for line in sql.splitlines() if not line.strip().startswith("--")
+    )
+    return [stmt.strip() for stmt in re.split(r";\s*(?:\n|$)", without_comments) if stmt.strip()]
+
+
+def ensure_table(conn) -> None:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR(255) PRIMARY KEY,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+    conn.commit()
+
+
+def applied_versions(conn) -> set:
+    with conn.cursor() as cur:
+        cur.execute("SELECT version FROM schema_migrations")
+        return {row["version"] for row in cur.fetchall()}
+
+
+def apply(conn, path: Path) -> None:
+    with conn.cursor() as cur:
+        for statement in split_statements(path.read_text(encoding="utf-8")):
+            try:
+                cur.execute(statement)
+            except pymysql.err.OperationalError as exc:
+                if exc.args[0] not in ALREADY_APPLIED_ERRORS:
+                    raise
+                print(f"  skip (already present): {exc.args[1]}")
+        cur.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (path.stem,))
+    conn.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="DBマイグレーションを適用")
+    parser.add_argument("--status", action="store_true", help="適用状況のみ表示")
+    parser.add_argument("--dir", type=Path, default=MIGRATIONS_DIR, help="マイグレーションのディレクトリ")
+    args = parser.parse_args()
+
+    migrations = sorted(args.dir.glob("*.sql"))
+    conn = connect()
+    try:
+        ensure_table(conn)
+        done = applied_versions(conn)
+        pending = [path for path in migrations if path.stem not in done]
+
+        if args.status:
+            for path in migrations:
+                mark = "applied" if path.stem in done else "pending"
+                print(f"{mark:8} {path.stem}")
+            return
+
+        if not pending:
+            print("no pending migrations")
+            return
+        for path in pending:
+            print(f"applying {path.stem}")
+            apply(conn, path)
+        print(f"applied {len(pending)} migration(s)")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
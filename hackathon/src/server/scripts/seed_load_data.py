@@ -0,0 +1,146 @@
+"""負荷試験用の合成データを投入するコマンド
+
+部位マスター（db/02_insert_parts.sql）が投入済みのDBに、ユーザー・食事セッション・食事記録を
+乱数シード固定で生成して登録し、user_part_progress も作り直す。
+
+    cd src/server
+    python -m scripts.seed_load_data --users 200 --sessions-per-user 30 --records-per-session 4
+    python -m scripts.seed_load_data --reset   # 以前に投入した負荷試験用ユーザーを削除してから投入
+
+負荷試験用ユーザーの google_id は ``<prefix>-<番号>``（既定 ``load-1`` ...）。
+接続先は scripts/dbutil.py の connect()（API と同じ DB_* 環境変数）。
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+import pymysql
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from scripts.backfill_user_part_progress import rebuild  # noqa: E402
+from scripts.dbutil import connect  # noqa: E402
+
+RESTAURANTS = ["焼肉 たべぶい", "ホルモン酒場", "炭火焼鳥 とりよし", "とんかつ 豚八", "ステーキハウス 牛舎", "もつ鍋 こころ"]
+
+USER_INSERT = "INSERT INTO users (google_id, email, name) VALUES (%s, %s, %s)"
+
+SESSION_INSERT = """
+INSERT INTO eating_sessions (user_id, restaurant_name, eaten_at, memo, rating)
+VALUES (%s, %s, %s, %s, %s)
+"""
+
+RECORD_INSERT = """
+INSERT INTO eating_records (user_id, animal_part_id, session_id, eaten_at)
+VALUES (%s, %s, %s, %s)
+"""
+
+
+def load_part_ids(conn) -> List[int]:
+    with conn.cursor() as cur:
+        cur.execute("SELECT id FROM animal_parts ORDER BY id")
+        return [row["id"] for row in cur.fetchall()]
+
+
+def delete_load_users(conn, prefix: str) -> int:
+    """負荷試験用ユーザーを削除（セッション・記録・制覇状況は外部キーで連鎖削除）"""
+    with conn.cursor() as cur:
+        deleted = cur.execute("DELETE FROM users WHERE google_id LIKE %s", (f"{prefix}-%",))
+    conn.commit()
+    return deleted
+
+
+def seed_user(conn, rng: random.Random, user_id: int, part_ids: List[int], args) -> int:
+    """1ユーザー分のセッションと記録を登録し、記録件数を返す"""
+    now = datetime.now().replace(microsecond=0)
+    # ユーザーごとに好みの部位を偏らせ、共起に傾向が出るようにする
+    favorites = rng.sample(part_ids, min(len(part_ids), max(args.records_per_session * 3, 5)))
+    sessions = []
+    for _ in range(args.sessions_per_user):
+        eaten_at = now - timedelta(days=rng.uniform(0, args.days))
+        sessions.append((
+            user_id,
+            rng.choice(RESTAURANTS),
+            eaten_at,
+            None,
+            rng.randint(1, 5),
+        ))
+    sessions.sort(key=lambda row: row[2])
+
+    with conn.cursor() as cur:
+        cur.executemany(SESSION_INSERT, sessions)
+        cur.execute(
+            "SELECT id, eaten_at FROM eating_sessions WHERE user_id = %s ORDER BY id DESC LIMIT %s",
+            (user_id, len(sessions))
+        )
+        session_rows = cur.fetchall()
+
+        records = []
+        for session in session_rows:
+            count = rng.randint(1, args.records_per_session)
+            pool = favorites if rng.random() < 0.7 else part_ids
+            for part_id in rng.sample(pool, min(count, len(pool))):
+                records.append((user_id, part_id, session["id"], session["eaten_at"]))
+        cur.executemany(RECORD_INSERT, records)
+    return len(records)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="負荷試験用の合成データを投入")
+    parser.add_argument("--users", type=int, default=100, help="作成するユーザー数")
+    parser.add_argument("--sessions-per-user", type=int, default=20, help="ユーザーあたりの食事セッション数")
+    parser.add_argument("--records-per-session", type=int, default=3, help="セッションあたりの部位数の上限（1〜この値）")
+    parser.add_argument("--days", type=int, default=180, help="食事日時を散らす期間（日）")
+    parser.add_argument("--seed", type=int, default=42, help="乱数シード")
+    parser.add_argument("--prefix", default="load", help="負荷試験用ユーザーの google_id の接頭辞")
+    parser.add_argument("--reset", action="store_true", help="既存の負荷試験用ユーザーを削除してから投入")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    conn = connect()
+    try:
+        part_ids = load_part_ids(conn)
+        if not part_ids:
+            sys.exit("animal_parts が空です。先に db/02_insert_parts.sql を投入してください。")
+
+        if args.reset:
+            print(f"deleted {delete_load_users(conn, args.prefix)} load-test users")
+
+        started = time.perf_counter()
+        total_records = 0
+        user_ids = []
+        for number in range(1, args.users + 1):
+            google_id = f"{args.prefix}-{number}"
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(USER_INSERT, (google_id, f"{google_id}@example.com", f"負荷試験ユーザー{number}"))
+                    user_id = cur.lastrowid
+                total_records += seed_user(conn, rng, user_id, part_ids, args)
+                conn.commit()
+            except pymysql.IntegrityError:
+                conn.rollback()
+                sys.exit(f"{google_id} は投入済みです。--reset を付けて再実行してください。")
+            except Exception:
+                conn.rollback()
+                raise
+            user_ids.append(user_id)
+            if number % 50 == 0 or number == args.users:
+                print(f"users {number}/{args.users} seeded")
+
+        for start in range(0, len(user_ids), 100):
+            rebuild(conn, user_ids[start:start + 100])
+
+        print(
+            f"seeded {len(user_ids)} users, {len(user_ids) * args.sessions_per_user} sessions, "
+            f"{total_records} records in {time.perf_counter() - started:.1f}s"
+        )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.query_trace import trace_queries  # noqa: E402
+
+
+@pytest.fixture
+def max_queries():
+    """ブロック内で発行したSQLが上限以内かを確かめる（app.main の計測付きカーソル経由のSQLが対象）
+
+        with max_queries(2):
+            client.get("/api/dashboard-stats", params={"user_id": 1})
+    """
+    @contextmanager
+    def check(limit: int):
+        with trace_queries() as trace:
+            yield trace
+        assert trace.count <= limit, (
+            f"{trace.count} queries (budget {limit}): {dict(trace.statements)}"
+        )
+    return check
@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import app.main as main
+from app.chat_budget import message_tokens, split_history_by_budget
+from app.main import ChatMessage, compact_chat_history
+
+SERVER_DIR = Path(__file__).resolve().parents[1]
+
+
+def conversation(turns):
+    messages = []
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"質問{i}です。詳しく教えてください。"})
+        messages.append({"role": "assistant", "content": f"回答{i}です。続きの説明です。"})
+    return messages
+
+
+def test_split_keeps_newest_messages_within_budget():
+    history = [ChatMessage(**msg) for msg in conversation(5)]
+    budget = sum(message_tokens(msg.content) for msg in history[-3:])
+
+    older, recent = split_history_by_budget(history, budget)
+    assert recent == history[-3:]
+    assert older == history[:-3]
+
+    # 件数の上限も効く
+    older, recent = split_history_by_budget(history, 0, max_messages=2)
+    assert recent == history[-2:]
+
+
+def test_compact_chat_history_folds_old_turns_into_stored_summary(monkeypatch):
+    messages = conversation(5)
+    budget = sum(message_tokens(msg["content"]) for msg in messages[-4:])
+    monkeypatch.setattr(main, "CHAT_HISTORY_TOKEN_BUDGET", budget)
+    monkeypatch.setattr(main, "CHAT_SUMMARY_TOKEN_BUDGET", 300)
+
+    conversation_id = main.chat_session_store.create(user_id=1)
+    main.chat_session_store.append(conversation_id, 1, messages)
+    history = [ChatMessage(**msg) for msg in main.chat_session_store.get_messages(conversation_id, 1)]
+
+    recent, summary = compact_chat_history(conversation_id, 1, history, None)
+
+    assert [msg.content for msg in recent] == [msg["content"] for msg in messages[-4:]]
+    # 要約には各発言の最初の一文だけが入る
+    assert "- ユーザー: 質問0です。" in summary.splitlines()
+    assert "詳しく教えてください" not in summary
+    # サーバー側の会話も畳み込んだ状態で保存される
+    assert len(main.chat_session_store.get_messages(conversation_id, 1)) == 4
+    assert main.chat_session_store.get_summary(conversation_id, 1) == summary
+
+
+def test_compact_chat_history_keeps_history_within_budget(monkeypatch):
+    monkeypatch.setattr(main, "CHAT_HISTORY_TOKEN_BUDGET", 10000)
+    history = [ChatMessage(**msg) for msg in conversation(2)]
+
+    recent, summary = compact_chat_history(None, 1, history, "- ユーザー: 前の話")
+    assert recent == history
+    assert summary == "- ユーザー: 前の話"
+
+
+def read_budgets(**env):
+    """app.main を別プロセスで読み込み、環境変数から決まった予算を返す"""
+    result = subprocess.run(
+        [sys.executable, "-c", (
+            "import app.main as m; "
+            "print(m.CHAT_HISTORY_TOKEN_BUDGET, m.CHAT_SUMMARY_TOKEN_BUDGET, m.MAX_CHAT_HISTORY)"
+        )],
+        cwd=SERVER_DIR,
+        env={**os.environ, **env},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return tuple(int(value) for value in result.stdout.split()[-3:])
+
+
+def test_malformed_budget_settings_fall_back_to_defaults():
+    assert read_budgets(
+        CHAT_HISTORY_TOKEN_BUDGET="abc", CHAT_SUMMARY_TOKEN_BUDGET="", CHAT_HISTORY_LIMIT="many"
+    ) == (1500, 300, 40)
+    assert read_budgets(
+        CHAT_HISTORY_TOKEN_BUDGET="800", CHAT_SUMMARY_TOKEN_BUDGET="0", CHAT_HISTORY_LIMIT="12"
+    ) == (800, 0, 12)
@@ -0,0 +1,55 @@
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.response_cache import SemanticResponseCache
+
+CONTEXTS = {
+    1: "【現在の制覇状況】\n牛: 1/10 (制覇率 10%・残り 9 部位)\n【最近の食事】\n- 2024-05-01 に 焼肉A を訪問",
+    2: "【現在の制覇状況】\n牛: 1/10 (制覇率 10%・残り 9 部位)\n【最近の食事】\n- 2024-06-02 に 焼肉B を訪問",
+}
+
+
+def setup_chat(monkeypatch, contexts):
+    sent = []
+
+    def fake_call_gemini_api(message, history, system_prompt=None, extra_context=None, summary=None):
+        sent.append(extra_context)
+        # コンテキストをそのまま返す応答（最近の食事が含まれれば応答にも出る）
+        return f"reply for: {extra_context}", history, None
+
+    monkeypatch.setattr(main, "chat_response_cache", SemanticResponseCache())
+    monkeypatch.setattr(main, "build_concierge_context", lambda user_id: contexts[user_id])
+    monkeypatch.setattr(main, "call_gemini_api", fake_call_gemini_api)
+    return TestClient(main.app), sent
+
+
+def post_message(client, user_id):
+    response = client.post(f"/api/chat/message?user_id={user_id}", json={"message": "おすすめの部位は？"})
+    assert response.status_code == 200
+    return response.json()["data"]
+
+
+def test_cached_reply_never_carries_another_users_recent_meal(monkeypatch):
+    client, sent = setup_chat(monkeypatch, CONTEXTS)
+
+    first = post_message(client, 1)
+    second = post_message(client, 2)
+
+    # 制覇状況が同じなので2人目はキャッシュを使うが、どちらの応答にも他人の（自分の）店舗名は含まれない
+    assert second["cached"] is True
+    assert len(sent) == 1
+    assert "焼肉A" not in sent[0]
+    for data in (first, second):
+        assert "焼肉A" not in data["reply"]
+        assert "焼肉B" not in data["reply"]
+
+
+def test_missing_context_is_not_cached(monkeypatch):
+    client, sent = setup_chat(monkeypatch, {1: None, 2: None})
+
+    post_message(client, 1)
+    second = post_message(client, 2)
+
+    assert second["cached"] is False
+    assert len(sent) == 2
+    assert main.chat_response_cache.stats()["size"] == 0
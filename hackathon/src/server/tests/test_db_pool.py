@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from app.db_pool import ConnectionPool, PoolTimeoutError
+
+
+class YieldingLock:
+    """ロックを手放した直後に他のスレッドへ処理を譲る（確認と確保の間の競合を再現する）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._lock.acquire()
+
+    def __exit__(self, *exc):
+        self._lock.release()
+        time.sleep(0.01)
+
+
+class FakeConnection:
+    def rollback(self):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_concurrent_acquire_never_exceeds_max_size():
+    created = []
+    lock = threading.Lock()
+
+    def connect():
+        # 接続に時間がかかる間に他のスレッドが上限を確認する状況を作る
+        time.sleep(0.05)
+        with lock:
+            created.append(1)
+        return FakeConnection()
+
+    pool = ConnectionPool(connect, min_size=0, max_size=2, timeout=0.2)
+    pool._lock = YieldingLock()
+    results = []
+
+    def worker():
+        try:
+            results.append(pool.acquire())
+        except PoolTimeoutError as e:
+            results.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 2
+    assert pool.size == 2
+    assert sum(1 for r in results if not isinstance(r, PoolTimeoutError)) == 2
+
+
+def test_failed_connect_releases_reservation():
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("connection refused")
+        return FakeConnection()
+
+    pool = ConnectionPool(connect, min_size=0, max_size=1, timeout=0.1)
+    with pytest.raises(OSError):
+        pool.acquire()
+    assert pool.size == 0
+
+    conn = pool.acquire()
+    assert pool.size == 1
+    conn.close()
@@ -0,0 +1,14 @@
+from datetime import datetime, timezone
+
+from app.main import normalize_eaten_at
+
+
+def test_mixed_aware_and_naive_eaten_at_are_comparable():
+    now = datetime.now()
+    aware = normalize_eaten_at(datetime(2024, 1, 1, 3, 0, tzinfo=timezone.utc), now)
+    default = normalize_eaten_at(None, now)
+
+    assert aware.tzinfo is None
+    assert default is now
+    assert min(aware, default) == aware
+    assert aware == datetime(2024, 1, 1, 3, 0, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+import pytest
+
+from app.llm_guard import CircuitBreaker, LLMGuard, LLMUnavailableError
+
+
+def open_breaker(breaker: CircuitBreaker) -> None:
+    breaker.record_failure()
+    # reset_timeout を過ぎたことにして half_open へ
+    breaker._opened_at = time.monotonic() - breaker.reset_timeout - 1
+
+
+def test_cancelled_trial_releases_half_open_slot():
+    guard = LLMGuard(max_concurrency=2, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=30))
+    open_breaker(guard.breaker)
+    assert guard.breaker.state == "half_open"
+
+    async def trial():
+        async with guard.async_slot():
+            await asyncio.sleep(10)
+
+    async def run():
+        task = asyncio.create_task(trial())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # 次の呼び出しが試行として通り、成功すれば closed に戻る
+        async with guard.async_slot():
+            pass
+
+    asyncio.run(run())
+    assert guard.breaker.state == "closed"
+    assert guard.stats()["in_flight"] == 0
+
+
+def test_failed_trial_reopens_circuit():
+    guard = LLMGuard(max_concurrency=2, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=30))
+    open_breaker(guard.breaker)
+
+    with pytest.raises(RuntimeError):
+        with guard.slot():
+            raise RuntimeError("gemini error")
+
+    assert guard.breaker.state == "open"
+    with pytest.raises(LLMUnavailableError):
+        with guard.slot():
+            pass
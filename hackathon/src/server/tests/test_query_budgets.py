@@ -0,0 +1,248 @@
+import random
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.db_instrument import InstrumentedAsyncConnection, InstrumentedCursor
+from app.db_pool import ConnectionPool
+from app.fake_gemini import FakeGeminiRegistry
+from app.response_cache import SemanticResponseCache
+from scripts.check_query_counts import QUERY_BUDGETS
+from scripts.load_test import ENDPOINTS, LoadContext
+
+NOW = datetime(2024, 5, 1, 12, 0)
+USER = {
+    "id": 1, "google_id": "load-1", "email": "load-1@example.com", "name": "load 1",
+    "profile_image_url": None, "created_at": NOW, "updated_at": NOW,
+}
+PARTS = [
+    {
+        "id": part_id, "animal_type": animal_type, "part_category": category,
+        "part_name": f"{animal_type}-{part_id}", "part_name_jp": f"部位{part_id}",
+        "description": None, "difficulty_level": 1,
+    }
+    for part_id, (animal_type, category) in enumerate(
+        [(a, c) for a in ("beef", "pork", "chicken") for c in ("meat", "organ")], start=1
+    )
+]
+SESSION_IDS = [1, 2, 3]
+
+
+def session_row(session_id):
+    return {
+        "id": session_id, "user_id": USER["id"], "restaurant_name": f"店{session_id}",
+        "eaten_at": NOW - timedelta(days=session_id), "memo": None, "rating": 4, "photo_url": None,
+        "created_at": NOW, "updated_at": NOW,
+    }
+
+
+def detail_rows(sql, args):
+    rows = []
+    for session_id in args[:-1]:
+        for part in PARTS[:2]:
+            rows.append({
+                **session_row(session_id),
+                "record_id": session_id * 10 + part["id"], "animal_part_id": part["id"],
+                "record_eaten_at": NOW, "record_created_at": NOW, **{
+                    key: part[key] for key in ("animal_type", "part_category", "part_name", "part_name_jp", "description")
+                },
+            })
+    return rows
+
+
+def read_back_rows(sql, args):
+    return [
+        {"id": session_id * 10 + 1, "animal_part_id": 1, "session_id": session_id, "eaten_at": NOW, "created_at": NOW}
+        for session_id in args
+    ]
+
+
+# (SQLに含まれる文字列, 結果の行を返す関数)。上から順に最初に一致したものを使う
+RESULTS = [
+    ("INSERT ", lambda sql, args: []),
+    ("ORDER BY animal_type, part_category", lambda sql, args: PARTS),
+    ("FROM users WHERE google_id", lambda sql, args: [USER]),
+    ("SELECT animal_part_id FROM user_part_progress", lambda sql, args: [{"animal_part_id": 1}]),
+    ("SELECT restaurant_name, eaten_at", lambda sql, args: [{"restaurant_name": "店1", "eaten_at": NOW}]),
+    ("er.session_id IS NOT NULL", lambda sql, args: [
+        {"session_id": session_id, "animal_part_id": part["id"]} for session_id in SESSION_IDS for part in PARTS[:3]
+    ]),
+    ("WHERE session_id IN", read_back_rows),
+    ("parts_count", lambda sql, args: [
+        {**session_row(session_id), "parts_count": 2, "parts_list": "部位1,部位2"} for session_id in SESSION_IDS
+    ]),
+    ("COUNT(*) as total", lambda sql, args: [{"total": len(SESSION_IDS)}]),
+    ("LEFT JOIN eating_records er ON er.session_id = es.id", detail_rows),
+    ("first_conquered_at as first_conquered_date", lambda sql, args: [
+        {"id": 1, "first_conquered_date": NOW, "last_eaten_date": NOW, "eat_count": 2}
+    ]),
+    ("GROUP_CONCAT(DISTINCT es.restaurant_name)", lambda sql, args: [
+        {"id": 1, "first_conquered_date": NOW, "last_eaten_date": NOW, "eat_count": 2, "restaurants": "店1"}
+    ]),
+    ("WITH ROLLUP", lambda sql, args: [
+        {"animal_type": "beef", "conquered": 1, "week_records": 2, "streak_days": 1},
+        {"animal_type": None, "conquered": 1, "week_records": 2, "streak_days": 1},
+    ]),
+    ("ORDER BY er.eaten_at DESC", lambda sql, args: [
+        {"part_name_jp": "部位1", "animal_type": "beef", "restaurant_name": "店1", "eaten_at": NOW}
+    ]),
+]
+
+
+class FakeCursor:
+    """SQLに応じて RESULTS の行を返す pymysql の DictCursor の代わり"""
+
+    lastrowid = 0
+
+    def __init__(self):
+        self.rowcount = 0
+        self._rows = []
+
+    def execute(self, query, args=None):
+        for fragment, rows_for in RESULTS:
+            if fragment in query:
+                self._rows = [dict(row) for row in rows_for(query, list(args or []))]
+                break
+        else:
+            raise AssertionError(f"unexpected query: {query}")
+        if query.lstrip().startswith("INSERT"):
+            FakeCursor.lastrowid += 1
+        self.rowcount = len(self._rows)
+        return self.rowcount
+
+    def executemany(self, query, args):
+        self.rowcount = len(args)
+        return self.rowcount
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+
+class FakeConnection:
+    def cursor(self):
+        return FakeCursor()
+
+    def rollback(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeAsyncCursor:
+    """aiomysql のカーソルの代わり（FakeCursor を async で呼ぶ）"""
+
+    def __init__(self):
+        self._cursor = FakeCursor()
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    async def execute(self, query, args=None):
+        return self._cursor.execute(query, args)
+
+    async def executemany(self, query, args):
+        return self._cursor.executemany(query, args)
+
+    async def fetchone(self):
+        return self._cursor.fetchone()
+
+    async def fetchall(self):
+        return self._cursor.fetchall()
+
+
+class _FakeAsyncCursorContext:
+    async def __aenter__(self):
+        return FakeAsyncCursor()
+
+    async def __aexit__(self, *exc):
+        return None
+
+
+class FakeAsyncConnection:
+    def cursor(self):
+        return _FakeAsyncCursorContext()
+
+    async def begin(self):
+        pass
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+
+@asynccontextmanager
+async def fake_async_db_connection():
+    yield InstrumentedAsyncConnection(FakeAsyncConnection())
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "db_pool", ConnectionPool(FakeConnection, min_size=0, cursor_wrapper=InstrumentedCursor))
+    monkeypatch.setattr(main, "read_db_pool", None)
+    monkeypatch.setattr(main, "get_async_db_connection", fake_async_db_connection)
+    monkeypatch.setattr(main, "gemini_registry", FakeGeminiRegistry(latency=0, failure_rate=0))
+    # check_query_counts と同じく、2回目がキャッシュで0件にならないよう応答キャッシュは使わない
+    monkeypatch.setattr(main, "chat_response_cache", SemanticResponseCache(max_entries=0))
+    main.parts_cache.invalidate()
+    main.concierge_context_cache.clear()
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("name, build", [(name, build) for name, _, build, _ in ENDPOINTS])
+def test_endpoint_query_budget(client, max_queries, name, build):
+    ctx = LoadContext([{**USER, "session_ids": SESSION_IDS}], [part["id"] for part in PARTS])
+    rng = random.Random(42)
+
+    def send():
+        method, path, body = build(ctx, rng, ctx.users[0])
+        response = client.request(method, path, json=body)
+        assert response.status_code < 400, response.text
+        return response
+
+    # 部位マスターや推薦モデルの読み込みを除いた定常状態で比べるため、1回目は捨てる
+    send()
+    with max_queries(QUERY_BUDGETS[name]):
+        send()
+
+
+def test_max_queries_counts_queries_issued_inside_requests(client, max_queries):
+    path = "/api/dashboard-stats?user_id=1"
+    client.get(path)
+    with max_queries(2) as trace:
+        client.get(path)
+    assert trace.count == 2
+
+    with pytest.raises(AssertionError, match="2 queries"):
+        with max_queries(1):
+            client.get(path)
@@ -0,0 +1,42 @@
+import threading
+import time
+
+from app.recommendations import RecommendationEngine, RecommendationModel
+
+
+def counting_builder():
+    calls = []
+
+    def build():
+        calls.append(1)
+        # 作成中に他のスレッドがロック待ちに入るよう時間をかける
+        time.sleep(0.05)
+        return RecommendationModel.build([1, 2, 3], [(1, 1), (1, 2), (2, 2), (2, 3)])
+
+    return build, calls
+
+
+def test_concurrent_first_requests_build_once():
+    build, calls = counting_builder()
+    engine = RecommendationEngine(build)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(engine.get_or_build())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 8
+    assert all(model is results[0] for model in results)
+
+
+def test_refresh_always_rebuilds():
+    build, calls = counting_builder()
+    engine = RecommendationEngine(build)
+    first = engine.get_or_build()
+    second = engine.refresh()
+
+    assert len(calls) == 2
+    assert second is not first
+    assert engine.get_or_build() is second
@@ -0,0 +1,58 @@
+import time
+
+from app.response_cache import SemanticResponseCache
+
+
+def test_exact_and_similar_questions_hit_within_fingerprint():
+    cache = SemanticResponseCache(threshold=0.75)
+    cache.store("おすすめの部位は？", "fp", "ハラミがおすすめです")
+
+    assert cache.lookup("おすすめの部位は?", "fp") == ("ハラミがおすすめです", 1.0)
+    reply, score = cache.lookup("おすすめの部位はある？", "fp")
+    assert reply == "ハラミがおすすめです"
+    assert 0.75 <= score < 1.0
+    # 制覇状況（指紋）が違えば使い回さない
+    assert cache.lookup("おすすめの部位は？", "other") is None
+
+
+def test_questions_below_threshold_miss():
+    cache = SemanticResponseCache(threshold=0.75)
+    cache.store("おすすめの部位は？", "fp", "ハラミがおすすめです")
+
+    assert cache.lookup("鶏の珍しい部位を教えて", "fp") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_expired_entries_are_not_returned():
+    cache = SemanticResponseCache(ttl=0.05)
+    cache.store("おすすめの部位は？", "fp", "ハラミがおすすめです")
+    time.sleep(0.1)
+
+    assert cache.lookup("おすすめの部位は？", "fp") is None
+    assert cache.lookup("おすすめの部位はある？", "fp") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_bucket_and_total_limits_evict_oldest():
+    cache = SemanticResponseCache(max_entries=3, max_per_fingerprint=2)
+    cache.store("質問その一", "a", "1")
+    cache.store("質問その二", "a", "2")
+    cache.store("質問その三", "a", "3")
+    # 指紋ごとの上限で最も古い応答が消える
+    assert cache.lookup("質問その一", "a") is None
+    assert cache.lookup("質問その三", "a") == ("3", 1.0)
+
+    cache.store("別の質問", "b", "4")
+    cache.store("別の問い合わせ", "b", "5")
+    # 全体の上限では最も使われていない指紋（a）の古い応答から捨てる
+    assert cache.stats()["size"] == 3
+    assert cache.lookup("質問その二", "a") is None
+    assert cache.lookup("別の質問", "b") == ("4", 1.0)
+
+
+def test_disabled_cache_stores_nothing():
+    cache = SemanticResponseCache(max_entries=0)
+    cache.store("おすすめの部位は？", "fp", "ハラミがおすすめです")
+
+    assert not cache.enabled
+    assert cache.lookup("おすすめの部位は？", "fp") is None
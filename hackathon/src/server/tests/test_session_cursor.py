@@ -0,0 +1,36 @@
+import base64
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.main import decode_session_cursor, encode_session_cursor
+
+
+def test_cursor_round_trips_eaten_at_and_id():
+    eaten_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    cursor = encode_session_cursor({"id": 42, "eaten_at": eaten_at})
+
+    assert "=" not in cursor
+    assert decode_session_cursor(cursor) == (eaten_at, 42)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    base64.urlsafe_b64encode(b'{"i": 1}').decode("ascii"),
+    base64.urlsafe_b64encode(b'{"e": "yesterday", "i": 1}').decode("ascii"),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as excinfo:
+        decode_session_cursor(cursor)
+    assert excinfo.value.status_code == 400
+
+
+def test_eating_sessions_returns_400_for_bad_cursor():
+    # カーソルはDBに接続する前に検証する
+    response = TestClient(main.app).get("/api/eating-sessions", params={"user_id": 1, "cursor": "%%%"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "cursor が不正です"